@@ -0,0 +1,337 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Benchmark of the notification delivery of the sidecar.
+# v1 and v2 subscriptions are added to a SQLite store and pointed at local
+# sink servers, see sink.py, with a latency and a failure rate. Some of the
+# sinks can be slow. Synthetic v1 and v2 /sync events are handed to
+# NotificationHandler.handle at a fixed rate from a pool of threads, as
+# the oslo.messaging listener does.
+# Reported are the notifications delivered per second and the delivery
+# latency percentiles of the subscribers of the fast and the slow sinks.
+# Head-of-line blocking is the time a notification for a fast sink waited
+# before its delivery started.
+#
+# Usage, from notificationclient-base/docker/notificationclient-sidecar:
+#   python3 -m benchmarks.delivery [--subscriptions N] [--rate HZ]
+#       [--seconds S] [--sinks N] [--slow-sinks N] [--latency S]
+#       [--slow-latency S] [--failure-rate F] [--delivery-workers N]
+#
+import argparse
+import concurrent.futures
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from benchmarks.sink import SinkServer
+from notificationclientsdk.common.helpers import constants
+from notificationclientsdk.common.helpers.delivery_engine import \
+    DeliveryEngine
+from notificationclientsdk.common.helpers import subscription_helper
+from notificationclientsdk.common.helpers.nodeinfo_helper import \
+    NodeInfoHelper
+from notificationclientsdk.model.dto.resourcetype import ResourceType
+from notificationclientsdk.model.orm.subscription import \
+    Subscription as SubscriptionOrm
+from notificationclientsdk.repository.dbcontext import DbContext
+from notificationclientsdk.repository.subscription_repo import \
+    SubscriptionRepo
+from notificationclientsdk.services.notification_handler import \
+    NotificationHandler
+
+NODE_NAME = 'controller-0'
+# Threads the oslo.messaging listener dispatches the events from
+LISTENER_THREADS = 64
+# The deliveries are over once the sinks received nothing for this long
+SETTLE_SECONDS = 1.0
+
+# v2 resources the events are about, with their instance
+V2_RESOURCES = [
+    (constants.SOURCE_SYNC_PTP_LOCK_STATE, 'ptp1'),
+    (constants.SOURCE_SYNC_PTP_CLOCK_CLASS, 'ptp1'),
+    (constants.SOURCE_SYNC_GNSS_SYNC_STATUS, 'ts1'),
+    (constants.SOURCE_SYNC_OS_CLOCK, 'phc2sys1'),
+    (constants.SOURCE_SYNC_SYNC_STATE, 'overall'),
+]
+# Resources of the v2 subscriptions, in turn
+V2_SUBSCRIBED = [constants.SOURCE_SYNC_ALL] + \
+    [source for source, _ in V2_RESOURCES]
+
+
+def percentile(ordered, fraction):
+    # Nearest rank of sorted values
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1,
+                       int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+class DeliveryBenchmark:
+
+    def __init__(self, args):
+        self.args = args
+        self.directory = tempfile.mkdtemp(prefix='sidecar-')
+        self.sinks = []
+        # Subscription index to (version, resource path, slow sink)
+        self.subscriptions = []
+        # Event key to (submit time, indexes of the matching subscriptions)
+        self.events = {}
+        # (subscription index, event key, time) of every delivery started
+        self.starts = []
+        self._lock = threading.Lock()
+        self._event_time = 0.0
+
+    def setup(self):
+        NodeInfoHelper.set_residing_node(NODE_NAME)
+        DbContext.init_dbcontext({
+            'url': 'sqlite:///%s' % os.path.join(self.directory,
+                                                 'sidecar.db')})
+        for index in range(max(1, self.args.sinks)):
+            slow = index < self.args.slow_sinks
+            sink = SinkServer(
+                self.args.slow_latency if slow else self.args.latency,
+                self.args.failure_rate, seed=index)
+            sink.slow = slow
+            sink.start()
+            self.sinks.append(sink)
+        repo = SubscriptionRepo(autocommit=True)
+        v1_count = int(round(self.args.subscriptions * self.args.v1_ratio))
+        for index in range(self.args.subscriptions):
+            sink = self.sinks[index % len(self.sinks)]
+            endpoint = '%s/%d' % (sink.url, index)
+            if index < v1_count:
+                repo.add(SubscriptionOrm(
+                    ResourceType=ResourceType.TypePTP,
+                    ResourceQualifierJson=json.dumps(
+                        {'NodeName': constants.WILDCARD_CURRENT_NODE}),
+                    EndpointUri=endpoint,
+                    UriLocation='http://127.0.0.1:8080/ocloudNotifications'
+                                '/v1/subscriptions'))
+                self.subscriptions.append(('v1', None, sink.slow))
+            else:
+                path = V2_SUBSCRIBED[index % len(V2_SUBSCRIBED)]
+                repo.add(SubscriptionOrm(
+                    ResourceAddress='/./%s%s' % (
+                        constants.WILDCARD_CURRENT_NODE, path),
+                    EndpointUri=endpoint,
+                    UriLocation='http://127.0.0.1:8080/ocloudNotifications'
+                                '/v2/subscriptions'))
+                self.subscriptions.append(('v2', path, sink.slow))
+        del repo
+
+        notify = subscription_helper.notify
+
+        def timed_notify(subscriptioninfo, notification, *args, **kwargs):
+            index = int(subscriptioninfo.EndpointUri.rsplit('/', 1)[1])
+            self.starts.append((index, event_key(notification),
+                                time.monotonic()))
+            return notify(subscriptioninfo, notification, *args, **kwargs)
+
+        subscription_helper.notify = timed_notify
+
+    def cleanup(self):
+        for sink in self.sinks:
+            sink.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def next_event(self, number):
+        # Strictly increasing, older notifications are not delivered
+        self._event_time = max(time.time(), self._event_time + 1e-6)
+        if number % 2 == 0:
+            event = {
+                'ResourceType': ResourceType.TypePTP,
+                'ResourceQualifier': {'NodeName': NODE_NAME},
+                'EventData': {'State': 'Locked'},
+                'EventTimestamp': self._event_time}
+            matching = [index for index, subscription in
+                        enumerate(self.subscriptions)
+                        if subscription[0] == 'v1']
+        else:
+            source, instance = V2_RESOURCES[number // 2 % len(V2_RESOURCES)]
+            event = {instance: {
+                'id': str(uuid.uuid4()),
+                'specversion': constants.SPEC_VERSION,
+                'source': source,
+                'type': 'event' + source.replace('/', '.'),
+                'time': self._event_time,
+                'data': {
+                    'version': '1.0',
+                    'values': [{
+                        'data_type': constants.DATA_TYPE_NOTIFICATION,
+                        'ResourceAddress': '/./%s%s' % (NODE_NAME, source),
+                        'value_type': constants.VALUE_TYPE_ENUMERATION,
+                        'value': 'LOCKED'}]}}}
+            # The v1 subscriptions get the v2 events as they are
+            matching = [index for index, subscription in
+                        enumerate(self.subscriptions)
+                        if subscription[0] == 'v1' or
+                        source.startswith(subscription[1])]
+        return event, matching
+
+    def run(self):
+        handler = NotificationHandler(
+            DeliveryEngine(self.args.delivery_workers))
+        listener = concurrent.futures.ThreadPoolExecutor(
+            self.args.listener_threads)
+        period = 1.0 / self.args.rate
+        count = int(self.args.seconds * self.args.rate)
+        start = time.monotonic()
+        for number in range(count):
+            time.sleep(max(0.0, start + number * period - time.monotonic()))
+            event, matching = self.next_event(number)
+            self.events[event_key(event)] = (time.monotonic(), matching)
+            listener.submit(handler.handle, event)
+        submitted = time.monotonic()
+        listener.shutdown(wait=True)
+        drained = self.wait_settled()
+        return start, submitted, drained
+
+    def wait_settled(self):
+        deadline = time.monotonic() + self.args.drain_seconds
+        received = -1
+        while time.monotonic() < deadline:
+            count = sum(len(sink.deliveries) for sink in self.sinks)
+            if count == received:
+                return True
+            received = count
+            time.sleep(SETTLE_SECONDS + self.args.slow_latency)
+        return False
+
+    def report(self, start, submitted, drained):
+        latencies = {False: [], True: []}
+        # Worst latency percentile of each subscriber, by sink speed
+        subscriber_latencies = {}
+        delivered = set()
+        failed = 0
+        last = start
+        for sink in self.sinks:
+            for delivery in sink.deliveries:
+                index = int(delivery.path.rsplit('/', 1)[1])
+                key = body_key(delivery.body)
+                if delivery.failed:
+                    failed += 1
+                    continue
+                if key not in self.events or (index, key) in delivered:
+                    continue
+                delivered.add((index, key))
+                latency = delivery.time - self.events[key][0]
+                latencies[sink.slow].append(latency)
+                subscriber_latencies.setdefault(index, []).append(latency)
+                last = max(last, delivery.time)
+        expected = sum(len(matching) for _, matching in self.events.values())
+        elapsed = last - start
+        v1_count = len([subscription for subscription in self.subscriptions
+                        if subscription[0] == 'v1'])
+        print("%d subscriptions (%d v1, %d v2), %d sinks (%d slow), "
+              "%d events at %g/s"
+              % (len(self.subscriptions), v1_count,
+                 len(self.subscriptions) - v1_count, len(self.sinks),
+                 len([sink for sink in self.sinks if sink.slow]),
+                 len(self.events), self.args.rate))
+        print("%d notifications expected, %d delivered (%.1f%%), %d failed "
+              "by the sinks, %.1f delivered/s, %.1fs to drain"
+              % (expected, len(delivered),
+                 100.0 * len(delivered) / expected if expected else 0.0,
+                 failed, len(delivered) / elapsed if elapsed else 0.0,
+                 last - submitted if last > submitted else 0.0))
+        if not drained:
+            print("deliveries still running after %gs"
+                  % self.args.drain_seconds)
+        print("%-22s %8s %8s %8s %8s %14s"
+              % ('latency ms', 'p50', 'p90', 'p99', 'max',
+                 'worst sub p99'))
+        for slow in [False, True]:
+            ordered = sorted(latencies[slow])
+            if not ordered:
+                continue
+            worst = max(percentile(sorted(values), 0.99)
+                        for index, values in subscriber_latencies.items()
+                        if self.subscriptions[index][2] == slow)
+            print("%-22s %8.1f %8.1f %8.1f %8.1f %14.1f"
+                  % ('slow sinks' if slow else 'fast sinks',
+                     percentile(ordered, 0.5) * 1e3,
+                     percentile(ordered, 0.9) * 1e3,
+                     percentile(ordered, 0.99) * 1e3, ordered[-1] * 1e3,
+                     worst * 1e3))
+        waits = sorted(
+            started - self.events[key][0]
+            for index, key, started in self.starts
+            if key in self.events and not self.subscriptions[index][2])
+        if waits:
+            print("%-22s %8.1f %8.1f %8.1f %8.1f"
+                  % ('head-of-line wait ms', percentile(waits, 0.5) * 1e3,
+                     percentile(waits, 0.9) * 1e3,
+                     percentile(waits, 0.99) * 1e3, waits[-1] * 1e3))
+
+
+def event_key(notification):
+    # EventTimestamp of a v1 event, id of a v2 one
+    if 'ResourceType' in notification:
+        return notification['EventTimestamp']
+    return list(notification.values())[0]['id']
+
+
+def body_key(body):
+    # event_key() of the event a notification was formatted from
+    if 'ResourceType' in body:
+        return body['EventTimestamp']
+    event = list(body.values())[0]
+    if isinstance(event, list):
+        event = event[0]
+    return event['id']
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the sidecar notification delivery')
+    parser.add_argument('--subscriptions', type=int, default=100,
+                        help='subscriptions in the store')
+    parser.add_argument('--v1-ratio', type=float, default=0.5,
+                        help='fraction of v1 subscriptions')
+    parser.add_argument('--rate', type=float, default=10.0,
+                        help='events per second, v1 and v2 in turn')
+    parser.add_argument('--seconds', type=float, default=10.0,
+                        help='seconds events are sent for')
+    parser.add_argument('--sinks', type=int, default=4,
+                        help='sink servers the subscriptions share')
+    parser.add_argument('--slow-sinks', type=int, default=0,
+                        help='sinks answering after --slow-latency')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds a sink takes to answer')
+    parser.add_argument('--slow-latency', type=float, default=1.0,
+                        help='seconds a slow sink takes to answer')
+    parser.add_argument('--failure-rate', type=float, default=0.0,
+                        help='fraction of the notifications answered 500')
+    parser.add_argument('--listener-threads', type=int,
+                        default=LISTENER_THREADS,
+                        help='threads handling the events')
+    parser.add_argument('--delivery-workers', type=int,
+                        default=constants.DELIVERY_WORKERS,
+                        help='threads delivering the notifications')
+    parser.add_argument('--drain-seconds', type=float, default=120.0,
+                        help='longest wait for the deliveries to complete')
+    parser.add_argument('--verbose', action='store_true',
+                        help='keep the sidecar warnings')
+    args = parser.parse_args()
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+    benchmark = DeliveryBenchmark(args)
+    try:
+        benchmark.setup()
+        benchmark.report(*benchmark.run())
+    finally:
+        benchmark.cleanup()
+
+
+if __name__ == '__main__':
+    main()
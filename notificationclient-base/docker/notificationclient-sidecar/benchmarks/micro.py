@@ -0,0 +1,196 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Micro-benchmarks of the text processing the sidecar runs on every
+# notification, against the recorded /sync notifications and resource
+# addresses of fixtures/sync_notifications.json:
+# subscription_helper.parse_resource_address,
+# set_nodename_in_resource_address and format_notification_data.
+# The time per call of every target is compared with the baseline stored
+# in micro_baseline.json. Timings are scaled by a pure Python calibration
+# loop measured in turn with every target, so that a baseline recorded on
+# a machine can be checked on another one.
+# --check exits with 1 when a target is more than --threshold percent
+# slower than its baseline, --save stores the timings as the new baseline.
+#
+# Usage, from notificationclient-base/docker/notificationclient-sidecar:
+#   python3 -m benchmarks.micro [--check] [--save] [--threshold PCT]
+#       [--repeat N]
+#
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import timeit
+
+from notificationclientsdk.common.helpers import subscription_helper
+from notificationclientsdk.model.dto.subscription import SubscriptionInfoV2
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+# /sync notifications of a node as published by the tracking function and
+# resource addresses of subscriptions
+NOTIFICATION_FIXTURE = os.path.join(FIXTURES, 'sync_notifications.json')
+BASELINE = os.path.join(os.path.dirname(__file__), 'micro_baseline.json')
+DEFAULT_THRESHOLD = 25.0
+# Shortest measurement, the number of calls is doubled until reached
+MIN_SECONDS = 0.01
+CALIBRATION_TEXT = ' '.join("'%d'" % number for number in range(100))
+
+
+def calibration():
+    # Fixed pure Python work the timings are expressed against
+    total = 0
+    for word in CALIBRATION_TEXT.split():
+        total += len(word.strip("'"))
+    return total
+
+
+def targets():
+    """Return the (name, function) of the benchmarked calls"""
+    with open(NOTIFICATION_FIXTURE) as f:
+        fixture = json.load(f)
+    addresses = fixture['resource_addresses']
+    notifications = fixture['notifications']
+    # format_notification_data changes the time and the address of the
+    # notifications, restored to the recorded ones before every call
+    recorded = []
+    for notification in notifications:
+        event = list(notification.values())[0]
+        value = event['data']['values'][0]
+        recorded.append((event, event['time'], value,
+                         value['ResourceAddress']))
+    subscription = SubscriptionInfoV2()
+    subscription.ResourceAddress = '/././sync'
+
+    def parse_resource_address():
+        for address in addresses:
+            subscription_helper.parse_resource_address(address)
+
+    def set_nodename_in_resource_address():
+        for address in addresses:
+            subscription_helper.set_nodename_in_resource_address(
+                address, 'controller-1')
+
+    def format_notification_data():
+        for event, time, value, address in recorded:
+            event['time'] = time
+            value['ResourceAddress'] = address
+        for notification in notifications:
+            subscription_helper.format_notification_data(subscription,
+                                                         notification)
+
+    format_notification_data()
+    assert notifications[0]['ptp1']['data']['values'][0][
+        'ResourceAddress'] == '/./controller-0/ptp1/sync/ptp-status/' \
+                              'lock-state'
+    return [
+        ('parse_resource_address', parse_resource_address),
+        ('set_nodename_in_resource_address',
+         set_nodename_in_resource_address),
+        ('format_notification_data', format_notification_data),
+    ]
+
+
+def calls_per_measurement(function):
+    number = 1
+    while timeit.timeit(function, number=number) < MIN_SECONDS:
+        number *= 2
+    return number
+
+
+def measure(function, repeat):
+    """Return the median time per call of a function and its ratio
+
+    The ratio is the median of the time per call over the time per call of
+    the calibration, both measured in turn to see the same CPU frequency.
+    """
+    number = calls_per_measurement(function)
+    calibration_number = calls_per_measurement(calibration)
+    seconds = []
+    ratios = []
+    for _ in range(repeat):
+        calibration_seconds = timeit.timeit(
+            calibration, number=calibration_number) / calibration_number
+        seconds.append(timeit.timeit(function, number=number) / number)
+        ratios.append(seconds[-1] / calibration_seconds)
+    return statistics.median(seconds), statistics.median(ratios)
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def compare(baseline, timings, threshold):
+    """Print the timings against the baseline, return the regressed names"""
+    regressions = []
+    print("%-40s %12s %12s %8s" % ('target', 'baseline us', 'current us',
+                                   'change'))
+    for name, (seconds, ratio) in timings:
+        base = baseline.get(name)
+        if base is None:
+            print("%-40s %12s %12.2f %8s" % (name, '-', seconds * 1e6,
+                                             'new'))
+            continue
+        # As if measured on the machine the baseline was recorded on
+        seconds = base['seconds'] * ratio / base['ratio']
+        change = (ratio / base['ratio'] - 1) * 100
+        slower = change > threshold
+        if slower:
+            regressions.append(name)
+        print("%-40s %12.2f %12.2f %+7.1f%%%s"
+              % (name, base['seconds'] * 1e6, seconds * 1e6, change,
+                 ' SLOWER' if slower else ''))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Micro-benchmark the sidecar parsers')
+    parser.add_argument('--check', action='store_true',
+                        help='exit with 1 when a target regressed')
+    parser.add_argument('--save', action='store_true',
+                        help='store the timings as the new baseline')
+    parser.add_argument('--threshold', type=float,
+                        default=DEFAULT_THRESHOLD,
+                        help='percent slower than the baseline a target '
+                             'may be')
+    parser.add_argument('--repeat', type=int, default=25,
+                        help='measurements per target, the median is '
+                             'kept')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='baseline file')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    timings = [(name, measure(function, args.repeat))
+               for name, function in targets()]
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump({name: {'seconds': seconds, 'ratio': ratio}
+                       for name, (seconds, ratio) in timings},
+                      f, indent=4, sort_keys=True)
+            f.write('\n')
+        print("Baseline stored in %s" % args.baseline)
+        return
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print("No baseline in %s, run with --save" % args.baseline)
+        sys.exit(1 if args.check else 0)
+    regressions = compare(baseline, timings, args.threshold)
+    if regressions and args.check:
+        print("%d target(s) more than %g%% slower than the baseline: %s"
+              % (len(regressions), args.threshold, ', '.join(regressions)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Local HTTP servers standing in for the consumer applications the sidecar
+# delivers notifications to. Every POST is recorded with its arrival time
+# and path, then answered after the latency of the sink, with a 500 for
+# the configured fraction of them.
+#
+import collections
+import http.server
+import json
+import random
+import socketserver
+import threading
+import time
+
+# A notification received by a sink, body is the decoded JSON
+Delivery = collections.namedtuple('Delivery', ['path', 'time', 'body',
+                                               'failed'])
+
+
+class _Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    # Notifications to a subscriber are sent one at a time, many
+    # subscribers share a sink
+    request_queue_size = 128
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        sink = self.server.sink
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        arrival = time.monotonic()
+        failed = sink.fails()
+        sink.record(Delivery(self.path, arrival, json.loads(body.decode()),
+                             failed))
+        if sink.latency:
+            time.sleep(sink.latency)
+        self.send_response(500 if failed else 204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SinkServer:
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.deliveries = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.sink = self
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d' % self._server.server_address[1]
+
+    def fails(self):
+        with self._lock:
+            return self._random.random() < self.failure_rate
+
+    def record(self, delivery):
+        with self._lock:
+            self.deliveries.append(delivery)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='sink', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
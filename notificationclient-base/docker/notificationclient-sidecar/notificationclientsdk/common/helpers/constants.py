@@ -10,6 +10,8 @@ VALUE_TYPE_ENUMERATION = "enumeration"
 VALUE_TYPE_METRIC = "metric"
 
 PTP_V1_KEY = "ptp_notification_v1"
+# Key of the list of v2 statuses carried by a /sync snapshot event
+SYNC_SNAPSHOT_KEY = "sync_snapshot_v2"
 
 SOURCE_SYNC_ALL = '/sync'
 SOURCE_SYNC_GNSS_SYNC_STATUS = '/sync/gnss-status/gnss-sync-status'
@@ -47,3 +49,19 @@ VALID_SOURCE_URI = {
 
 WILDCARD_CURRENT_NODE = '.'
 WILDCARD_ALL_NODES = '*'
+
+# Threads delivering the notifications, a consumer endpoint is served by
+# one of them at a time
+DELIVERY_WORKERS = 8
+# Notifications waiting per consumer endpoint, the oldest is dropped when
+# full
+DELIVERY_QUEUE_SIZE = 64
+# Seconds an endpoint is not delivered to after a slow failed delivery
+DELIVERY_FAILURE_BACKOFF = 5.0
+# Delivery time over which an endpoint is served by half of the workers
+# at most
+DELIVERY_SLOW_SECONDS = 0.25
+
+# Port of the Prometheus metrics endpoint, 0 to disable it
+METRICS_PORT = 0
+METRICS_ADDRESS = "0.0.0.0"
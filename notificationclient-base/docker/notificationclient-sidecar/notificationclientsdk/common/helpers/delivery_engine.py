@@ -0,0 +1,202 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Fan-out of the notifications to the consumer endpoints.
+# Every endpoint has a bounded queue of its own, served by one worker of
+# a fixed pool at a time so that a subscriber gets its notifications in
+# order. The endpoints with notifications waiting take turns on the
+# workers, one notification each. So that a slow or dead consumer only
+# holds up its own notifications, the endpoints whose last delivery was
+# slow share half of the workers and an endpoint that was slow to fail a
+# delivery, as a dead one timing out, is set aside for a while. When the
+# queue of an endpoint is full its oldest notification is dropped.
+#
+import collections
+import logging
+import threading
+import time
+
+from notificationclientsdk.common.helpers import constants
+from notificationclientsdk.common.helpers import log_helper
+
+LOG = logging.getLogger(__name__)
+log_helper.config_logger(LOG)
+
+DeliveryMetrics = collections.namedtuple(
+    'DeliveryMetrics', ['depth', 'endpoints', 'queued', 'dropped',
+                        'delivered', 'skipped', 'failed', 'latency_last',
+                        'latency_max', 'latency_mean'])
+
+
+class DeliveryEngine:
+
+    def __init__(self, workers=constants.DELIVERY_WORKERS,
+                 queue_size=constants.DELIVERY_QUEUE_SIZE,
+                 failure_backoff=constants.DELIVERY_FAILURE_BACKOFF,
+                 slow_seconds=constants.DELIVERY_SLOW_SECONDS):
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.failure_backoff = failure_backoff
+        self.slow_seconds = slow_seconds
+        # Workers the slow endpoints can be served by at the same time
+        self.slow_workers = max(1, self.workers // 2)
+        # Endpoint to the deque of its (deliver, args, queued time). An
+        # endpoint is present while it has deliveries waiting, is served
+        # by a worker or is set aside.
+        self._queues = {}
+        # Endpoints waiting for a worker, in turn
+        self._ready = collections.deque()
+        # Endpoint set aside to the time it is served again
+        self._backoff = {}
+        # Endpoints whose last delivery took longer than slow_seconds or
+        # failed, kept while they have nothing to deliver, and how many of
+        # them are being served
+        self._slow = set()
+        self._slow_active = 0
+        self._condition = threading.Condition()
+        self._threads = []
+        self._stopped = False
+        self.queued = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.skipped = 0
+        self.failed = 0
+        self.latency_last = 0.0
+        self.latency_max = 0.0
+        self._latency_total = 0.0
+
+    def start(self):
+        with self._condition:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run,
+                                          name='delivery-%d' % index,
+                                          daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def submit(self, endpoint, deliver, *args):
+        """Queue deliver(*args) after the deliveries waiting for endpoint
+
+        Never blocks. deliver is called from a worker and returns True when
+        the notification was delivered, None when it was skipped and False
+        when it failed.
+        """
+        with self._condition:
+            queue = self._queues.get(endpoint)
+            if queue is None:
+                queue = self._queues[endpoint] = collections.deque()
+                self._ready.append(endpoint)
+                self._condition.notify()
+            elif len(queue) >= self.queue_size:
+                queue.popleft()
+                self.dropped += 1
+                LOG.warning("Delivery queue of %s full, dropped the oldest "
+                            "notification (%d dropped)"
+                            % (endpoint, self.dropped))
+            queue.append((deliver, args, time.monotonic()))
+            self.queued += 1
+
+    def depth(self):
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def endpoint_depths(self):
+        """Return the number of notifications waiting per endpoint"""
+        with self._condition:
+            return {endpoint: len(queue)
+                    for endpoint, queue in self._queues.items()}
+
+    def metrics(self):
+        with self._condition:
+            depths = [len(queue) for queue in self._queues.values()]
+            completed = self.delivered + self.failed
+            return DeliveryMetrics(
+                sum(depths), len([depth for depth in depths if depth]),
+                self.queued, self.dropped, self.delivered, self.skipped,
+                self.failed, self.latency_last, self.latency_max,
+                self._latency_total / completed if completed else 0.0)
+
+    def _next_endpoint(self):
+        # Called with the condition held, None once stopped
+        while not self._stopped:
+            now = time.monotonic()
+            for endpoint, until in list(self._backoff.items()):
+                if until <= now:
+                    del self._backoff[endpoint]
+                    self._release(endpoint)
+            for index, endpoint in enumerate(self._ready):
+                if endpoint in self._slow:
+                    if self._slow_active >= self.slow_workers:
+                        continue
+                    self._slow_active += 1
+                del self._ready[index]
+                return endpoint
+            timeout = None
+            if self._backoff:
+                timeout = min(self._backoff.values()) - now
+            self._condition.wait(timeout)
+        return None
+
+    def _release(self, endpoint):
+        # Give the endpoint another turn or forget it when it has nothing
+        # to deliver
+        if self._queues[endpoint]:
+            self._ready.append(endpoint)
+            self._condition.notify()
+        else:
+            del self._queues[endpoint]
+
+    def _run(self):
+        while True:
+            with self._condition:
+                endpoint = self._next_endpoint()
+                if endpoint is None:
+                    return
+                deliver, args, queued_time = \
+                    self._queues[endpoint].popleft()
+            started = time.monotonic()
+            try:
+                result = deliver(*args)
+            except Exception as ex:
+                LOG.warning("Failed to deliver to %s: %s" % (endpoint, ex))
+                result = False
+            with self._condition:
+                now = time.monotonic()
+                latency = now - queued_time
+                if endpoint in self._slow:
+                    self._slow_active -= 1
+                    # A slow endpoint may be waiting for this worker
+                    self._condition.notify()
+                if result is None:
+                    self.skipped += 1
+                    self._release(endpoint)
+                    continue
+                slow = now - started > self.slow_seconds
+                if result and not slow:
+                    self._slow.discard(endpoint)
+                else:
+                    self._slow.add(endpoint)
+                if result:
+                    self.delivered += 1
+                else:
+                    self.failed += 1
+                self.latency_last = latency
+                self.latency_max = max(self.latency_max, latency)
+                self._latency_total += latency
+                if not result and slow and self.failure_backoff > 0:
+                    self._backoff[endpoint] = now + self.failure_backoff
+                    # Workers waiting have to reconsider their timeout
+                    self._condition.notify_all()
+                else:
+                    self._release(endpoint)
@@ -0,0 +1,79 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Prometheus/OpenMetrics endpoint of the sidecar.
+# The notification delivery counters, queue depths and latencies are read
+# from the delivery engine when the endpoint is scraped. The
+# prometheus_client package is optional, without it the endpoint is not
+# started.
+#
+import logging
+
+from notificationclientsdk.common.helpers import constants
+from notificationclientsdk.common.helpers import log_helper
+
+try:
+    import prometheus_client
+    from prometheus_client.core import CounterMetricFamily
+    from prometheus_client.core import GaugeMetricFamily
+except ImportError:
+    prometheus_client = None
+
+LOG = logging.getLogger(__name__)
+log_helper.config_logger(LOG)
+
+PREFIX = 'ptp_notification_client_'
+
+
+class DeliveryMetricsCollector:
+
+    def __init__(self, delivery_engine):
+        self.delivery_engine = delivery_engine
+
+    def collect(self):
+        metrics = self.delivery_engine.metrics()
+        notifications = CounterMetricFamily(
+            PREFIX + 'delivery_notifications',
+            'Notifications queued for the consumer endpoints, by outcome',
+            labels=['outcome'])
+        for outcome in ['queued', 'dropped', 'delivered', 'skipped',
+                        'failed']:
+            notifications.add_metric([outcome], getattr(metrics, outcome))
+        depth = GaugeMetricFamily(
+            PREFIX + 'delivery_queue_depth',
+            'Notifications waiting to be delivered')
+        depth.add_metric([], metrics.depth)
+        endpoint_depth = GaugeMetricFamily(
+            PREFIX + 'delivery_endpoint_queue_depth',
+            'Notifications waiting to be delivered to a consumer endpoint',
+            labels=['endpoint'])
+        for endpoint, endpoint_queue_depth in \
+                self.delivery_engine.endpoint_depths().items():
+            endpoint_depth.add_metric([str(endpoint)], endpoint_queue_depth)
+        latency = GaugeMetricFamily(
+            PREFIX + 'delivery_latency_seconds',
+            'Time from queuing to delivering a notification, retries '
+            'included', labels=['statistic'])
+        latency.add_metric(['last'], metrics.latency_last)
+        latency.add_metric(['max'], metrics.latency_max)
+        latency.add_metric(['mean'], metrics.latency_mean)
+        return [notifications, depth, endpoint_depth, latency]
+
+
+def start_metrics_exporter(delivery_engine, port,
+                           address=constants.METRICS_ADDRESS):
+    """Serve the metrics of a delivery engine over http, return the registry"""
+    if prometheus_client is None:
+        LOG.warning("prometheus_client is not installed, metrics are not "
+                    "exported")
+        return None
+    registry = prometheus_client.CollectorRegistry(auto_describe=False)
+    registry.register(DeliveryMetricsCollector(delivery_engine))
+    prometheus_client.start_http_server(port, addr=address,
+                                        registry=registry)
+    LOG.info("Exporting metrics on %s:%d" % (address, port))
+    return registry
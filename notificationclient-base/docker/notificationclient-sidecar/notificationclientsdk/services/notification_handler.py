@@ -4,6 +4,7 @@
 # SPDX-License-Identifier: Apache-2.0
 #
 
+import copy
 import json
 import logging
 
@@ -18,7 +19,9 @@ from notificationclientsdk.model.dto.resourcetype import ResourceType
 
 from notificationclientsdk.repository.subscription_repo import SubscriptionRepo
 
+from notificationclientsdk.common.helpers import constants
 from notificationclientsdk.common.helpers import subscription_helper
+from notificationclientsdk.common.helpers.delivery_engine import DeliveryEngine
 from notificationclientsdk.common.helpers.nodeinfo_helper import NodeInfoHelper
 
 from notificationclientsdk.client.notificationservice import NotificationHandlerBase
@@ -32,14 +35,19 @@ log_helper.config_logger(LOG)
 
 class NotificationHandler(NotificationHandlerBase):
 
-    def __init__(self):
+    def __init__(self, delivery_engine=None):
         self.__supported_resource_types = (ResourceType.TypePTP,)
         self.__init_notification_channel()
-        pass
+        # The notifications are delivered from the workers of the engine,
+        # handle() only queues them
+        self.delivery_engine = delivery_engine or DeliveryEngine()
+        self.delivery_engine.start()
 
     def __init_notification_channel(self):
         self.notification_lock = threading.Lock()
         self.notification_stat = {}
+        # Updated from the delivery workers
+        self.notification_stat_lock = threading.Lock()
 
     # def handle_notification_delivery(self, notification_info):
     def handle(self, notification_info):
@@ -49,6 +57,11 @@ class NotificationHandler(NotificationHandlerBase):
         try:
             self.notification_lock.acquire()
             subscription_repo = SubscriptionRepo(autocommit=True)
+            snapshot = notification_info.get(constants.SYNC_SNAPSHOT_KEY, None)
+            if snapshot is not None:
+                self.__deliver_snapshot(subscription_repo, snapshot)
+                LOG.debug("Finished snapshot delivery")
+                return True
             resource_type = notification_info.get('ResourceType', None)
             # Get nodename from resource address
             if resource_type:
@@ -97,29 +110,21 @@ class NotificationHandler(NotificationHandlerBase):
                 if not node_name_matched:
                     continue
 
-                try:
-                    last_delivery_time = self.__get_latest_delivery_timestamp(node_name,
-                                                                              subscriptionid)
-                    if last_delivery_time and last_delivery_time >= this_delivery_time:
-                        # skip this entry since already delivered
-                        LOG.debug("Ignore the outdated notification for: {0}".format(
-                            entry.SubscriptionId))
-                        continue
-
-                    subscription_helper.notify(subscription_dto2, notification_info)
-                    LOG.debug("notification is delivered successfully to {0}".format(
+                last_delivery_time = self.__get_latest_delivery_timestamp(node_name,
+                                                                          subscriptionid)
+                if last_delivery_time and last_delivery_time >= this_delivery_time:
+                    # skip this entry since already delivered
+                    LOG.debug("Ignore the outdated notification for: {0}".format(
                         entry.SubscriptionId))
-
-                    self.update_delivery_timestamp(node_name, subscriptionid, this_delivery_time)
-
-                except Exception as ex:
-                    LOG.warning("notification is not delivered to {0}:{1}".format(
-                        entry.SubscriptionId, str(ex)))
-                    # proceed to next entry
                     continue
-                finally:
-                    pass
-            LOG.debug("Finished notification delivery")
+
+                # Each delivery gets its own copy, format_notification_data
+                # changes the notification in place from a delivery worker
+                self.delivery_engine.submit(
+                    subscription_dto2.EndpointUri, self.__deliver, subscription_dto2,
+                    copy.deepcopy(notification_info), node_name, subscriptionid,
+                    this_delivery_time)
+            LOG.debug("Finished queuing the notification delivery")
             return True
         except Exception as ex:
             LOG.warning("Failed to delivery notification:{0}".format(str(ex)))
@@ -129,31 +134,118 @@ class NotificationHandler(NotificationHandlerBase):
             if not subscription_repo:
                 del subscription_repo
 
+    def __deliver(self, subscription_dto2, notification_info, node_name, subscriptionid,
+                  this_delivery_time):
+        # Called from a delivery worker, a newer notification may have been
+        # delivered since this one was queued
+        last_delivery_time = self.__get_latest_delivery_timestamp(node_name, subscriptionid)
+        if last_delivery_time and last_delivery_time >= this_delivery_time:
+            LOG.debug("Ignore the outdated notification for: {0}".format(subscriptionid))
+            return None
+        try:
+            subscription_helper.notify(subscription_dto2, notification_info)
+        except Exception as ex:
+            LOG.warning("notification is not delivered to {0}:{1}".format(
+                subscriptionid, str(ex)))
+            return False
+        LOG.debug("notification is delivered successfully to {0}".format(subscriptionid))
+        self.update_delivery_timestamp(node_name, subscriptionid, this_delivery_time)
+        return True
+
+    def __deliver_snapshot(self, subscription_repo, snapshot):
+        # A /sync snapshot carries the v2 statuses of all the resources changed
+        # in a monitoring cycle of a tracking function. They are queued as a
+        # single delivery per subscription, oldest first.
+        items = []
+        for ptpstatus in snapshot:
+            for instance, event in ptpstatus.items():
+                values = event.get('data', {}).get('values', [])
+                resource_address = values[0].get('ResourceAddress', None) if values else None
+                if not resource_address:
+                    LOG.warning("No resource address in snapshot status {0}".format(instance))
+                    continue
+                _, node_name, resource_path, _, _ = \
+                        subscription_helper.parse_resource_address(resource_address)
+                items.append((event.get('time'), node_name, resource_path, {instance: event}))
+        items.sort(key=lambda item: item[0])
+
+        entries = subscription_repo.get(Status=1)
+        for entry in entries:
+            subscriptionid = entry.SubscriptionId
+            if entry.ResourceAddress:
+                _, entry_node_name, entry_resource_path, _, _ = \
+                        subscription_helper.parse_resource_address(entry.ResourceAddress)
+                subscription_dto2 = SubscriptionInfoV2(entry)
+            else:
+                ResourceQualifierJson = entry.ResourceQualifierJson or '{}'
+                ResourceQualifier = json.loads(ResourceQualifierJson)
+                entry_node_name = ResourceQualifier.get('NodeName', None)
+                entry_resource_path = None
+                subscription_dto2 = SubscriptionInfoV1(entry)
+
+            matching = [item for item in items
+                        if (not entry_resource_path or
+                            item[2].startswith(entry_resource_path)) and
+                        NodeInfoHelper.match_node_name(entry_node_name, item[1])]
+            if matching:
+                # The statuses are formatted in place when delivered, each
+                # subscription gets its own copy
+                self.delivery_engine.submit(
+                    subscription_dto2.EndpointUri, self.__deliver_snapshot_items,
+                    subscription_dto2, subscriptionid, copy.deepcopy(matching))
+
+    def __deliver_snapshot_items(self, subscription_dto2, subscriptionid, items):
+        # Called from a delivery worker with the snapshot statuses matching
+        # the subscription
+        last_delivery_times = {}
+        result = None
+        for this_delivery_time, node_name, _, notification in items:
+            if node_name not in last_delivery_times:
+                # Read once, the statuses of the snapshot sharing a
+                # timestamp are all delivered
+                last_delivery_times[node_name] = \
+                    self.__get_latest_delivery_timestamp(node_name, subscriptionid)
+            last_delivery_time = last_delivery_times[node_name]
+            if last_delivery_time and last_delivery_time >= this_delivery_time:
+                LOG.debug("Ignore the outdated notification for: {0}".format(
+                    subscriptionid))
+                continue
+            try:
+                subscription_helper.notify(subscription_dto2, notification)
+                self.update_delivery_timestamp(node_name, subscriptionid, this_delivery_time)
+                result = True
+            except Exception as ex:
+                LOG.warning("notification is not delivered to {0}:{1}".format(
+                    subscriptionid, str(ex)))
+                return False
+        return result
+
     def __get_latest_delivery_timestamp(self, node_name, subscriptionid):
         last_delivery_stat = self.notification_stat.get(node_name, {}).get(subscriptionid, {})
         last_delivery_time = last_delivery_stat.get('EventTimestamp', None)
         return last_delivery_time
 
     def update_delivery_timestamp(self, node_name, subscriptionid, this_delivery_time):
-        if not self.notification_stat.get(node_name, None):
-            self.notification_stat[node_name] = {
-                subscriptionid: {
+        with self.notification_stat_lock:
+            if not self.notification_stat.get(node_name, None):
+                self.notification_stat[node_name] = {
+                    subscriptionid: {
+                        'EventTimestamp': this_delivery_time
+                    }
+                }
+                LOG.debug("delivery time @node: {0},subscription:{1} is added".format(
+                    node_name, subscriptionid))
+            elif not self.notification_stat[node_name].get(subscriptionid, None):
+                self.notification_stat[node_name][subscriptionid] = {
                     'EventTimestamp': this_delivery_time
                 }
-            }
-            LOG.debug("delivery time @node: {0},subscription:{1} is added".format(
-                node_name, subscriptionid))
-        elif not self.notification_stat[node_name].get(subscriptionid, None):
-            self.notification_stat[node_name][subscriptionid] = {
-                'EventTimestamp': this_delivery_time
-            }
-            LOG.debug("delivery time @node: {0},subscription:{1} is added".format(
-                node_name, subscriptionid))
-        else:
-            last_delivery_stat = self.notification_stat.get(node_name, {}).get(subscriptionid, {})
-            last_delivery_time = last_delivery_stat.get('EventTimestamp', None)
-            if (last_delivery_time and last_delivery_time >= this_delivery_time):
-                return
-            last_delivery_stat['EventTimestamp'] = this_delivery_time
-            LOG.debug("delivery time @node: {0},subscription:{1} is updated".format(
-                node_name, subscriptionid))
+                LOG.debug("delivery time @node: {0},subscription:{1} is added".format(
+                    node_name, subscriptionid))
+            else:
+                last_delivery_stat = self.notification_stat.get(node_name, {}).get(subscriptionid, {})
+                last_delivery_time = last_delivery_stat.get('EventTimestamp', None)
+                if (last_delivery_time and last_delivery_time >= this_delivery_time):
+                    return
+                last_delivery_stat['EventTimestamp'] = this_delivery_time
+                LOG.debug("delivery time @node: {0},subscription:{1} is updated".format(
+                    node_name, subscriptionid))
@@ -16,9 +16,14 @@ if sys.version > '3':
 else:
     import Queue
 
+from notificationclientsdk.common.helpers import constants
 from notificationclientsdk.common.helpers import subscription_helper
 from notificationclientsdk.common.helpers.nodeinfo_helper import NodeInfoHelper
 from notificationclientsdk.common.helpers import log_helper
+from notificationclientsdk.common.helpers.delivery_engine import \
+    DeliveryEngine
+from notificationclientsdk.common.helpers.metrics_exporter import \
+    start_metrics_exporter
 
 from notificationclientsdk.model.dto.subscription import SubscriptionInfoV1
 from notificationclientsdk.model.dto.resourcetype import ResourceType
@@ -76,7 +81,17 @@ class NotificationWorker:
 
         self.__locationinfo_handler = \
             NotificationWorker.LocationInfoHandler(self)
-        self.__notification_handler = NotificationHandler()
+        self.delivery_engine = DeliveryEngine(
+            int(daemon_context.get('DELIVERY_WORKERS',
+                                   constants.DELIVERY_WORKERS)),
+            int(daemon_context.get('DELIVERY_QUEUE_SIZE',
+                                   constants.DELIVERY_QUEUE_SIZE)))
+        self.__notification_handler = NotificationHandler(
+            self.delivery_engine)
+        metrics_port = int(daemon_context.get('METRICS_PORT',
+                                              constants.METRICS_PORT))
+        if metrics_port:
+            start_metrics_exporter(self.delivery_engine, metrics_port)
         self.broker_connection_manager = BrokerConnectionManager(
             self.__locationinfo_handler,
             self.__notification_handler,
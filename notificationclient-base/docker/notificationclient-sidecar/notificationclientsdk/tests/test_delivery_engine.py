@@ -0,0 +1,186 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import threading
+import time
+import unittest
+
+from notificationclientsdk.common.helpers.delivery_engine import \
+    DeliveryEngine
+
+TIMEOUT = 5
+
+
+def wait_for(predicate, timeout=TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class DeliveryEngineTests(unittest.TestCase):
+
+    def engine(self, **kwargs):
+        engine = DeliveryEngine(**kwargs)
+        self.addCleanup(engine.stop)
+        return engine
+
+    def test_turns(self):
+        # Endpoints with notifications waiting are served one notification
+        # each in turn, in the order they were queued
+        engine = self.engine(workers=1)
+        delivered = []
+        for endpoint, number in [('a', 1), ('a', 2), ('b', 1), ('b', 2),
+                                 ('c', 1)]:
+            engine.submit(endpoint, lambda *args: delivered.append(args) or
+                          True, endpoint, number)
+        engine.start()
+        self.assertTrue(wait_for(lambda: len(delivered) == 5))
+        self.assertEqual(delivered, [('a', 1), ('b', 1), ('c', 1), ('a', 2),
+                                     ('b', 2)])
+        self.assertTrue(wait_for(lambda: not engine.endpoint_depths()))
+
+    def test_endpoint_order(self):
+        engine = self.engine(workers=4, queue_size=50)
+        lock = threading.Lock()
+        active = set()
+        overlaps = []
+        delivered = {'a': [], 'b': []}
+
+        def deliver(endpoint, number):
+            with lock:
+                if endpoint in active:
+                    overlaps.append((endpoint, number))
+                active.add(endpoint)
+            time.sleep(0.001)
+            with lock:
+                active.discard(endpoint)
+                delivered[endpoint].append(number)
+            return True
+
+        engine.start()
+        for number in range(20):
+            engine.submit('a', deliver, 'a', number)
+            engine.submit('b', deliver, 'b', number)
+        self.assertTrue(wait_for(lambda: engine.metrics().delivered == 40))
+        self.assertEqual(overlaps, [])
+        self.assertEqual(delivered['a'], list(range(20)))
+        self.assertEqual(delivered['b'], list(range(20)))
+
+    def test_drop_oldest(self):
+        engine = self.engine(workers=1, queue_size=2)
+        delivered = []
+        for number in range(4):
+            engine.submit('a', lambda number: delivered.append(number) or
+                          True, number)
+        self.assertEqual(engine.endpoint_depths(), {'a': 2})
+        metrics = engine.metrics()
+        self.assertEqual(metrics.depth, 2)
+        self.assertEqual(metrics.endpoints, 1)
+        self.assertEqual(metrics.queued, 4)
+        self.assertEqual(metrics.dropped, 2)
+        engine.start()
+        self.assertTrue(wait_for(lambda: engine.metrics().delivered == 2))
+        self.assertEqual(delivered, [2, 3])
+
+    def test_outcomes(self):
+        engine = self.engine(workers=1, failure_backoff=0)
+
+        def deliver(result):
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        for result in [True, None, False, Exception('unreachable')]:
+            engine.submit('a', deliver, result)
+        engine.start()
+        self.assertTrue(wait_for(lambda: engine.depth() == 0 and
+                                 engine.metrics().failed == 2))
+        metrics = engine.metrics()
+        self.assertEqual(metrics.delivered, 1)
+        self.assertEqual(metrics.skipped, 1)
+        self.assertGreater(metrics.latency_max, 0.0)
+        self.assertGreaterEqual(metrics.latency_max, metrics.latency_mean)
+
+    def test_slow_endpoints_share_half_of_the_workers(self):
+        engine = self.engine(workers=4, slow_seconds=TIMEOUT)
+        self.assertEqual(engine.slow_workers, 2)
+        engine.start()
+        # A failed delivery marks an endpoint slow, a fast failure does not
+        # set it aside
+        for endpoint in ['s1', 's2', 's3']:
+            engine.submit(endpoint, lambda: False)
+        self.assertTrue(wait_for(lambda: engine.metrics().failed == 3))
+
+        release = threading.Event()
+        started = []
+
+        def blocked(endpoint):
+            started.append(endpoint)
+            release.wait(TIMEOUT)
+            return True
+
+        for endpoint in ['s1', 's2', 's3']:
+            engine.submit(endpoint, blocked, endpoint)
+        self.assertTrue(wait_for(lambda: len(started) == 2))
+        fast = threading.Event()
+        engine.submit('f', lambda: fast.set() or True)
+        # Served by the workers the slow endpoints cannot take
+        self.assertTrue(fast.wait(TIMEOUT))
+        self.assertEqual(len(started), 2)
+        self.assertEqual(engine.endpoint_depths()[started[0]], 0)
+        self.assertEqual(engine.depth(), 1)
+
+        release.set()
+        self.assertTrue(wait_for(lambda: len(started) == 3))
+        self.assertEqual(sorted(started), ['s1', 's2', 's3'])
+        # Delivering fast again puts an endpoint back with the others
+        self.assertTrue(wait_for(lambda: engine.metrics().delivered == 4))
+        self.assertEqual(engine._slow, set())
+
+    def test_failure_backoff(self):
+        engine = self.engine(workers=2, failure_backoff=0.5, slow_seconds=0)
+        calls = []
+
+        def deliver(name, result):
+            calls.append((name, time.monotonic()))
+            return result
+
+        engine.submit('a', deliver, 'a1', False)
+        engine.submit('a', deliver, 'a2', True)
+        engine.start()
+        self.assertTrue(wait_for(lambda: engine.metrics().failed == 1))
+        # The other endpoints are served meanwhile
+        engine.submit('b', deliver, 'b1', True)
+        self.assertTrue(wait_for(lambda: engine.metrics().delivered == 2))
+        times = dict(calls)
+        self.assertEqual([name for name, _ in calls], ['a1', 'b1', 'a2'])
+        self.assertGreaterEqual(times['a2'] - times['a1'], 0.5)
+
+    def test_fast_failure_not_set_aside(self):
+        engine = self.engine(workers=1, failure_backoff=60,
+                             slow_seconds=TIMEOUT)
+        engine.submit('a', lambda: False)
+        engine.submit('a', lambda: True)
+        engine.start()
+        self.assertTrue(wait_for(lambda: engine.metrics().delivered == 1))
+        self.assertEqual(engine._backoff, {})
+
+    def test_stop(self):
+        engine = self.engine(workers=2)
+        engine.start()
+        threads = list(engine._threads)
+        # Starting again keeps the same workers
+        engine.start()
+        self.assertEqual(engine._threads, threads)
+        engine.stop()
+        for thread in threads:
+            thread.join(TIMEOUT)
+            self.assertFalse(thread.is_alive())
+        engine.submit('a', lambda: True)
+        self.assertEqual(engine.depth(), 1)
+        self.assertEqual(engine.metrics().delivered, 0)
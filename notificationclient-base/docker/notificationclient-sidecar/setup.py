@@ -24,5 +24,5 @@ setup(
     test_suite='sidecar',
     zip_safe=False,
     include_package_data=True,
-    packages=find_packages(exclude=['ez_setup'])
+    packages=find_packages(exclude=['ez_setup', 'benchmarks', 'benchmarks.*'])
 )
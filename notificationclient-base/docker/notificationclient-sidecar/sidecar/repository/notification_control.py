@@ -23,6 +23,12 @@ NOTIFICATION_BROKER_USER = os.environ.get("NOTIFICATIONSERVICE_USER", "admin")
 NOTIFICATION_BROKER_PASS = os.environ.get("NOTIFICATIONSERVICE_PASS", "admin")
 NOTIFICATION_BROKER_PORT = os.environ.get("NOTIFICATIONSERVICE_PORT", "5672")
 
+# Notification delivery workers, queue length per consumer endpoint and port
+# of the Prometheus metrics endpoint, 0 to disable it
+DELIVERY_WORKERS = os.environ.get("DELIVERY_WORKERS", "8")
+DELIVERY_QUEUE_SIZE = os.environ.get("DELIVERY_QUEUE_SIZE", "64")
+METRICS_PORT = os.environ.get("METRICS_PORT", "0")
+
 REGISTRATION_TRANSPORT_ENDPOINT = 'rabbit://{0}:{1}@{2}:{3}'.format(
   REGISTRATION_USER, REGISTRATION_PASS, REGISTRATION_HOST, REGISTRATION_PORT)
 
@@ -36,7 +42,10 @@ daemon_context = {
     'REGISTRATION_TRANSPORT_ENDPOINT': REGISTRATION_TRANSPORT_ENDPOINT,
     'NOTIFICATION_BROKER_USER': NOTIFICATION_BROKER_USER,
     'NOTIFICATION_BROKER_PASS': NOTIFICATION_BROKER_PASS,
-    'NOTIFICATION_BROKER_PORT': NOTIFICATION_BROKER_PORT
+    'NOTIFICATION_BROKER_PORT': NOTIFICATION_BROKER_PORT,
+    'DELIVERY_WORKERS': DELIVERY_WORKERS,
+    'DELIVERY_QUEUE_SIZE': DELIVERY_QUEUE_SIZE,
+    'METRICS_PORT': METRICS_PORT
 }
 NodeInfoHelper.set_residing_node(THIS_NODE_NAME)
 notification_control = DaemonControl(daemon_context)
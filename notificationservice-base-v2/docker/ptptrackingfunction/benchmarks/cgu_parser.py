@@ -0,0 +1,106 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Benchmark of the cgu output parser against the mock Logan Beach and
+# Westport Channel outputs used by the unit tests.
+# Compares the previous re.split based parser, the single pass parser and
+# the unchanged output short-circuit.
+#
+# Usage, from notificationservice-base-v2/docker/ptptrackingfunction:
+#   python3 -m benchmarks.cgu_parser [--number N]
+#
+import argparse
+import os
+import re
+import timeit
+
+from trackingfunctionsdk.common.helpers.cgu_handler import CguHandler
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir,
+                        'trackingfunctionsdk', 'tests', 'test_input_files')
+CGU_FIXTURES = ['mock_cgu_output_logan_beach',
+                'mock_cgu_output_westport_channel']
+
+
+def legacy_cgu_output_to_dict(cgu_output_raw):
+    # The parser CguHandler used before the single pass parser
+    cgu_output = cgu_output_raw.splitlines()
+    cgu_dict = {'input': {},
+                'EEC DPLL': {'Current reference': '', 'Status': ''},
+                'PPS DPLL': {'Current reference': '', 'Status': '',
+                             'Phase offset': ''}}
+    for index, line in enumerate(cgu_output):
+        if "input (idx)" in line:
+            table_start = index + 2
+        if "EEC DPLL:" in line:
+            dpll_start = index
+            table_end = index - 1
+    for line in cgu_output[table_start:table_end]:
+        cgu_dict['input'].update({
+            re.split(' +', line)[1]: {
+                'state': re.split(' +', line)[4],
+                'priority': {
+                    'EEC': re.split(' +', line)[6],
+                    'PPS': re.split(' +', line)[8]
+                }
+            }
+        })
+    cgu_dict['EEC DPLL']['Current reference'] = \
+        re.split('[ \t]+', cgu_output[dpll_start + 1])[-1]
+    cgu_dict['EEC DPLL']['Status'] = \
+        re.split('[ \t]+', cgu_output[dpll_start + 2])[-1]
+    cgu_dict['PPS DPLL']['Current reference'] = \
+        re.split('[ \t]+', cgu_output[dpll_start + 5])[-1]
+    cgu_dict['PPS DPLL']['Status'] = \
+        re.split('[ \t]+', cgu_output[dpll_start + 6])[-1]
+    cgu_dict['PPS DPLL']['Phase offset'] = \
+        re.split('[ \t]+', cgu_output[dpll_start + 7])[-1]
+    return cgu_dict
+
+
+def run(number):
+    results = []
+    for fixture in CGU_FIXTURES:
+        with open(os.path.join(FIXTURES, fixture)) as f:
+            cgu_output = f.read()
+        handler = CguHandler(None)
+
+        def parse():
+            # Forget the last parse, as if the content changed
+            handler.cgu_output_raw = cgu_output
+            handler._cgu_output_parsed_raw = None
+            handler.cgu_output_to_dict()
+
+        def unchanged():
+            handler.cgu_output_raw = cgu_output
+            handler.cgu_output_to_dict()
+
+        parse()
+        assert handler.cgu_output_parsed == \
+            legacy_cgu_output_to_dict(cgu_output), fixture
+        for name, function in [
+                ('legacy', lambda: legacy_cgu_output_to_dict(cgu_output)),
+                ('single pass', parse),
+                ('unchanged', unchanged)]:
+            seconds = min(timeit.repeat(function, number=number, repeat=5))
+            results.append((fixture, name, seconds / number * 1e6))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the cgu output parser')
+    parser.add_argument('--number', type=int, default=2000,
+                        help='parses per measurement')
+    args = parser.parse_args()
+    print("%-34s %-12s %10s" % ('fixture', 'parser', 'us/parse'))
+    for fixture, name, microseconds in run(args.number):
+        print("%-34s %-12s %10.2f" % (fixture, name, microseconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Benchmark of the per event cost of the v2 notifications.
+# Compares building the CloudEvent by hand, as the daemon did before the
+# event encoder, against the encoder templates, for a state change
+# published to the four topics of a resource and for QueryStatus requests
+# of an unchanged state. Every cast is JSON encoded the way the oslo
+# transport encodes the message, with debug logging disabled.
+#
+# Usage, from notificationservice-base-v2/docker/ptptrackingfunction:
+#   python3 -m benchmarks.event_encoder [--number N]
+#
+import argparse
+import itertools
+import json
+import logging
+import timeit
+
+from oslo_utils import uuidutils
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import ptpsync as utils
+from trackingfunctionsdk.common.helpers.event_encoder import EventEncoder
+from trackingfunctionsdk.common.helpers.event_encoder import SOURCE_TYPE
+
+NODE_NAME = 'controller-0'
+INSTANCE = 'ptp4l-legacy'
+RESOURCE = constants.SOURCE_SYNC_PTP_LOCK_STATE
+# Local resource and /sync topics, each on the local and registration
+# brokers
+TOPICS = ['%s-Event-v2-%s' % (RESOURCE, NODE_NAME),
+          'PTP-Event-v2-*',
+          '%s-Event-v2-%s' % (constants.SOURCE_SYNC_ALL, NODE_NAME),
+          'PTP-Event-v2-*']
+
+LOG = logging.getLogger('benchmarks.event_encoder')
+LOG.setLevel(logging.INFO)
+
+
+def legacy_event(node_name, sync_state, event_time):
+    # The event the daemon built by hand before the event encoder
+    resource_address = utils.format_resource_address(node_name, RESOURCE)
+    return {
+        'id': uuidutils.generate_uuid(),
+        'specversion': constants.SPEC_VERSION,
+        'source': RESOURCE,
+        'type': SOURCE_TYPE[RESOURCE],
+        'time': event_time,
+        'data': {
+            'version': constants.DATA_VERSION,
+            'values': [
+                {
+                    'data_type': constants.DATA_TYPE_NOTIFICATION,
+                    'ResourceAddress': resource_address,
+                    'value_type': constants.VALUE_TYPE_ENUMERATION,
+                    'value': sync_state.upper()
+                }
+            ]
+        }
+    }
+
+
+def cast(topic, notification):
+    return json.dumps({'method': 'NotifyStatus',
+                       'args': {'notification': notification}})
+
+
+def legacy_publish(event_time):
+    status = {INSTANCE: legacy_event(NODE_NAME, 'Locked', event_time)}
+    for topic in TOPICS:
+        cast(topic, status)
+        LOG.debug("Published ptp status:{0}@Topic:{1}".format(status, topic))
+
+
+def encoder_publish(encoder, event_time):
+    status = {INSTANCE: encoder.encode(RESOURCE, 'Locked', event_time,
+                                       INSTANCE)}
+    for topic in TOPICS:
+        cast(topic, status)
+        LOG.debug("Published ptp status:%s@Topic:%s", status, topic)
+
+
+def run(number):
+    encoder = EventEncoder(NODE_NAME)
+    event_time = 1700000000.0
+    legacy = legacy_event(NODE_NAME, 'Locked', event_time)
+    encoded = encoder.encode(RESOURCE, 'Locked', event_time, INSTANCE)
+    legacy['id'] = encoded['id']
+    assert legacy == encoded
+
+    # Every publish is a new event
+    times = itertools.count(event_time)
+    scenarios = [
+        ('publish', 'legacy', lambda: legacy_publish(next(times))),
+        ('publish', 'encoder', lambda: encoder_publish(encoder, next(times))),
+        ('query', 'legacy',
+         lambda: legacy_event(NODE_NAME, 'Locked', event_time)),
+        ('query', 'encoder',
+         lambda: encoder.encode(RESOURCE, 'Locked', event_time, INSTANCE)),
+    ]
+    results = []
+    for scenario, name, function in scenarios:
+        seconds = min(timeit.repeat(function, number=number, repeat=5))
+        results.append((scenario, name, seconds / number * 1e6))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the v2 event encoding')
+    parser.add_argument('--number', type=int, default=20000,
+                        help='events per measurement')
+    args = parser.parse_args()
+    print("%-10s %-10s %10s" % ('scenario', 'encoding', 'us/event'))
+    for scenario, name, microseconds in run(args.number):
+        print("%-10s %-10s %10.2f" % (scenario, name, microseconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Fake PTP host for the tracking loop benchmarks.
+# Stands up in a temporary directory what the monitors read on a node:
+# ptp4l, ts2phc and phc2sys configs and pidfiles, a pmc answering for
+# every ptp4l instance, a phc_ctl, the phc2sys command line in procfs, the
+# sysfs links of the GNSS serialports and PHCs, the cgu debugfs files and
+# a phc2sys HA com socket. While started, the paths of the tracking
+# function point into the directory and pmc is run as a session.
+#
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import os_clock_monitor
+from trackingfunctionsdk.common.helpers import pmc_session
+from trackingfunctionsdk.common.helpers import ptp_monitor
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir,
+                        'trackingfunctionsdk', 'tests', 'test_input_files')
+CGU_FIXTURE = 'mock_cgu_output_logan_beach'
+
+PHC2SYS_SERVICE_NAME = 'phc2sys1'
+PHC_INTERFACE = 'ens1f0'
+PHC_DEVICE = 'ptp0'
+PHC2SYS_PID = 4242
+
+# Answers the pmc commands of the command line, or of each line read from
+# stdin when there are none, printing the responses the way pmc does.
+# Every flap_seconds the clock class of the instance switches between 6
+# and 7, both locked, so that every instance publishes clock class events.
+FAKE_PMC = r'''#!%(python)s
+import random
+import sys
+import time
+import zlib
+
+FLAP_SECONDS = %(flap_seconds)r
+OPTIONS_WITH_VALUE = ('-b', '-d', '-f', '-i', '-s', '-t')
+
+args = sys.argv[1:]
+commands = []
+config = ''
+while args:
+    arg = args.pop(0)
+    if arg in OPTIONS_WITH_VALUE and args:
+        value = args.pop(0)
+        if arg == '-f':
+            config = value
+    elif not arg.startswith('-'):
+        commands.append(arg)
+
+checksum = zlib.crc32(config.encode())
+identity = '507c6f.fffe.%%06x' %% (checksum & 0xffffff)
+phase = checksum %% 1000 / 1000.0
+
+
+def datasets():
+    clock_class = '6'
+    if FLAP_SECONDS and int(time.time() / FLAP_SECONDS + phase) %% 2:
+        clock_class = '7'
+    return {
+        'PORT_DATA_SET': [('portIdentity', identity + '-1'),
+                          ('portState', 'SLAVE')],
+        'TIME_STATUS_NP': [('master_offset', random.randint(-20, 20)),
+                           ('gmPresent', 'true')],
+        'PARENT_DATA_SET': [('gm.ClockClass', clock_class),
+                            ('grandmasterIdentity', '001122.fffe.334455')],
+        'TIME_PROPERTIES_DATA_SET': [('currentUtcOffset', 37),
+                                     ('currentUtcOffsetValid', 1),
+                                     ('timeTraceable', 1)],
+        'DEFAULT_DATA_SET': [('numberPorts', 1),
+                             ('clockIdentity', identity),
+                             ('clockClass', clock_class)],
+    }
+
+
+def respond(sequence_id, command):
+    lines = ['sending: %%s' %% command]
+    dataset = command.split()[-1]
+    values = datasets().get(dataset)
+    if values is None:
+        lines.append('\t%%s-0 seq %%d RESPONSE MANAGEMENT_ERROR_STATUS '
+                     %% (identity, sequence_id))
+    else:
+        lines.append('\t%%s-1 seq %%d RESPONSE MANAGEMENT %%s '
+                     %% (identity, sequence_id, dataset))
+        lines.extend('\t\t%%-27s%%s' %% value for value in values)
+    sys.stdout.write('\n'.join(lines) + '\n')
+    sys.stdout.flush()
+
+
+for sequence_id, command in enumerate(commands or sys.stdin):
+    command = command.strip()
+    if command:
+        respond(sequence_id & 0xffff, command)
+'''
+
+# phc_ctl <device> cmp, the PHC follows CLOCK_REALTIME minus the UTC offset.
+# A shell script as phc_ctl starts in about the time the real one does.
+FAKE_PHC_CTL = '''#!/bin/sh
+echo "phc_ctl[0.000]: offset from CLOCK_REALTIME is \
+-$((37000000000 + $$ %% 200 - 100))ns"
+'''
+
+# Answers the phc2sys HA com socket queries with the same source
+FAKE_PHC2SYS_SOCKET = r'''
+import socket
+import sys
+
+path, interface = sys.argv[1:3]
+answers = {'valid sources': interface, 'clock source': interface}
+server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+server.bind(path)
+server.listen(64)
+print('ready', flush=True)
+while True:
+    connection, _ = server.accept()
+    try:
+        query = connection.recv(1024).decode().strip()
+        connection.send(answers.get(query, 'None').encode())
+    finally:
+        connection.close()
+'''
+
+
+class FakeHost:
+
+    def __init__(self, instances, flap_seconds=0.0):
+        self.instances = instances
+        self.flap_seconds = flap_seconds
+        self.root = None
+        self.ptp4l_instances = ['ptp%d' % (index + 1)
+                                for index in range(instances)]
+        self.ts2phc_instances = ['ts%d' % (index + 1)
+                                 for index in range(instances)]
+        self._saved = []
+        self._socket_server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def path(self, *names):
+        return os.path.join(self.root, *names)
+
+    def start(self):
+        self.root = tempfile.mkdtemp(prefix='ptptracking-')
+        for directory in ['bin', 'ptp', 'run', 'proc', 'sys', 'ice']:
+            os.mkdir(self.path(directory))
+        self._write_tools()
+        self._write_ptp4l()
+        self._write_ts2phc()
+        self._write_phc2sys()
+        self._start_socket_server()
+        self._patch()
+
+    def stop(self):
+        for module, name, value in reversed(self._saved):
+            setattr(module, name, value)
+        self._saved = []
+        if self._socket_server is not None:
+            self._socket_server.kill()
+            self._socket_server.wait()
+            self._socket_server = None
+        if self.root is not None:
+            shutil.rmtree(self.root, ignore_errors=True)
+            self.root = None
+
+    def daemon_context(self, node_name='controller-0',
+                       transport_endpoint='fake://'):
+        """Return the daemon context the init script would build"""
+        return {
+            'THIS_NAMESPACE': 'notification',
+            'THIS_NODE_NAME': node_name,
+            'REGISTRATION_TRANSPORT_ENDPOINT': transport_endpoint,
+            'NOTIFICATION_TRANSPORT_ENDPOINT': transport_endpoint,
+            'GNSS_CONFIGS': [self.path('ptp', 'ts2phc-%s.conf' % name)
+                             for name in self.ts2phc_instances],
+            'GNSS_INSTANCES': list(self.ts2phc_instances),
+            'PHC2SYS_CONFIG': self.path(
+                'ptp', 'phc2sys-%s.conf' % PHC2SYS_SERVICE_NAME),
+            'PHC2SYS_SERVICE_NAME': PHC2SYS_SERVICE_NAME,
+            'PTP4L_CONFIGS': [self.path('ptp', 'ptp4l-%s.conf' % name)
+                              for name in self.ptp4l_instances],
+            'PTP4L_INSTANCES': list(self.ptp4l_instances),
+        }
+
+    def _write(self, content, *names, mode=None):
+        path = self.path(*names)
+        with open(path, 'w') as f:
+            f.write(content)
+        if mode is not None:
+            os.chmod(path, mode)
+        return path
+
+    def _write_tools(self):
+        settings = {'python': sys.executable,
+                    'flap_seconds': float(self.flap_seconds)}
+        self._write(FAKE_PMC % settings, 'bin', 'pmc', mode=0o755)
+        self._write(FAKE_PHC_CTL % settings, 'bin', 'phc_ctl', mode=0o755)
+        self._write(FAKE_PHC2SYS_SOCKET, 'bin', 'phc2sys_socket.py')
+
+    def _write_ptp4l(self):
+        for index, name in enumerate(self.ptp4l_instances):
+            self._write('[global]\n'
+                        'domainNumber 24\n'
+                        'uds_address %s\n'
+                        '\n[ens%df0]\n'
+                        % (self.path('run', 'ptp4l-%s' % name), index + 1),
+                        'ptp', 'ptp4l-%s.conf' % name)
+            self._write('%d\n' % (1000 + index), 'run', 'ptp4l-%s.pid' % name)
+
+    def _write_ts2phc(self):
+        with open(os.path.join(FIXTURES, CGU_FIXTURE)) as f:
+            cgu_output = f.read()
+        for tty_class in ['tty', 'net']:
+            os.makedirs(self.path('sys', 'class', tty_class))
+        for index, name in enumerate(self.ts2phc_instances):
+            # One NIC per instance, 0000:18:00.0 has ttyGNSS_1800_0
+            bus = 0x18 + index
+            pci_addr = '0000:%02x:00.0' % bus
+            serialport = 'ttyGNSS_%02x00_0' % bus
+            self._write('[global]\n'
+                        'ts2phc.nmea_serialport /dev/%s\n'
+                        '\n[ens%df0]\n'
+                        'ts2phc.extts_polarity rising\n'
+                        % (serialport, index + 1),
+                        'ptp', 'ts2phc-%s.conf' % name)
+            self._write('%d\n' % (2000 + index), 'run', 'ts2phc-%s.pid' % name)
+            os.makedirs(self.path('sys', 'class', 'tty', serialport))
+            os.symlink('../../../../devices/pci0000:00/%s' % pci_addr,
+                       self.path('sys', 'class', 'tty', serialport,
+                                 'device'))
+            os.mkdir(self.path('ice', pci_addr))
+            self._write(cgu_output, 'ice', pci_addr, 'cgu')
+
+    def _write_phc2sys(self):
+        config = self._write(
+            '[global]\n'
+            'domainNumber 24\n'
+            'uds_address %s\n'
+            'ha_enabled 1\n'
+            'ha_phc2sys_com_socket %s\n'
+            '\n[%s]\n'
+            'ha_priority 100\n'
+            % (self.path('run', 'ptp4l-%s' % self.ptp4l_instances[0]),
+               self.path('run', 'phc2sys-%s.sock' % PHC2SYS_SERVICE_NAME),
+               PHC_INTERFACE),
+            'ptp', 'phc2sys-%s.conf' % PHC2SYS_SERVICE_NAME)
+        self._write('%d\n' % PHC2SYS_PID,
+                    'run', 'phc2sys-%s.pid' % PHC2SYS_SERVICE_NAME)
+        os.mkdir(self.path('proc', str(PHC2SYS_PID)))
+        self._write('\x00'.join(['/usr/sbin/phc2sys', '-f', config]),
+                    'proc', str(PHC2SYS_PID), 'cmdline')
+        os.makedirs(self.path('sys', 'class', 'net', PHC_INTERFACE,
+                              'device', 'ptp', PHC_DEVICE))
+
+    def _start_socket_server(self):
+        socket_path = self.path('run',
+                                'phc2sys-%s.sock' % PHC2SYS_SERVICE_NAME)
+        self._socket_server = subprocess.Popen(
+            [sys.executable, self.path('bin', 'phc2sys_socket.py'),
+             socket_path, PHC_INTERFACE], stdout=subprocess.PIPE)
+        # Listening once it says so
+        self._socket_server.stdout.readline()
+
+    def _set(self, module, name, value):
+        self._saved.append((module, name, getattr(module, name)))
+        setattr(module, name, value)
+
+    def _patch(self):
+        config_path = self.path('ptp') + os.sep
+        for name in ['LINUXPTP_CONFIG_PATH', 'PTP_CONFIG_PATH',
+                     'PHC2SYS_CONFIG_PATH', 'TS2PHC_CONFIG_PATH']:
+            self._set(constants, name, config_path)
+        self._set(constants, 'PIDFILE_PATH', self.path('run') + os.sep)
+        self._set(constants, 'PMC_PATH', self.path('bin', 'pmc'))
+        self._set(constants, 'PHC_CTL_PATH', self.path('bin', 'phc_ctl'))
+        self._set(constants, 'HOST_SYSFS_PATH', self.path('sys') + os.sep)
+        self._set(constants, 'HOST_PROC_PATH', self.path('proc') + os.sep)
+        self._set(constants, 'ICE_DEBUGFS_PATH', self.path('ice') + os.sep)
+        self._set(constants, 'GNSS_PCI_ADDR_CACHE',
+                  self.path('run', 'ptptracking-gnss-pci-addr.json'))
+        self._set(constants, 'KERNEL_LOG_PATH', self.path('kern.log'))
+        # ptp4l is queried through a pmc session per instance
+        self._set(pmc_session, 'PMC_EXEC', constants.PMC_PATH)
+        self._set(os_clock_monitor, 'PLUGIN_STATUS_QUERY_EXEC',
+                  constants.PMC_PATH)
+        self._set(ptp_monitor, 'PMC_CLIENT_MODE', constants.PMC_CLIENT_SHELL)
+        self._set(os_clock_monitor, 'PMC_CLIENT_MODE',
+                  constants.PMC_CLIENT_SHELL)
@@ -0,0 +1,219 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Micro-benchmarks of the text processing the tracking function runs on
+# every poll, against recorded fixtures: the parsing of the pmc output by
+# PtpMonitor.ptpsync, through a pmc run per dataset and through the pmc
+# session, ptpsync.check_results and CguHandler.cgu_output_to_dict.
+# The time per call of every target is compared with the baseline stored
+# in micro_baseline.json. Timings are scaled by a pure Python calibration
+# loop measured in turn with every target, so that a baseline recorded on
+# a machine can be checked on another one.
+# --check exits with 1 when a target is more than --threshold percent
+# slower than its baseline, --save stores the timings as the new baseline.
+#
+# Usage, from notificationservice-base-v2/docker/ptptrackingfunction:
+#   python3 -m benchmarks.micro [--check] [--save] [--threshold PCT]
+#       [--repeat N]
+#
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import timeit
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import pmc_session
+from trackingfunctionsdk.common.helpers import ptpsync as utils
+from trackingfunctionsdk.common.helpers.cgu_handler import CguHandler
+from trackingfunctionsdk.common.helpers.ptp_monitor import PtpMonitor
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+TEST_FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir,
+                             'trackingfunctionsdk', 'tests',
+                             'test_input_files')
+# pmc output of a boundary clock locked to a GM, one port SLAVE
+PMC_FIXTURE = os.path.join(FIXTURES, 'pmc_boundary_clock.txt')
+CGU_FIXTURES = ['mock_cgu_output_logan_beach',
+                'mock_cgu_output_westport_channel']
+BASELINE = os.path.join(os.path.dirname(__file__), 'micro_baseline.json')
+DEFAULT_THRESHOLD = 25.0
+# Shortest measurement, the number of calls is doubled until reached
+MIN_SECONDS = 0.01
+CALIBRATION_TEXT = ' '.join("'%d'" % number for number in range(100))
+
+
+def calibration():
+    # Fixed pure Python work the timings are expressed against
+    total = 0
+    for word in CALIBRATION_TEXT.split():
+        total += len(word.strip("'"))
+    return total
+
+
+class RecordedSession(pmc_session.PmcSession):
+    # Answers every query with the recorded pmc output, followed by the
+    # response to the sentinel that ends its last message
+
+    def __init__(self, output):
+        super().__init__(None, None, command=[pmc_session.PMC_EXEC])
+        self.output = (output + '\t507c6f.fffe.0b5a4d-1 seq 6 RESPONSE '
+                       'MANAGEMENT NULL_MANAGEMENT \n').encode()
+
+    def query(self, commands):
+        self._buffer = self.output
+        return self._parse()[0]
+
+
+def pmc_outputs(output):
+    # Split the pmc session output into the output of a pmc run per command
+    outputs = {}
+    for block in output.split('sending: ')[1:]:
+        outputs[block.split('\n', 1)[0]] = ('sending: ' + block).encode()
+    return outputs
+
+
+def targets():
+    """Return the (name, function) of the benchmarked calls"""
+    with open(PMC_FIXTURE) as f:
+        pmc_output = f.read()
+    outputs = pmc_outputs(pmc_output)
+
+    def run_shell2(dir, ctx, args):
+        return outputs[args.rsplit("'", 2)[1]], b'', 0
+
+    utils.run_shell2 = run_shell2
+    pmc_monitor = PtpMonitor('ptp1', 30, 2, 'phc2sys1', init=False)
+    pmc_monitor.ptp4l_service_name = 'ptp1'
+    session_monitor = PtpMonitor('ptp1', 30, 2, 'phc2sys1', init=False)
+    session_monitor.ptp4l_service_name = 'ptp1'
+    session_monitor._pmc_session = RecordedSession(pmc_output)
+    pmc_result = pmc_monitor.ptpsync()
+    session_result = session_monitor.ptpsync()
+    assert pmc_result == session_result, (pmc_result, session_result)
+    assert utils.check_results(*pmc_result) == constants.LOCKED_PHC_STATE
+
+    result = [
+        ('ptpsync pmc', pmc_monitor.ptpsync),
+        ('ptpsync session', session_monitor.ptpsync),
+        ('check_results', lambda: utils.check_results(*pmc_result)),
+    ]
+    for fixture in CGU_FIXTURES:
+        with open(os.path.join(TEST_FIXTURES, fixture)) as f:
+            cgu_output = f.read()
+        handler = CguHandler(None)
+
+        def parse(handler=handler, cgu_output=cgu_output):
+            # Forget the last parse, as if the content changed
+            handler.cgu_output_raw = cgu_output
+            handler._cgu_output_parsed_raw = None
+            handler.cgu_output_to_dict()
+
+        result.append(('cgu_output_to_dict %s'
+                       % fixture.replace('mock_cgu_output_', ''), parse))
+    return result
+
+
+def calls_per_measurement(function):
+    number = 1
+    while timeit.timeit(function, number=number) < MIN_SECONDS:
+        number *= 2
+    return number
+
+
+def measure(function, repeat):
+    """Return the median time per call of a function and its ratio
+
+    The ratio is the median of the time per call over the time per call of
+    the calibration, both measured in turn to see the same CPU frequency.
+    """
+    number = calls_per_measurement(function)
+    calibration_number = calls_per_measurement(calibration)
+    seconds = []
+    ratios = []
+    for _ in range(repeat):
+        calibration_seconds = timeit.timeit(
+            calibration, number=calibration_number) / calibration_number
+        seconds.append(timeit.timeit(function, number=number) / number)
+        ratios.append(seconds[-1] / calibration_seconds)
+    return statistics.median(seconds), statistics.median(ratios)
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def compare(baseline, timings, threshold):
+    """Print the timings against the baseline, return the regressed names"""
+    regressions = []
+    print("%-40s %12s %12s %8s" % ('target', 'baseline us', 'current us',
+                                   'change'))
+    for name, (seconds, ratio) in timings:
+        base = baseline.get(name)
+        if base is None:
+            print("%-40s %12s %12.2f %8s" % (name, '-', seconds * 1e6,
+                                             'new'))
+            continue
+        # As if measured on the machine the baseline was recorded on
+        seconds = base['seconds'] * ratio / base['ratio']
+        change = (ratio / base['ratio'] - 1) * 100
+        slower = change > threshold
+        if slower:
+            regressions.append(name)
+        print("%-40s %12.2f %12.2f %+7.1f%%%s"
+              % (name, base['seconds'] * 1e6, seconds * 1e6, change,
+                 ' SLOWER' if slower else ''))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Micro-benchmark the tracking function parsers')
+    parser.add_argument('--check', action='store_true',
+                        help='exit with 1 when a target regressed')
+    parser.add_argument('--save', action='store_true',
+                        help='store the timings as the new baseline')
+    parser.add_argument('--threshold', type=float,
+                        default=DEFAULT_THRESHOLD,
+                        help='percent slower than the baseline a target '
+                             'may be')
+    parser.add_argument('--repeat', type=int, default=25,
+                        help='measurements per target, the median is '
+                             'kept')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='baseline file')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    timings = [(name, measure(function, args.repeat))
+               for name, function in targets()]
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump({name: {'seconds': seconds, 'ratio': ratio}
+                       for name, (seconds, ratio) in timings},
+                      f, indent=4, sort_keys=True)
+            f.write('\n')
+        print("Baseline stored in %s" % args.baseline)
+        return
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print("No baseline in %s, run with --save" % args.baseline)
+        sys.exit(1 if args.check else 0)
+    regressions = compare(baseline, timings, args.threshold)
+    if regressions and args.check:
+        print("%d target(s) more than %g%% slower than the baseline: %s"
+              % (len(regressions), args.threshold, ', '.join(regressions)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Replays an input trace recorded by the tracking function with
+# INPUT_TRACE_FILE through the monitors on a virtual clock, prints the
+# state changes and how much faster than real time the replay ran.
+#
+# Usage, from notificationservice-base-v2/docker/ptptrackingfunction:
+#   python3 -m benchmarks.trace_replay TRACE [--repeat N] [--quiet]
+#
+import argparse
+
+from trackingfunctionsdk.common.helpers import input_trace
+from trackingfunctionsdk.common.helpers.trace_replay import TraceReplay
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Replay a tracking function input trace')
+    parser.add_argument('trace', help='trace file, .gz for gzip')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='replays to time, the fastest is reported')
+    parser.add_argument('--quiet', action='store_true',
+                        help='do not print the state changes')
+    args = parser.parse_args()
+    trace = input_trace.load_trace(args.trace)
+    results = [TraceReplay(trace).run() for _ in range(max(1, args.repeat))]
+    result = min(results, key=lambda result: result.wall_seconds)
+    if not args.quiet:
+        print("%10s %-12s %-16s %s" % ('time', 'resource', 'instance',
+                                       'state'))
+        for change in result.transitions:
+            print("%10.3f %-12s %-16s %s" % change)
+    print("%d records, %d polls (%d failed), %d inputs read"
+          % (len(trace.records), result.polls, result.failed_polls,
+             result.reads))
+    print("%.1fs of trace replayed in %.3fs, %.0fx real time, "
+          "%.1f us/poll"
+          % (result.virtual_seconds, result.wall_seconds,
+             result.virtual_seconds / result.wall_seconds
+             if result.wall_seconds else 0,
+             result.wall_seconds / result.polls * 1e6
+             if result.polls else 0))
+
+
+if __name__ == '__main__':
+    main()
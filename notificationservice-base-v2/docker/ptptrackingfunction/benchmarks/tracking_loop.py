@@ -0,0 +1,159 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Benchmark of the PtpWatcherDefault tracking loop against a FakeHost with
+# 1, 4, 16 and 64 ptp4l and ts2phc instances, publishing on the in memory
+# fake:// oslo.messaging transport.
+# Every instance count runs in a process of its own. The loop is woken up
+# at a fixed rate and polls every instance on each cycle. Reported are the
+# cycle duration percentiles, the CPU time of the tracking function per
+# cycle and the events published per second. The fake pmc, phc_ctl and
+# phc2sys socket are separate processes, their CPU time is not included.
+#
+# Usage, from notificationservice-base-v2/docker/ptptrackingfunction:
+#   python3 -m benchmarks.tracking_loop [--instances 1,4,16,64]
+#       [--seconds S] [--rate HZ] [--flap-seconds S] [--workers N]
+#
+import argparse
+import collections
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+from benchmarks.fake_host import FakeHost
+from trackingfunctionsdk.services.daemon import PtpWatcherDefault
+
+# Longest wait for the first cycle, which builds the pmc sessions
+STARTUP_TIMEOUT = 60
+
+LoopResult = collections.namedtuple(
+    'LoopResult', ['instances', 'cycles', 'seconds', 'p50', 'p90', 'p99',
+                   'max', 'cpu_per_cycle', 'published',
+                   'publish_latency', 'overruns', 'late_samples'])
+
+
+def percentile(ordered, fraction):
+    # Nearest rank of sorted values
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1,
+                       int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run_loop(instances, seconds, rate, flap_seconds, workers):
+    """Run the tracking loop on a FakeHost, return its LoopResult"""
+    period = 1.0 / rate
+    os.environ['MONITOR_SAMPLE_WORKERS'] = str(workers)
+    os.environ['METRICS_PORT'] = '0'
+    with FakeHost(instances, flap_seconds) as host:
+        event = threading.Event()
+        watcher = PtpWatcherDefault(event, json.dumps({}),
+                                    json.dumps(host.daemon_context()))
+        scheduler = watcher.monitor_scheduler
+        durations = []
+        check_overrun = scheduler.check_overrun
+
+        def timed_check_overrun(cycle_start, period, stages=None):
+            # Called by the loop at the end of every cycle
+            elapsed = check_overrun(cycle_start, period, stages)
+            durations.append(elapsed)
+            return elapsed
+
+        scheduler.check_overrun = timed_check_overrun
+        threading.Thread(target=watcher.run, name='tracking-loop',
+                         daemon=True).start()
+        # The first cycle publishes the initial states, not measured
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while not durations and time.monotonic() < deadline:
+            time.sleep(0.01)
+        del durations[:]
+        sent = watcher.publish_queue.sent
+        late_samples = scheduler.late_samples
+        cpu = time.process_time()
+        start = time.monotonic()
+        wakeup = start + period
+        while wakeup < start + seconds:
+            time.sleep(max(0.0, wakeup - time.monotonic()))
+            event.set()
+            wakeup += period
+        time.sleep(max(0.0, start + seconds - time.monotonic()))
+        elapsed = time.monotonic() - start
+        cpu = time.process_time() - cpu
+        ordered = sorted(durations)
+        metrics = watcher.publish_queue.metrics()
+        # The loop keeps polling the host being removed
+        logging.disable(logging.CRITICAL)
+    return LoopResult(
+        instances, len(ordered), elapsed, percentile(ordered, 0.5),
+        percentile(ordered, 0.9), percentile(ordered, 0.99),
+        ordered[-1] if ordered else 0.0,
+        cpu / len(ordered) if ordered else 0.0,
+        metrics.sent - sent, metrics.send_latency_mean,
+        # Cycles that did not complete before the next wake up
+        len([duration for duration in ordered if duration > period]),
+        scheduler.late_samples - late_samples)
+
+
+def _run_process(results, verbose, *args):
+    if not verbose:
+        logging.disable(logging.WARNING)
+    results.put(run_loop(*args))
+    results.close()
+    results.join_thread()
+    # The tracking loop never returns, exit without waiting for it
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the tracking loop against fake instances')
+    parser.add_argument('--instances', default='1,4,16,64',
+                        help='comma separated ptp4l and ts2phc instance '
+                             'counts')
+    parser.add_argument('--seconds', type=float, default=10.0,
+                        help='measured seconds per instance count')
+    parser.add_argument('--rate', type=float, default=10.0,
+                        help='loop wake ups per second')
+    parser.add_argument('--flap-seconds', type=float, default=2.0,
+                        help='clock class change period of the instances, '
+                             '0 for none')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='monitor sample workers')
+    parser.add_argument('--verbose', action='store_true',
+                        help='keep the tracking function logs')
+    args = parser.parse_args()
+    print("%9s %7s %8s %8s %8s %8s %10s %9s %10s %8s %5s"
+          % ('instances', 'cycles', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms',
+             'cpu ms/cyc', 'events/s', 'publish ms', 'overruns', 'late'))
+    for instances in [int(count) for count in args.instances.split(',')
+                      if count.strip()]:
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=_run_process,
+            args=(results, args.verbose, instances, args.seconds,
+                  args.rate, args.flap_seconds, args.workers))
+        process.start()
+        result = results.get()
+        process.join(5)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+        print("%9d %7d %8.2f %8.2f %8.2f %8.2f %10.2f %9.1f %10.2f %8d %5d"
+              % (result.instances, result.cycles, result.p50 * 1e3,
+                 result.p90 * 1e3, result.p99 * 1e3, result.max * 1e3,
+                 result.cpu_per_cycle * 1e3,
+                 result.published / result.seconds,
+                 result.publish_latency * 1e3, result.overruns,
+                 result.late_samples))
+
+
+if __name__ == '__main__':
+    main()
@@ -24,5 +24,6 @@ setup(
     test_suite='ptptrackingfunction',
     zip_safe=False,
     include_package_data=True,
-    packages=find_packages(exclude=['ez_setup'])
+    packages=find_packages(exclude=['ez_setup', 'benchmarks',
+                                    'benchmarks.*'])
 )
@@ -23,6 +23,8 @@ class BrokerClientBase(object):
     def __init__(self, broker_name, broker_transport_endpoint):
         self.broker_name = broker_name
         self.listeners = {}
+        # One rpc client per topic casts are made to
+        self.cast_clients = {}
         self.broker_endpoint = RpcEndpointInfo(broker_transport_endpoint)
         self.transport = rpc_helper.get_transport(self.broker_endpoint)
         LOG.debug("Created Broker client:{0}".format(broker_name))
@@ -106,8 +108,11 @@ class BrokerClientBase(object):
         return queryclient.call({}, api_name, **api_kwargs)
 
     def cast(self, topic, api_name, **api_kwargs):
-        target = oslo_messaging.Target(
-            topic=topic, fanout=True, version=self.broker_endpoint.Version,
-            namespace=self.broker_endpoint.Namespace)
-        queryclient = oslo_messaging.get_rpc_client(self.transport, target)
+        queryclient = self.cast_clients.get(topic)
+        if queryclient is None:
+            target = oslo_messaging.Target(
+                topic=topic, fanout=True, version=self.broker_endpoint.Version,
+                namespace=self.broker_endpoint.Namespace)
+            queryclient = oslo_messaging.get_rpc_client(self.transport, target)
+            self.cast_clients[topic] = queryclient
         queryclient.cast({}, api_name, **api_kwargs)
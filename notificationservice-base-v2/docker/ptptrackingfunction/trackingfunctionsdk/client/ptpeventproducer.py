@@ -11,6 +11,8 @@ import oslo_messaging
 from oslo_config import cfg
 
 from trackingfunctionsdk.client.base import BrokerClientBase
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import stage_timer
 
 import logging
 
@@ -46,9 +48,12 @@ class PtpEventProducer(object):
                 return None
 
     def __init__(self, node_name, local_broker_transport_endpoint,
-                 registration_broker_transport_endpoint=None):
+                 registration_broker_transport_endpoint=None,
+                 sync_snapshot=False):
         self.Id = id(self)
         self.node_name = node_name
+        # Cast the /sync statuses of a publish_many call as one snapshot
+        self.sync_snapshot = sync_snapshot
         self.local_broker_client = BrokerClientBase(
             'LocalPtpEventProducer', local_broker_transport_endpoint)
         if registration_broker_transport_endpoint:
@@ -67,58 +72,94 @@ class PtpEventProducer(object):
             self.registration_broker_client = None
         return
 
-    def publish_status(self, ptpstatus, retry=3):
-        result = False
-        result1 = self.publish_status_local(ptpstatus,
-                                            retry) if self.local_broker_client else result
-        result2 = self.publish_status_all(ptpstatus,
-                                          retry) if self.registration_broker_client else result
+    def publish_status(self, ptpstatus, source, retry=3):
+        return self.publish_many([(ptpstatus, source)], retry)
+
+    def publish_many(self, statuses, retry=3):
+        """Publish the statuses of a monitoring cycle in one pass
+
+        statuses is a list of (ptpstatus, source). Every status is cast to
+        the topic of each of its sources on the local broker, and once to
+        the registration broker however many sources it was given for.
+        The same status object is handed to every cast.
+        With sync_snapshot the statuses given for SOURCE_SYNC_ALL are cast
+        together as one snapshot event to the /sync topic instead.
+        Returns whether all the casts succeeded on each broker.
+        """
+        local_casts = []
+        registration_casts = []
+        published = set()
+        snapshot = None
+        for ptpstatus, source in statuses:
+            if self.sync_snapshot and source == constants.SOURCE_SYNC_ALL:
+                if snapshot is None:
+                    snapshot = []
+                    local_casts.append(
+                        ('{0}-Event-v2-{1}'.format(source, self.node_name),
+                         {constants.SYNC_SNAPSHOT_KEY: snapshot}))
+                snapshot.append(ptpstatus)
+            else:
+                local_casts.append(
+                    ('{0}-Event-v2-{1}'.format(source, self.node_name),
+                     ptpstatus))
+            if id(ptpstatus) not in published:
+                published.add(id(ptpstatus))
+                registration_casts.append(('PTP-Event-v2-*', ptpstatus))
+        result1 = result2 = False
+        if self.local_broker_client:
+            with stage_timer.timed('publish', 'local'):
+                result1 = self.__cast_all(self.local_broker_client,
+                                          local_casts, retry)
+        if self.registration_broker_client:
+            with stage_timer.timed('publish', 'registration'):
+                result2 = self.__cast_all(self.registration_broker_client,
+                                          registration_casts, retry)
         return result1, result2
 
     def publish_status_local(self, ptpstatus, source, retry=3):
         if not self.local_broker_client:
             return False
         topic = '{0}-Event-v2-{1}'.format(source, self.node_name)
-        server = None
-        isretrystopped = False
-        while not isretrystopped:
-            try:
-                self.local_broker_client.cast(
-                    topic, 'NotifyStatus', notification=ptpstatus)
-                LOG.debug("Published ptp status:{0}@Topic:{1}".format(ptpstatus, topic))
-                break
-            except Exception as ex:
-                LOG.warning("Failed to publish ptp status:{0}@Topic:{1} due to: {2}".format(
-                    ptpstatus, topic, str(ex)))
-                retry = retry - 1
-                isretrystopped = False if retry > 0 else True
-
-        if isretrystopped:
-            LOG.error("Failed to publish ptp status:{0}@Topic:{1}".format(
-                ptpstatus, topic))
-        return isretrystopped == False
+        return self.__cast(self.local_broker_client, topic, ptpstatus, retry)
 
     def publish_status_all(self, ptpstatus, retry=3):
         if not self.registration_broker_client:
             return False
         topic_all = 'PTP-Event-v2-*'
-        server = None
+        return self.__cast(self.registration_broker_client, topic_all,
+                           ptpstatus, retry)
+
+    def __cast_all(self, broker_client, casts, retry):
+        result = True
+        for topic, ptpstatus in casts:
+            result = self.__cast(broker_client, topic, ptpstatus,
+                                 retry) and result
+        return result
+
+    def __cast(self, broker_client, topic, ptpstatus, retry):
         isretrystopped = False
+        backoff = constants.PUBLISH_RETRY_BACKOFF
         while not isretrystopped:
             try:
-                self.registration_broker_client.cast(
-                    topic_all, 'NotifyStatus', notification=ptpstatus)
-                LOG.debug("Published ptp status:{0}@Topic:{1}".format(ptpstatus, topic_all))
+                broker_client.cast(
+                    topic, 'NotifyStatus', notification=ptpstatus)
+                # Formatted only when debug logging is enabled
+                LOG.debug("Published ptp status:%s@Topic:%s", ptpstatus, topic)
                 break
             except Exception as ex:
                 LOG.warning("Failed to publish ptp status:{0}@Topic:{1} due to: {2}".format(
-                    ptpstatus, topic_all, str(ex)))
+                    ptpstatus, topic, str(ex)))
                 retry = retry - 1
                 isretrystopped = False if retry > 0 else True
+                if not isretrystopped:
+                    # Give an unreachable broker time to come back
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2,
+                                  constants.PUBLISH_RETRY_BACKOFF_MAX)
 
         if isretrystopped:
             LOG.error("Failed to publish ptp status:{0}@Topic:{1}".format(
-                ptpstatus, topic_all))
+                ptpstatus, topic))
         return isretrystopped == False
 
     def start_status_listener(self, handler=None):
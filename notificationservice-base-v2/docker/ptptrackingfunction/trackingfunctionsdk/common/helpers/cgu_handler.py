@@ -3,7 +3,10 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 #
+import collections
+import json
 import logging
+import mmap
 import os
 import re
 
@@ -13,6 +16,31 @@ from trackingfunctionsdk.common.helpers import log_helper
 LOG = logging.getLogger(__name__)
 log_helper.config_logger(LOG)
 
+CguInput = collections.namedtuple(
+    'CguInput', ['name', 'state', 'eec_priority', 'pps_priority'])
+CguDpll = collections.namedtuple(
+    'CguDpll', ['current_reference', 'status', 'phase_offset'])
+CguStatus = collections.namedtuple(
+    'CguStatus', ['inputs', 'eec_dpll', 'pps_dpll'])
+
+# Matches, in one pass over the cgu output, the rows of the input status
+# table, the DPLL section titles and the DPLL fields we report. Tables
+# vary in length and columns after the PPS priority depending on NIC types
+CGU_OUTPUT_PATTERN = re.compile(
+    r'^ *(?P<input>\S+) \(\d+\) *\| *(?P<state>\S+) *\| *(?P<eec>\S+) *\|'
+    r' *(?P<pps>\S+) *\|'
+    r'|^(?P<dpll>EEC|PPS) DPLL:'
+    r'|^[ \t]+(?P<field>Current reference|Status|Phase offset)'
+    r'(?: \[ns\])?:[ \t]+(?P<value>\S+)',
+    re.MULTILINE)
+CGU_DPLL_FIELDS = {'Current reference': 0, 'Status': 1, 'Phase offset': 2}
+
+PCI_ADDR_PATTERN = re.compile(
+    r'[0-9a-fA-F]{4}:[0-9a-fA-F]{2}:[0-9a-fA-F]{2}\.[0-7]')
+# sysfs classes of the NMEA serialports, ttyGNSS_* devices of the ice
+# driver and gnssN devices of the kernel GNSS subsystem
+NMEA_SERIALPORT_CLASSES = ('tty', 'gnss')
+
 
 class CguHandler:
     def __init__(self, config_file, nmea_serialport=None, pci_addr=None, 
@@ -23,6 +51,9 @@ class CguHandler:
         self.cgu_path = cgu_path
         self.cgu_output_raw = ""
         self.cgu_output_parsed = {}
+        self.cgu_status = None
+        # Raw output the current cgu_status was parsed from
+        self._cgu_output_parsed_raw = None
 
     def get_gnss_nmea_serialport_from_ts2phc_config(self):
         # Read a tstphc config file and return the ts2phc.nmea_serialport
@@ -39,30 +70,39 @@ class CguHandler:
             LOG.error(err)
             raise
 
-    def convert_nmea_serialport_to_pci_addr(self, log_file="/logs/kern.log"):
+    def convert_nmea_serialport_to_pci_addr(
+            self, log_file=constants.KERNEL_LOG_PATH, cache_file=None,
+            sysfs_path=None):
         # Parse the nmea_serialport value into a PCI address so that we can
         # later find the cgu
+        # The device symlink of the serialport in sysfs is used when
+        # present, else the address is taken from the last registration of
+        # the serialport in the kernel log and kept in cache_file so the log
+        # is only scanned once per boot
         # Returns the address or None
-        pci_addr = None
         # Get only the ttyGNSS_1800_0 portion of the path
-        nmea_serialport = self.nmea_serialport.split('/')[2]
+        nmea_serialport = self.nmea_serialport.split('/')[-1]
         LOG.debug("Looking for nmea_serialport value: %s" % nmea_serialport)
+        cache_file = cache_file or constants.GNSS_PCI_ADDR_CACHE
+        sysfs_path = sysfs_path or constants.HOST_SYSFS_PATH
 
-        with open(log_file, 'r') as file:
-            for line in file:
-                if nmea_serialport in line:
-                    # Regex split to make any number of spaces the delimiter
-                    # Eg.: ... ice 0000:18:00.0: ttyGNSS_1800_0 registered
-                    # Becomes: 0000:18:00.0
-                    pci_addr = re.split(' +', line)[7].strip(':')
-                    LOG.debug("Found with PCI addr: %s" % pci_addr)
-                    break
+        pci_addr = sysfs_pci_addr(nmea_serialport, sysfs_path)
+        if pci_addr is None:
+            pci_addr = load_pci_addr_cache(cache_file).get(
+                self.nmea_serialport)
+            if pci_addr is None:
+                pci_addr = scan_kernel_log(log_file, nmea_serialport)
+                if pci_addr is not None:
+                    store_pci_addr_cache(cache_file, self.nmea_serialport,
+                                         pci_addr)
+        if pci_addr is not None:
+            LOG.debug("Found with PCI addr: %s" % pci_addr)
 
         self.pci_addr = pci_addr
 
     def get_cgu_path_from_pci_addr(self):
         # Search for a cgu file using the given pci address
-        cgu_path = "/ice/" + self.pci_addr + "/cgu"
+        cgu_path = constants.ICE_DEBUGFS_PATH + self.pci_addr + "/cgu"
         if os.path.exists(cgu_path):
             LOG.debug("PCI address %s has cgu path %s" %
                       (self.pci_addr, cgu_path))
@@ -82,56 +122,122 @@ class CguHandler:
         self.cgu_output_raw = cgu_output
 
     def cgu_output_to_dict(self):
-        # Take raw cgu output and parse it into a dict
-        cgu_output = self.cgu_output_raw.splitlines()
-        cgu_dict = {'input': {},
-                    'EEC DPLL': {
-                        'Current reference': '',
-                        'Status': ''
-                    },
-                    'PPS DPLL': {
-                        'Current reference': '',
-                        'Status': '',
-                        'Phase offset': ''
-                    }
-                    }
-        # Get the input state table start and end lines
-        # Can vary in length depending on NIC types
-        for index, line in enumerate(cgu_output):
-            if "input (idx)" in line:
-                table_start = index + 2
-            if "EEC DPLL:" in line:
-                dpll_start = index
-                table_end = index - 1
-
-        for line in cgu_output[table_start:table_end]:
-            # Build a dict out of the table
-            dict_to_insert = {
-                re.split(' +', line)[1]: {
-                    'state': re.split(' +', line)[4],
+        # Take raw cgu output and parse it into a dict, the debugfs content
+        # rarely changes between polls so identical output is not reparsed
+        if self.cgu_output_raw == self._cgu_output_parsed_raw:
+            return
+        self.cgu_status = parse_cgu_output(self.cgu_output_raw or "")
+        self._cgu_output_parsed_raw = self.cgu_output_raw
+
+        eec_dpll = self.cgu_status.eec_dpll
+        pps_dpll = self.cgu_status.pps_dpll
+        self.cgu_output_parsed = {
+            'input': {
+                cgu_input.name: {
+                    'state': cgu_input.state,
                     'priority': {
-                        'EEC': re.split(' +', line)[6],
-                        'PPS': re.split(' +', line)[8]
+                        'EEC': cgu_input.eec_priority,
+                        'PPS': cgu_input.pps_priority
                     }
-                }
+                } for cgu_input in self.cgu_status.inputs
+            },
+            'EEC DPLL': {
+                'Current reference': eec_dpll.current_reference,
+                'Status': eec_dpll.status
+            },
+            'PPS DPLL': {
+                'Current reference': pps_dpll.current_reference,
+                'Status': pps_dpll.status,
+                'Phase offset': pps_dpll.phase_offset
             }
-            cgu_dict['input'].update(dict_to_insert)
-
-        # Add the DPLL data below the table
-        # Set the line offsets for each item we want
-        eec_current_ref = dpll_start + 1
-        eec_status = dpll_start + 2
-        pps_current_ref = dpll_start + 5
-        pps_status = dpll_start + 6
-        pps_phase_offset = dpll_start + 7
-
-        cgu_dict['EEC DPLL']['Current reference'] = \
-            re.split('[ \t]+', cgu_output[eec_current_ref])[-1]
-        cgu_dict['EEC DPLL']['Status'] = re.split('[ \t]+', cgu_output[eec_status])[-1]
-        cgu_dict['PPS DPLL']['Current reference'] = \
-            re.split('[ \t]+', cgu_output[pps_current_ref])[-1]
-        cgu_dict['PPS DPLL']['Status'] = re.split('[ \t]+', cgu_output[pps_status])[-1]
-        cgu_dict['PPS DPLL']['Phase offset'] = \
-            re.split('[ \t]+', cgu_output[pps_phase_offset])[-1]
-
-        self.cgu_output_parsed = cgu_dict
+        }
+
+
+def parse_cgu_output(cgu_output):
+    # Single pass parse of the cgu output into a CguStatus
+    inputs = []
+    dplls = {'EEC': ['', '', ''], 'PPS': ['', '', '']}
+    dpll = None
+    for match in CGU_OUTPUT_PATTERN.finditer(cgu_output):
+        if match.group('input'):
+            inputs.append(CguInput(match.group('input'), match.group('state'),
+                                   match.group('eec'), match.group('pps')))
+        elif match.group('dpll'):
+            dpll = dplls[match.group('dpll')]
+        elif dpll is not None:
+            dpll[CGU_DPLL_FIELDS[match.group('field')]] = match.group('value')
+    return CguStatus(tuple(inputs), CguDpll(*dplls['EEC']),
+                     CguDpll(*dplls['PPS']))
+
+
+def sysfs_pci_addr(nmea_serialport, sysfs_path=constants.HOST_SYSFS_PATH):
+    # Return the PCI address the device symlink of a serialport points to,
+    # e.g. /sys/class/tty/ttyGNSS_1800_0/device -> ../../../0000:18:00.0
+    for device_class in NMEA_SERIALPORT_CLASSES:
+        link = "%sclass/%s/%s/device" % (sysfs_path, device_class,
+                                          nmea_serialport)
+        try:
+            target = os.readlink(link).split('/')[-1]
+        except OSError:
+            continue
+        if PCI_ADDR_PATTERN.fullmatch(target):
+            return target
+    return None
+
+
+def scan_kernel_log(log_file, nmea_serialport,
+                    block_size=constants.KERNEL_LOG_SCAN_BLOCK_SIZE):
+    # Return the PCI address of the last kernel log line registering the
+    # serialport, e.g.
+    #   ice 0000:18:00.0: ttyGNSS_1800_0 registered
+    # The log is mapped and searched backwards one block at a time, the
+    # registration is usually far from the end but the log can be large
+    needle = nmea_serialport.encode()
+    with open(log_file, 'rb') as infile:
+        size = os.fstat(infile.fileno()).st_size
+        if size == 0:
+            return None
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as log:
+            end = size
+            while end > 0:
+                start = max(0, end - block_size)
+                position = log.rfind(needle, start, end)
+                if position < 0:
+                    if start == 0:
+                        break
+                    # Blocks overlap so a match can span their boundary
+                    end = start + len(needle) - 1
+                    continue
+                line_start = log.rfind(b'\n', 0, position) + 1
+                line = log[line_start:position].decode(errors='replace')
+                pci_addrs = PCI_ADDR_PATTERN.findall(line)
+                if pci_addrs:
+                    return pci_addrs[-1]
+                end = position + len(needle) - 1
+    return None
+
+
+def load_pci_addr_cache(cache_file):
+    # Return the serialport to PCI address cache, empty when unreadable
+    try:
+        with open(cache_file, 'r') as infile:
+            cache = json.load(infile)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as err:
+        LOG.warning("Ignoring PCI address cache %s: %s" % (cache_file, err))
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def store_pci_addr_cache(cache_file, nmea_serialport, pci_addr):
+    cache = load_pci_addr_cache(cache_file)
+    cache[nmea_serialport] = pci_addr
+    temp_file = "%s.%d" % (cache_file, os.getpid())
+    try:
+        with open(temp_file, 'w') as outfile:
+            json.dump(cache, outfile)
+        os.replace(temp_file, cache_file)
+    except OSError as err:
+        LOG.warning("Unable to update PCI address cache %s: %s"
+                    % (cache_file, err))
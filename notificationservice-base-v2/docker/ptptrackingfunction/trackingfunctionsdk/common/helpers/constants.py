@@ -31,6 +31,18 @@ CLOCK_CLASS_VALUE6 = "6"
 CLOCK_CLASS_VALUE7 = "7"
 CLOCK_CLASS_VALUE135 = "135"
 CLOCK_CLASS_LOCKED_LIST = [CLOCK_CLASS_VALUE6, CLOCK_CLASS_VALUE7, CLOCK_CLASS_VALUE135]
+# PMC client constants
+PMC_CLIENT_NATIVE = "native"
+PMC_CLIENT_SHELL = "pmc"
+PTP4L_DEFAULT_UDS_ADDRESS = "/var/run/ptp4l"
+PMC_CLIENT_SOCKET_PATH = "/var/run/ptptracking-pmc.{0}.{1}"
+PMC_CLIENT_TIMEOUT = 0.5
+PMC_CLIENT_BUFFER_SIZE = 1500
+PMC_SESSION_TIMEOUT = 1.0
+# ptp4l SUBSCRIBE_EVENTS_NP subscription constants
+PTP4L_SUBSCRIPTION_DURATION = 180
+PTP4L_SUBSCRIPTION_RETRY = 5
+PTP4L_CONSISTENCY_CHECK_SECONDS = 10
 # ts2phc constants
 NMEA_SERIALPORT = "ts2phc.nmea_serialport"
 GNSS_PIN = "GNSS-1PPS"
@@ -38,8 +50,48 @@ GNSS_LOCKED_HO_ACK = 'locked_ho_ack'
 GNSS_LOCKED_HO_ACQ = 'locked_ho_acq'
 GNSS_DPLL_0 = "DPLL0"
 GNSS_DPLL_1 = "DPLL1"
+# Kernel log following for GNSS DPLL events
+KMSG_PATH = "/dev/kmsg"
+KMSG_RECORD_SIZE = 8192
+KERNEL_LOG_PATH = "/logs/kern.log"
+KERNEL_LOG_POLL_INTERVAL = 0.1
+KERNEL_LOG_RETRY = 5
+GNSS_CGU_VERIFY_SECONDS = 10
+# NMEA serialport to PCI address resolution
+HOST_SYSFS_PATH = "/hostsys/"
+# Host procfs, for the phc2sys command line, and ice driver debugfs
+HOST_PROC_PATH = "/host/proc/"
+ICE_DEBUGFS_PATH = "/ice/"
+KERNEL_LOG_SCAN_BLOCK_SIZE = 1024 * 1024
+# /var/run is a tmpfs, entries do not outlive a host reboot
+GNSS_PCI_ADDR_CACHE = "/var/run/ptptracking-gnss-pci-addr.json"
+# Outbound event queue
+PUBLISH_QUEUE_SIZE = 256
+PUBLISH_RETRY_BACKOFF = 0.5
+PUBLISH_RETRY_BACKOFF_MAX = 5
+# Flap damping of the ptp4l lock state and clock class events, disabled
+# when all are 0
+PTP_EVENT_DWELL_SECONDS = 0
+PTP_EVENT_LOCKED_DWELL_SECONDS = 0
+PTP_EVENT_SUPPRESSION_SECONDS = 0
+CLOCK_CLASS_FREERUN = "248"
+# Adaptive polling, resources are polled between the minimum interval and
+# CONTROL_TIMEOUT unless a longer maximum is configured
+POLL_INTERVAL_MIN_SECONDS = 0.5
+POLL_WHEEL_TICK = 0.1
+POLL_WHEEL_SIZE = 512
+# Offset history of the ptp4l instances and the OS clock, statistics
+# windows and MTIE/TDEV observation intervals in seconds
+OFFSET_HISTORY_SIZE = 4096
+OFFSET_STATISTICS_WINDOWS = "60,600"
+OFFSET_STATISTICS_TAUS = "1,10,100"
+# Metrics endpoint, disabled when the port is 0
+METRICS_PORT = 0
+METRICS_ADDRESS = "0.0.0.0"
 
 UTC_OFFSET = "37"
+# Upper bound on how long a utc offset read from ptp4l is reused
+UTC_OFFSET_CACHE_SECONDS = 3600
 
 if path.exists('/ptp/linuxptp/ptpinstance'):
     LINUXPTP_CONFIG_PATH = '/ptp/linuxptp/ptpinstance/'
@@ -51,6 +103,9 @@ PTP_CONFIG_PATH = LINUXPTP_CONFIG_PATH
 PHC2SYS_CONFIG_PATH = LINUXPTP_CONFIG_PATH
 TS2PHC_CONFIG_PATH = LINUXPTP_CONFIG_PATH
 PHC_CTL_PATH = "/usr/sbin/phc_ctl"
+PHC_OFFSET_SAMPLES = 5
+PMC_PATH = "/usr/sbin/pmc"
+PIDFILE_PATH = "/var/run/"
 PHC2SYS_DEFAULT_CONFIG = PHC2SYS_CONFIG_PATH + "phc2sys-phc2sys-legacy.conf"
 
 CLOCK_REALTIME = "CLOCK_REALTIME"
@@ -60,6 +115,8 @@ PHC2SYS_TOLERANCE_HIGH = 37000001000
 PHC2SYS_TOLERANCE_THRESHOLD = 1000
 
 PTP_V1_KEY = "ptp_notification_v1"
+# Key of the list of v2 statuses carried by a /sync snapshot event
+SYNC_SNAPSHOT_KEY = "sync_snapshot_v2"
 
 SPEC_VERSION = "1.0"
 DATA_VERSION = "1.0"
@@ -0,0 +1,94 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Flap damping of the state change events of a resource.
+# During grandmaster switchovers the lock state and clock class of a ptp4l
+# instance can change several times within a few polls. A damper sits
+# between a monitor and the publisher and only lets a new value through
+# once it has been observed for a minimum dwell time, longer when the new
+# value is a locked one, and no sooner than a suppression window after
+# the previous event. Values that report a loss of sync (Freerun) are
+# always let through immediately.
+#
+import collections
+import time
+
+DamperSettings = collections.namedtuple(
+    'DamperSettings', ['dwell_seconds', 'locked_dwell_seconds',
+                       'suppression_seconds'])
+
+DAMPING_DISABLED = DamperSettings(0, 0, 0)
+
+
+def settings_enabled(settings):
+    return any(settings)
+
+
+class EventDamper:
+
+    def __init__(self, settings, immediate_values=(), locked_values=()):
+        self.settings = settings
+        # Values published without delay
+        self.immediate_values = immediate_values
+        # Values entered with the locked dwell time
+        self.locked_values = locked_values
+        self.published = None
+        # Changes that never made it to an event
+        self.suppressed = 0
+        self._published_event_time = None
+        self._published_at = None
+        self._candidate = None
+        self._candidate_since = None
+        self._candidate_event_time = None
+
+    @property
+    def pending(self):
+        """Whether a change is waiting to be let through"""
+        return self._candidate is not None
+
+    def update(self, value, event_time, now=None):
+        """Feed the value observed by a poll
+
+        Returns (new_event, value, event_time) with the value and time of
+        the last event let through, new_event is True when the value is
+        let through by this call.
+        """
+        if now is None:
+            now = time.monotonic()
+        if value == self.published:
+            if self._candidate is not None:
+                # Oscillated back before being published
+                self.suppressed += 1
+                self._candidate = None
+            return False, self.published, self._published_event_time
+        if value != self._candidate:
+            if self._candidate is not None:
+                self.suppressed += 1
+            self._candidate = value
+            self._candidate_since = now
+            self._candidate_event_time = event_time
+        if self.published is not None and \
+                value not in self.immediate_values:
+            if value in self.locked_values and \
+                    self.published not in self.locked_values:
+                # Hysteresis, entering a locked state takes longer
+                dwell = max(self.settings.locked_dwell_seconds,
+                            self.settings.dwell_seconds)
+            else:
+                dwell = self.settings.dwell_seconds
+            if now - self._candidate_since < dwell:
+                return False, self.published, self._published_event_time
+            if now - self._published_at < self.settings.suppression_seconds:
+                return False, self.published, self._published_event_time
+        return self._publish(now)
+
+    def _publish(self, now):
+        self.published = self._candidate
+        self._published_event_time = self._candidate_event_time
+        self._published_at = now
+        self._candidate = None
+        return True, self.published, self._published_event_time
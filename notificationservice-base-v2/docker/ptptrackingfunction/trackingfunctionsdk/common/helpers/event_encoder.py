@@ -0,0 +1,114 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# CloudEvent encoding of the v2 notifications.
+# A template is kept per node and resource with the ResourceAddress, the
+# event type and the data and value types already resolved. The last event
+# encoded for each instance of a resource is reused until its value or
+# time changes, so an event is built once for every topic and broker it
+# is cast to and for the QueryStatus requests that follow.
+#
+import threading
+
+from oslo_utils import uuidutils
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import ptpsync as utils
+
+# Event source to event type mapping
+SOURCE_TYPE = {
+    constants.SOURCE_SYNC_GNSS_SYNC_STATUS:
+        'event.sync.gnss-status.gnss-state-change',
+    constants.SOURCE_SYNC_PTP_CLOCK_CLASS:
+        'event.sync.ptp-status.ptp-clock-class-change',
+    constants.SOURCE_SYNC_PTP_LOCK_STATE:
+        'event.sync.ptp-status.ptp-state-change',
+    constants.SOURCE_SYNC_OS_CLOCK:
+        'event.sync.sync-status.os-clock-sync-state-change',
+    constants.SOURCE_SYNC_SYNC_STATE:
+        'event.sync.sync-status.synchronization-state-change',
+    constants.SOURCE_SYNCE_CLOCK_QUALITY:
+        'event.sync.synce-status.synce-clock-quality-change',
+    constants.SOURCE_SYNCE_LOCK_STATE_EXTENDED:
+        'event.sync.synce-status.synce-state-change-extended',
+    constants.SOURCE_SYNCE_LOCK_STATE:
+        'event.sync.synce-status.synce-state-change',
+}
+
+
+class EventTemplate:
+
+    def __init__(self, node_name, resource_path, data_type, value_type):
+        self.source = resource_path
+        self.type = SOURCE_TYPE[resource_path]
+        self.resource_address = utils.format_resource_address(
+            node_name, resource_path)
+        self.data_type = data_type
+        self.value_type = value_type
+        # Instance to the (value, time, event) last encoded for it
+        self._last = {}
+
+    def encode(self, value, event_time, instance=None):
+        """Return the event of an instance of the resource
+
+        The event previously returned for the instance is returned again
+        when neither value nor event_time changed. Callers must not modify
+        it.
+        """
+        last = self._last.get(instance)
+        if last is not None and last[0] == value and last[1] == event_time:
+            return last[2]
+        event = {
+            'id': uuidutils.generate_uuid(),
+            'specversion': constants.SPEC_VERSION,
+            'source': self.source,
+            'type': self.type,
+            'time': event_time,
+            'data': {
+                'version': constants.DATA_VERSION,
+                'values': [
+                    {
+                        'data_type': self.data_type,
+                        'ResourceAddress': self.resource_address,
+                        'value_type': self.value_type,
+                        'value': value.upper() if isinstance(value, str)
+                        else value
+                    }
+                ]
+            }
+        }
+        self._last[instance] = (value, event_time, event)
+        return event
+
+
+class EventEncoder:
+
+    def __init__(self, node_name):
+        self.node_name = node_name
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def template(self, resource_path,
+                 data_type=constants.DATA_TYPE_NOTIFICATION,
+                 value_type=constants.VALUE_TYPE_ENUMERATION,
+                 node_name=None):
+        key = (node_name or self.node_name, resource_path, data_type,
+               value_type)
+        template = self._templates.get(key)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(key)
+                if template is None:
+                    template = EventTemplate(*key)
+                    self._templates[key] = template
+        return template
+
+    def encode(self, resource_path, value, event_time, instance=None,
+               data_type=constants.DATA_TYPE_NOTIFICATION,
+               value_type=constants.VALUE_TYPE_ENUMERATION, node_name=None):
+        return self.template(resource_path, data_type, value_type,
+                             node_name).encode(value, event_time, instance)
@@ -5,13 +5,17 @@
 #
 import logging
 import datetime
-import os.path
 import re
+import threading
+import time
 
 from abc import ABC, abstractmethod
 
 from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import input_trace
 from trackingfunctionsdk.common.helpers import log_helper
+from trackingfunctionsdk.common.helpers import resource_watcher
+from trackingfunctionsdk.common.helpers import stage_timer
 from trackingfunctionsdk.common.helpers.cgu_handler import CguHandler
 from trackingfunctionsdk.model.dto.gnssstate import GnssState
 
@@ -34,9 +38,18 @@ class GnssMonitor(Observer):
     _state = GnssState()
     gnss_cgu_handler = None
 
+    # Kernel log events, see KernelLogSubject. While they are followed the
+    # cgu is only read when a DPLL event arrives or every
+    # cgu_verify_seconds.
+    kernel_events_active = False
+    cgu_verify_seconds = None
+    _kernel_event = False
+    _last_cgu_read = 0
+
     def __init__(self, config_file, nmea_serialport=None, pci_addr=None,
                  cgu_path=None):
         self.config_file = config_file
+        self._status_lock = threading.Lock()
         try:
             pattern = '(?<=' + \
                       constants.TS2PHC_CONFIG_PATH + \
@@ -59,7 +72,7 @@ class GnssMonitor(Observer):
         if self.gnss_cgu_handler.cgu_path is None:
             self.gnss_cgu_handler.get_cgu_path_from_pci_addr()
 
-        self.gnss_cgu_handler.read_cgu()
+        self.read_cgu()
         self.gnss_cgu_handler.cgu_output_to_dict()
 
         self.dmesg_values_to_check = {
@@ -68,36 +81,64 @@ class GnssMonitor(Observer):
         }
 
         # Initialize status
-        if self.gnss_cgu_handler.cgu_output_parsed[
-                'EEC DPLL']['Current reference'] == 'GNSS-1PPS':
-            self.gnss_eec_state = \
-                self.gnss_cgu_handler.cgu_output_parsed['EEC DPLL']['Status']
+        cgu_status = self.gnss_cgu_handler.cgu_status
+        if cgu_status.eec_dpll.current_reference == constants.GNSS_PIN:
+            self.gnss_eec_state = cgu_status.eec_dpll.status
 
-        if self.gnss_cgu_handler.cgu_output_parsed[
-                'PPS DPLL']['Current reference'] == 'GNSS-1PPS':
-            self.gnss_pps_state = \
-                self.gnss_cgu_handler.cgu_output_parsed['PPS DPLL']['Status']
+        if cgu_status.pps_dpll.current_reference == constants.GNSS_PIN:
+            self.gnss_pps_state = cgu_status.pps_dpll.status
 
     def update(self, subject, matched_line) -> None:
         LOG.info("Kernel event detected. %s" % matched_line)
+        self._kernel_event = True
         self.set_gnss_status()
 
+    def cgu_read_required(self):
+        if not self.kernel_events_active or self.cgu_verify_seconds is None:
+            return True
+        if self._kernel_event:
+            return True
+        return time.monotonic() - self._last_cgu_read >= \
+            self.cgu_verify_seconds
+
+    def read_cgu(self):
+        self.gnss_cgu_handler.cgu_output_raw = input_trace.read(
+            'cgu', self.ts2phc_service_name, self._read_cgu_output)
+
+    def _read_cgu_output(self):
+        self.gnss_cgu_handler.read_cgu()
+        return self.gnss_cgu_handler.cgu_output_raw
+
     def set_gnss_status(self):
+        # Called from the tracking loop and the kernel log subject
+        with self._status_lock:
+            self._set_gnss_status()
+
+    def _set_gnss_status(self):
         # Check that ts2phc is running, else Freerun
-        if not os.path.isfile('/var/run/ts2phc-%s.pid'
-                              % self.ts2phc_service_name):
+        with stage_timer.timed('critical_resources',
+                               self.ts2phc_service_name):
+            ts2phc = resource_watcher.exists(
+                constants.PIDFILE_PATH + 'ts2phc-%s.pid'
+                % self.ts2phc_service_name)
+        if not ts2phc:
             LOG.warning("TS2PHC instance %s is not running, "
                         "reporting GNSS unlocked."
                         % self.ts2phc_service_name)
             self._state = GnssState.Failure_Nofix
             return
 
-        self.gnss_cgu_handler.read_cgu()
-        self.gnss_cgu_handler.cgu_output_to_dict()
-        self.gnss_eec_state = self.gnss_eec_state = \
-            self.gnss_cgu_handler.cgu_output_parsed['EEC DPLL']['Status']
-        self.gnss_pps_state = \
-            self.gnss_cgu_handler.cgu_output_parsed['PPS DPLL']['Status']
+        if self.cgu_read_required():
+            self._kernel_event = False
+            self._last_cgu_read = time.monotonic()
+            with stage_timer.timed('cgu_read', self.ts2phc_service_name):
+                self.read_cgu()
+            with stage_timer.timed('cgu_parse', self.ts2phc_service_name):
+                self.gnss_cgu_handler.cgu_output_to_dict()
+            self.gnss_eec_state = \
+                self.gnss_cgu_handler.cgu_status.eec_dpll.status
+            self.gnss_pps_state = \
+                self.gnss_cgu_handler.cgu_status.pps_dpll.status
         LOG.debug("GNSS EEC Status is: %s" % self.gnss_eec_state)
         LOG.debug("GNSS PPS Status is: %s" % self.gnss_pps_state)
         if self.gnss_pps_state in [
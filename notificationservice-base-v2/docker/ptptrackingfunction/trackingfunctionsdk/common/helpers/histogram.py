@@ -0,0 +1,48 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Fixed bucket histogram of durations.
+# Observing is a bisect and two additions, cheap enough for the tracking
+# loop. The buckets are cumulative only when read, in the layout used by
+# the metrics exporter.
+#
+import bisect
+
+# Upper bounds in seconds, from a native pmc query to a stuck pmc run
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                    0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        # Last count is for the observations above the last bound
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def cumulative(self):
+        """Return the (upper bound, count) pairs, ending with +Inf"""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),),
+                                self._counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
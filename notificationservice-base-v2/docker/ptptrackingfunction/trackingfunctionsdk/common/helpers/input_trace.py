@@ -0,0 +1,330 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Record and replay of the raw inputs of the tracking function.
+# The monitors read their inputs (pmc results, PHC offsets, cgu output,
+# pidfile presence, phc2sys socket replies, ...) through read(). Without
+# a trace it only calls the reader. While recording, every value that
+# differs from the previous one of the same input is appended to a trace
+# file with its time. While replaying, the value an input had at the
+# current tick of the replay is returned instead of reading it.
+#
+# A trace file is JSON lines, gzip compressed when its name ends in .gz.
+# The first line is a header with the wall and monotonic times the trace
+# started at, every other line is one of:
+#   [time, source, key, value]
+#   [time, source, key, null, [exception name, message]]
+# time being the seconds since the start of the trace. The 'tick' source
+# marks the start of a tracking cycle with the monitors it polled, the
+# 'setup' source describes the monitors to build for the replay.
+#
+import bisect
+import builtins
+import collections
+import contextlib
+import datetime
+import gzip
+import json
+import logging
+import threading
+import time
+
+from trackingfunctionsdk.common.helpers import log_helper
+
+LOG = logging.getLogger(__name__)
+log_helper.config_logger(LOG)
+
+TRACE_VERSION = 1
+TICK = 'tick'
+SETUP = 'setup'
+# Longest time a recorded input waits in the file buffer
+FLUSH_SECONDS = 1.0
+
+Trace = collections.namedtuple('Trace', ['header', 'records'])
+
+_recorder = None
+_player = None
+
+
+class InputTraceError(LookupError):
+    pass
+
+
+def read(source, key, reader, *args):
+    """Return reader(*args), recorded or replayed when a trace is active"""
+    player = _player
+    if player is not None:
+        return player.read(source, key)
+    recorder = _recorder
+    if recorder is None:
+        return reader(*args)
+    try:
+        value = reader(*args)
+    except Exception as ex:
+        recorder.record_error(source, key, ex)
+        raise
+    recorder.record(source, key, value)
+    return value
+
+
+def recording():
+    return _recorder is not None
+
+
+def tick(names):
+    """Mark the start of a tracking cycle polling the named monitors"""
+    recorder = _recorder
+    if recorder is not None:
+        recorder.record(TICK, '', [list(name) for name in names],
+                        changed_only=False)
+
+
+def setup(key, value):
+    """Record the settings a replay needs to build a monitor"""
+    recorder = _recorder
+    if recorder is not None:
+        recorder.record(SETUP, key, value)
+
+
+def start_recording(path):
+    global _recorder
+    stop_recording()
+    _recorder = TraceRecorder(path)
+    LOG.info("Recording the tracking inputs to %s" % path)
+    return _recorder
+
+
+def stop_recording():
+    global _recorder
+    recorder = _recorder
+    _recorder = None
+    if recorder is not None:
+        recorder.close()
+
+
+@contextlib.contextmanager
+def replaying(player):
+    """Answer read() from a TracePlayer within the context"""
+    global _player
+    previous = _player
+    _player = player
+    try:
+        yield player
+    finally:
+        _player = previous
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't')
+    return open(path, mode)
+
+
+class TraceRecorder:
+
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        self._file = _open(path, 'w')
+        self._lock = threading.Lock()
+        # Last value recorded by input, unchanged values are not recorded
+        self._last = {}
+        self.start_monotonic = time.monotonic()
+        self._last_flush = self.start_monotonic
+        self._write({'trace': TRACE_VERSION, 'time': time.time(),
+                     'monotonic': self.start_monotonic})
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+
+    def _elapsed(self):
+        return round(time.monotonic() - self.start_monotonic, 6)
+
+    def record(self, source, key, value, changed_only=True):
+        with self._lock:
+            if self._file is None:
+                return
+            if changed_only:
+                input_key = (source, key)
+                if input_key in self._last and \
+                        self._last[input_key] == value:
+                    return
+                self._last[input_key] = value
+            self._append([self._elapsed(), source, key, value])
+
+    def record_error(self, source, key, ex):
+        with self._lock:
+            if self._file is None:
+                return
+            # The next value is recorded even when unchanged
+            self._last.pop((source, key), None)
+            self._append([self._elapsed(), source, key, None,
+                          [type(ex).__name__, str(ex)]])
+
+    def _append(self, entry):
+        try:
+            self._write(entry)
+        except (TypeError, ValueError) as ex:
+            LOG.warning("Unable to record %s %s: %s"
+                        % (entry[1], entry[2], ex))
+            return
+        self.records += 1
+        now = time.monotonic()
+        if now - self._last_flush >= FLUSH_SECONDS:
+            self._file.flush()
+            self._last_flush = now
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def load_trace(path):
+    """Return the Trace of a file, a truncated last record is ignored"""
+    header = None
+    records = []
+    with _open(path, 'r') as trace_file:
+        try:
+            for line in trace_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Cut off while recording
+                    break
+                if header is None:
+                    header = entry
+                else:
+                    records.append(entry)
+        except EOFError:
+            pass
+    if header is None or header.get('trace') != TRACE_VERSION:
+        raise InputTraceError("%s is not an input trace" % path)
+    return Trace(header, records)
+
+
+def _replayed_error(name, message):
+    error = getattr(builtins, name, None)
+    if isinstance(error, type) and issubclass(error, Exception):
+        return error(message)
+    return InputTraceError("%s: %s" % (name, message))
+
+
+class TracePlayer:
+
+    def __init__(self, trace):
+        self.header = trace.header
+        # (time, monitor names) of every tracking cycle
+        self.ticks = []
+        self._times = {}
+        self._records = {}
+        for record in trace.records:
+            elapsed, source, key = record[:3]
+            if source == TICK:
+                self.ticks.append(
+                    (elapsed, [tuple(name) for name in record[3]]))
+                continue
+            self._times.setdefault((source, key), []).append(elapsed)
+            self._records.setdefault((source, key), []).append(record)
+        # Values recorded from this time on are not visible yet. Set to the
+        # start of the next tick while replaying a tick, as the inputs of a
+        # cycle are recorded after its tick.
+        self.horizon = float('inf')
+        self.reads = 0
+
+    def read(self, source, key):
+        times = self._times.get((source, key), ())
+        index = bisect.bisect_left(times, self.horizon) - 1
+        if index < 0:
+            raise InputTraceError("No %s input recorded for %s"
+                                  % (source, key))
+        self.reads += 1
+        record = self._records[(source, key)][index]
+        if len(record) > 4:
+            raise _replayed_error(*record[4])
+        return record[3]
+
+    def setup(self, key, default=None):
+        try:
+            return self.read(SETUP, key)
+        except InputTraceError:
+            return default
+
+
+class VirtualClock:
+    """Time of a replay, the recorded times shifted by elapsed seconds"""
+
+    def __init__(self, start_time, start_monotonic):
+        self.start_time = start_time
+        self.start_monotonic = start_monotonic
+        self.elapsed = 0.0
+
+    def advance_to(self, elapsed):
+        self.elapsed = max(self.elapsed, elapsed)
+
+    def time(self):
+        return self.start_time + self.elapsed
+
+    def monotonic(self):
+        return self.start_monotonic + self.elapsed
+
+
+class _VirtualTimeModule:
+    # Stands in for the time module of a monitor module
+
+    def __init__(self, clock):
+        self._clock = clock
+
+    def time(self):
+        return self._clock.time()
+
+    def monotonic(self):
+        return self._clock.monotonic()
+
+    def sleep(self, seconds):
+        self._clock.advance_to(self._clock.elapsed + seconds)
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+class _VirtualDatetimeModule:
+    # Stands in for the datetime module of a monitor module, the naive
+    # utcnow() of the monitors round trips through timestamp()
+
+    def __init__(self, clock):
+        def now(cls, tz=None):
+            return datetime.datetime.fromtimestamp(clock.time(), tz)
+
+        def utcnow(cls):
+            return datetime.datetime.fromtimestamp(clock.time())
+
+        self.datetime = type('datetime', (datetime.datetime,),
+                             {'now': classmethod(now),
+                              'utcnow': classmethod(utcnow)})
+
+    def __getattr__(self, name):
+        return getattr(datetime, name)
+
+
+@contextlib.contextmanager
+def virtual_time(clock, modules):
+    """Run the time and datetime of modules on a VirtualClock"""
+    shims = {'time': _VirtualTimeModule(clock),
+             'datetime': _VirtualDatetimeModule(clock)}
+    saved = []
+    for module in modules:
+        for name, shim in shims.items():
+            if hasattr(module, name):
+                saved.append((module, name, getattr(module, name)))
+                setattr(module, name, shim)
+    try:
+        yield clock
+    finally:
+        for module, name, value in saved:
+            setattr(module, name, value)
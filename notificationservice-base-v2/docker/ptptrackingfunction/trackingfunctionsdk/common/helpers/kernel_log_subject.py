@@ -0,0 +1,195 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Kernel log subject for the GnssMonitor observers.
+# Follows /dev/kmsg, or /logs/kern.log across rotations when kmsg cannot
+# be read, and notifies the observers registered for a NIC as soon as the
+# ice driver logs a DPLL state change of their GNSS pin, e.g.
+#   ice 0000:18:00.0: <DPLL0> state changed to: locked_ho_ack, pin GNSS-1PPS
+#
+import errno
+import logging
+import os
+import re
+import select
+import threading
+import time
+
+from abc import ABC, abstractmethod
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import log_helper
+
+LOG = logging.getLogger(__name__)
+log_helper.config_logger(LOG)
+
+DPLL_EVENT_PATTERN = re.compile(
+    r'(?P<pci_addr>[0-9a-fA-F]{4}:[0-9a-fA-F]{2}:[0-9a-fA-F]{2}\.\d+): '
+    r'<(?P<dpll>DPLL\d+)> state changed to: (?P<state>[^,\s]+)'
+    r'(?:, pin (?P<pin>\S+))?')
+
+
+class Subject(ABC):
+    @abstractmethod
+    def attach(self, observer) -> None:
+        """
+        Attach an observer to the subject.
+        """
+        pass
+
+    @abstractmethod
+    def detach(self, observer) -> None:
+        """
+        Detach an observer from the subject.
+        """
+        pass
+
+    @abstractmethod
+    def notify(self, observers, matched_line) -> None:
+        """
+        Notify observers about an event.
+        """
+        pass
+
+
+class KernelLogSubject(Subject, threading.Thread):
+
+    def __init__(self, sources=(constants.KMSG_PATH,
+                                constants.KERNEL_LOG_PATH),
+                 wakeup=None, retry=constants.KERNEL_LOG_RETRY):
+        super(KernelLogSubject, self).__init__(name='kernel-log',
+                                               daemon=True)
+        self.sources = sources
+        self.wakeup = wakeup
+        self.retry = retry
+        self._observers = []
+        self._stopped = threading.Event()
+
+    def attach(self, observer):
+        if observer not in self._observers:
+            self._observers.append(observer)
+
+    def detach(self, observer):
+        if observer in self._observers:
+            self._observers.remove(observer)
+
+    def notify(self, observers, matched_line):
+        for observer in observers:
+            try:
+                observer.update(self, matched_line)
+            except Exception as ex:
+                LOG.error("Kernel event update failed: %s" % ex)
+        if self.wakeup:
+            self.wakeup()
+
+    def stop(self):
+        self._stopped.set()
+
+    def match(self, line):
+        """Return the observers a kernel log line is relevant to"""
+        match = DPLL_EVENT_PATTERN.search(line)
+        if match is None:
+            return []
+        pci_addr = match.group('pci_addr').lower()
+        pin = match.group('pin')
+        observers = []
+        for observer in self._observers:
+            values = observer.dmesg_values_to_check
+            if (values.get('pci_addr') or '').lower() != pci_addr:
+                continue
+            if pin is not None and pin != values.get('pin'):
+                continue
+            observers.append(observer)
+        return observers
+
+    def handle_line(self, line):
+        observers = self.match(line)
+        if observers:
+            self.notify(observers, line.rstrip('\n'))
+
+    def set_active(self, active):
+        for observer in self._observers:
+            observer.kernel_events_active = active
+
+    def run(self):
+        while not self._stopped.is_set():
+            for source in self.sources:
+                try:
+                    if source == constants.KMSG_PATH:
+                        self.follow_kmsg(source)
+                    else:
+                        self.follow_file(source)
+                    break
+                except OSError as ex:
+                    LOG.warning("Unable to follow kernel log %s: %s"
+                                % (source, ex))
+                finally:
+                    self.set_active(False)
+            else:
+                self._stopped.wait(self.retry)
+
+    def follow_kmsg(self, path):
+        fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        try:
+            # Only new records are of interest
+            os.lseek(fd, 0, os.SEEK_END)
+            LOG.info("Following kernel events from %s" % path)
+            self.set_active(True)
+            while not self._stopped.is_set():
+                readable, _, _ = select.select([fd], [], [], 1)
+                if not readable:
+                    continue
+                try:
+                    record = os.read(fd, constants.KMSG_RECORD_SIZE)
+                except BlockingIOError:
+                    continue
+                except OSError as ex:
+                    if ex.errno == errno.EPIPE:
+                        # Records were overwritten before being read
+                        continue
+                    raise
+                # <prio>,<seq>,<usec>,<flags>;<message>
+                message = record.decode(errors='replace')
+                message = message.split(';', 1)[-1].split('\n', 1)[0]
+                self.handle_line(message)
+        finally:
+            os.close(fd)
+
+    def follow_file(self, path):
+        infile = open(path, 'r', errors='replace')
+        try:
+            infile.seek(0, os.SEEK_END)
+            LOG.info("Following kernel events from %s" % path)
+            self.set_active(True)
+            partial = ''
+            while not self._stopped.is_set():
+                line = infile.readline()
+                if line:
+                    partial += line
+                    if partial.endswith('\n'):
+                        self.handle_line(partial)
+                        partial = ''
+                    continue
+                if self._rotated(path, infile):
+                    LOG.info("%s rotated, reopening" % path)
+                    infile.close()
+                    infile = open(path, 'r', errors='replace')
+                    partial = ''
+                    continue
+                time.sleep(constants.KERNEL_LOG_POLL_INTERVAL)
+        finally:
+            infile.close()
+
+    def _rotated(self, path, infile):
+        try:
+            current = os.stat(path)
+        except FileNotFoundError:
+            # Between the rename and the creation of the new file
+            return False
+        opened = os.fstat(infile.fileno())
+        return current.st_ino != opened.st_ino or \
+            current.st_size < infile.tell()
@@ -0,0 +1,290 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Prometheus/OpenMetrics endpoint of the tracking function.
+# The values are read from the monitors, the scheduler and the publish
+# queue of the watcher when the endpoint is scraped, nothing is added to
+# the tracking loop besides the poll and stage duration histograms. The
+# prometheus_client package is optional, without it the endpoint is not
+# started.
+#
+import logging
+import time
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import log_helper
+
+try:
+    import prometheus_client
+    from prometheus_client.core import CounterMetricFamily
+    from prometheus_client.core import GaugeMetricFamily
+    from prometheus_client.core import HistogramMetricFamily
+    from prometheus_client.utils import floatToGoString
+except ImportError:
+    prometheus_client = None
+
+LOG = logging.getLogger(__name__)
+log_helper.config_logger(LOG)
+
+PREFIX = 'ptp_tracking_'
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _add_number(family, labels, value):
+    value = _number(value)
+    if value is not None:
+        family.add_metric(labels, value)
+
+
+def _histogram_buckets(histogram):
+    return [(floatToGoString(bound), count)
+            for bound, count in histogram.cumulative()]
+
+
+class PtpMetricsCollector:
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def collect(self):
+        for collect in (self.collect_ptp4l, self.collect_os_clock,
+                        self.collect_gnss, self.collect_polling,
+                        self.collect_publishing,
+                        self.collect_offset_statistics):
+            try:
+                families = collect()
+            except Exception as ex:
+                # A half updated monitor must not fail the whole scrape
+                LOG.warning("Failed to collect %s metrics: %s"
+                            % (collect.__name__, ex))
+                continue
+            for family in families:
+                yield family
+
+    def collect_ptp4l(self):
+        master_offset = GaugeMetricFamily(
+            PREFIX + 'ptp4l_master_offset_nanoseconds',
+            'Offset from the master reported by ptp4l',
+            labels=['instance'])
+        clock_class = GaugeMetricFamily(
+            PREFIX + 'ptp4l_clock_class',
+            'Clock class of the ptp4l instance', labels=['instance'])
+        gm_clock_class = GaugeMetricFamily(
+            PREFIX + 'ptp4l_grandmaster_clock_class',
+            'Clock class of the grandmaster', labels=['instance'])
+        port_state = GaugeMetricFamily(
+            PREFIX + 'ptp4l_port_state',
+            'State of a port of the ptp4l instance, 1 for its current state',
+            labels=['instance', 'port', 'state'])
+        sync_state = GaugeMetricFamily(
+            PREFIX + 'ptp4l_sync_state',
+            'Lock state of the ptp4l instance, 1 for its current state',
+            labels=['instance', 'state'])
+        suppressed = CounterMetricFamily(
+            PREFIX + 'ptp4l_events_suppressed',
+            'State changes of the ptp4l instance damped away',
+            labels=['instance', 'resource'])
+        for ptp_monitor in self.watcher.ptp_monitor_list:
+            instance = ptp_monitor.ptp4l_service_name
+            results = ptp_monitor.pmc_query_results
+            offset = results.get(constants.MASTER_OFFSET)
+            if ptp_monitor.subscription_active and \
+                    ptp_monitor.master_offset is not None:
+                # Pushed by ptp4l, fresher than the last poll
+                offset = ptp_monitor.master_offset
+            _add_number(master_offset, [instance], offset)
+            _add_number(clock_class, [instance],
+                        results.get(constants.CLOCK_CLASS))
+            _add_number(gm_clock_class, [instance],
+                        results.get(constants.GM_CLOCK_CLASS))
+            for key, value in results.items():
+                port = key[len('port'):]
+                if key.startswith('port') and port.isdigit():
+                    port_state.add_metric([instance, port, str(value)], 1)
+            _, state, _ = ptp_monitor.get_ptp_sync_state()
+            sync_state.add_metric([instance, str(state)], 1)
+            dampers = self.watcher.ptp_event_dampers.get(instance)
+            if dampers:
+                suppressed.add_metric([instance, 'lock-state'],
+                                      dampers[0].suppressed)
+                suppressed.add_metric([instance, 'clock-class'],
+                                      dampers[1].suppressed)
+        return [master_offset, clock_class, gm_clock_class, port_state,
+                sync_state, suppressed]
+
+    def collect_os_clock(self):
+        labels = ['instance']
+        offset = GaugeMetricFamily(
+            PREFIX + 'os_clock_offset_nanoseconds',
+            'Offset between the PHC and the system clock, UTC offset '
+            'included',
+            labels=labels)
+        offset_min = GaugeMetricFamily(
+            PREFIX + 'os_clock_offset_min_nanoseconds',
+            'Lowest offset sample of the last poll', labels=labels)
+        offset_max = GaugeMetricFamily(
+            PREFIX + 'os_clock_offset_max_nanoseconds',
+            'Highest offset sample of the last poll', labels=labels)
+        sync_state = GaugeMetricFamily(
+            PREFIX + 'os_clock_sync_state',
+            'Lock state of the system clock, 1 for its current state',
+            labels=['instance', 'state'])
+        os_clock_monitor = self.watcher.os_clock_monitor
+        instance = str(os_clock_monitor.phc2sys_instance)
+        _add_number(offset, [instance], os_clock_monitor.offset)
+        _add_number(offset_min, [instance], os_clock_monitor.offset_min)
+        _add_number(offset_max, [instance], os_clock_monitor.offset_max)
+        sync_state.add_metric(
+            [instance, str(os_clock_monitor.get_os_clock_state())], 1)
+        return [offset, offset_min, offset_max, sync_state]
+
+    def collect_gnss(self):
+        dpll_status = GaugeMetricFamily(
+            PREFIX + 'gnss_dpll_status',
+            'Status of a DPLL of the GNSS receiver, 1 for its current status',
+            labels=['instance', 'dpll', 'status'])
+        phase_offset = GaugeMetricFamily(
+            PREFIX + 'gnss_pps_dpll_phase_offset',
+            'Phase offset of the PPS DPLL as reported by the cgu',
+            labels=['instance'])
+        sync_state = GaugeMetricFamily(
+            PREFIX + 'gnss_sync_state',
+            'Sync state of the GNSS receiver, 1 for its current state',
+            labels=['instance', 'state'])
+        for gnss in self.watcher.observer_list:
+            instance = gnss.ts2phc_service_name
+            sync_state.add_metric([instance, str(gnss._state)], 1)
+            cgu_status = gnss.gnss_cgu_handler.cgu_status
+            if cgu_status is None:
+                continue
+            if cgu_status.eec_dpll is not None:
+                dpll_status.add_metric(
+                    [instance, 'eec', str(cgu_status.eec_dpll.status)], 1)
+            if cgu_status.pps_dpll is not None:
+                dpll_status.add_metric(
+                    [instance, 'pps', str(cgu_status.pps_dpll.status)], 1)
+                _add_number(phase_offset, [instance],
+                            cgu_status.pps_dpll.phase_offset)
+        return [dpll_status, phase_offset, sync_state]
+
+    def collect_polling(self):
+        monitor_scheduler = self.watcher.monitor_scheduler
+        durations = HistogramMetricFamily(
+            PREFIX + 'poll_duration_seconds',
+            'Duration of the polls of a resource',
+            labels=['resource', 'instance'])
+        for name, histogram in list(
+                monitor_scheduler.sample_durations.items()):
+            if not isinstance(name, tuple):
+                name = (name,)
+            durations.add_metric(
+                [str(name[0]), str(name[1]) if len(name) > 1 else ''],
+                _histogram_buckets(histogram), histogram.sum)
+        stages = HistogramMetricFamily(
+            PREFIX + 'stage_duration_seconds',
+            'Duration of a stage of the tracking loop',
+            labels=['stage', 'instance'])
+        for (stage, instance), histogram in \
+                self.watcher.stage_timer.histograms():
+            stages.add_metric([stage, str(instance)],
+                              _histogram_buckets(histogram), histogram.sum)
+        late = CounterMetricFamily(
+            PREFIX + 'poll_late_samples',
+            'Polls that did not complete within the sample deadline')
+        late.add_metric([], monitor_scheduler.late_samples)
+        failed = CounterMetricFamily(
+            PREFIX + 'poll_failed_samples', 'Polls that raised an error')
+        failed.add_metric([], monitor_scheduler.failed_samples)
+        overruns = CounterMetricFamily(
+            PREFIX + 'loop_overruns',
+            'Tracking cycles longer than the poll period')
+        overruns.add_metric([], monitor_scheduler.overruns)
+        return [durations, stages, late, failed, overruns]
+
+    def collect_publishing(self):
+        metrics = self.watcher.publish_queue.metrics()
+        events = CounterMetricFamily(
+            PREFIX + 'publish_events',
+            'Events handed to the publish queue, by outcome',
+            labels=['outcome'])
+        for outcome in ['queued', 'coalesced', 'dropped', 'sent', 'failed']:
+            events.add_metric([outcome], getattr(metrics, outcome))
+        depth = GaugeMetricFamily(
+            PREFIX + 'publish_queue_depth', 'Events waiting to be sent')
+        depth.add_metric([], metrics.depth)
+        latency = GaugeMetricFamily(
+            PREFIX + 'publish_latency_seconds',
+            'Time from queuing to sending an event', labels=['statistic'])
+        latency.add_metric(['last'], metrics.send_latency_last)
+        latency.add_metric(['max'], metrics.send_latency_max)
+        latency.add_metric(['mean'], metrics.send_latency_mean)
+        return [events, depth, latency]
+
+    def collect_offset_statistics(self):
+        labels = ['clock', 'instance', 'window']
+        tau_labels = labels + ['tau']
+        mean = GaugeMetricFamily(
+            PREFIX + 'offset_mean_nanoseconds',
+            'Mean offset over the window', labels=labels)
+        stddev = GaugeMetricFamily(
+            PREFIX + 'offset_stddev_nanoseconds',
+            'Standard deviation of the offset over the window',
+            labels=labels)
+        max_abs = GaugeMetricFamily(
+            PREFIX + 'offset_max_abs_nanoseconds',
+            'Largest absolute offset over the window', labels=labels)
+        mtie = GaugeMetricFamily(
+            PREFIX + 'offset_mtie_nanoseconds',
+            'MTIE over the window at an observation interval',
+            labels=tau_labels)
+        tdev = GaugeMetricFamily(
+            PREFIX + 'offset_tdev_nanoseconds',
+            'TDEV over the window at an observation interval',
+            labels=tau_labels)
+        histories = [('ptp4l', ptp_monitor.ptp4l_service_name,
+                      ptp_monitor.offset_history)
+                     for ptp_monitor in self.watcher.ptp_monitor_list]
+        os_clock_monitor = self.watcher.os_clock_monitor
+        histories.append(('os_clock', str(os_clock_monitor.phc2sys_instance),
+                          os_clock_monitor.offset_history))
+        taus = self.watcher.offset_statistics_taus
+        now = time.time()
+        for clock, instance, history in histories:
+            if history is None:
+                continue
+            for window in self.watcher.offset_statistics_windows:
+                statistics = history.statistics(window, taus, now)
+                window_labels = [clock, instance, '%g' % window]
+                _add_number(mean, window_labels, statistics.mean)
+                _add_number(stddev, window_labels, statistics.stddev)
+                _add_number(max_abs, window_labels, statistics.max_abs)
+                for tau in taus:
+                    _add_number(mtie, window_labels + ['%g' % tau],
+                                statistics.mtie[tau])
+                    _add_number(tdev, window_labels + ['%g' % tau],
+                                statistics.tdev[tau])
+        return [mean, stddev, max_abs, mtie, tdev]
+
+
+def start_metrics_exporter(watcher, port, address=constants.METRICS_ADDRESS):
+    """Serve the metrics of a watcher over http, return the registry"""
+    if prometheus_client is None:
+        LOG.warning("prometheus_client is not installed, metrics are not "
+                    "exported")
+        return None
+    registry = prometheus_client.CollectorRegistry(auto_describe=False)
+    registry.register(PtpMetricsCollector(watcher))
+    prometheus_client.start_http_server(port, addr=address,
+                                        registry=registry)
+    LOG.info("Exporting metrics on %s:%d" % (address, port))
+    return registry
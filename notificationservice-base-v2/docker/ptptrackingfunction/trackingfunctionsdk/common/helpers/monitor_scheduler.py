@@ -0,0 +1,120 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Samples the PTP, GNSS and OS clock monitors of one tracking cycle
+# concurrently on a bounded worker pool, so a slow pmc or phc_ctl call
+# only delays the resource it belongs to.
+#
+import concurrent.futures
+import logging
+import time
+
+from trackingfunctionsdk.common.helpers import log_helper
+from trackingfunctionsdk.common.helpers.histogram import Histogram
+
+LOG = logging.getLogger(__name__)
+log_helper.config_logger(LOG)
+
+# Slowest stages logged with an overrun
+OVERRUN_REPORTED_STAGES = 8
+
+
+class MonitorScheduler:
+
+    def __init__(self, max_workers, sample_deadline):
+        self.max_workers = max_workers
+        self.sample_deadline = sample_deadline
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='monitor')
+        # Samples still running from a previous cycle, by task name
+        self._in_flight = {}
+        # Tasks of the last cycle that missed the deadline
+        self.deferred = []
+        self.late_samples = 0
+        self.failed_samples = 0
+        self.overruns = 0
+        # Duration of the samples by task name, a task name is only ever
+        # sampled by one worker at a time
+        self.sample_durations = {}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+    def sample(self, tasks):
+        """Run every task of the cycle and wait for them up to the deadline
+
+        tasks is a dict of name to callable. Returns a dict of name to the
+        callable result for the tasks that completed. A task that misses
+        the deadline keeps running and is not resubmitted, its result is
+        returned by the first cycle that finds it completed.
+        """
+        for name, task in tasks.items():
+            if name not in self._in_flight:
+                if name not in self.sample_durations:
+                    self.sample_durations[name] = Histogram()
+                self._in_flight[name] = self.executor.submit(
+                    self._timed, self.sample_durations[name], task)
+        futures = [self._in_flight[name] for name in tasks]
+        concurrent.futures.wait(futures, timeout=self.sample_deadline)
+
+        results = {}
+        late = []
+        for name in tasks:
+            future = self._in_flight[name]
+            if not future.done():
+                late.append(name)
+                continue
+            del self._in_flight[name]
+            try:
+                results[name] = future.result()
+            except Exception as ex:
+                self.failed_samples += 1
+                LOG.error("Sampling %s failed: %s" % (name, ex))
+        self.deferred = late
+        if late:
+            self.late_samples += len(late)
+            LOG.warning("Sampling %s did not complete within %ss, "
+                        "results deferred to a later cycle"
+                        % (', '.join(str(name) for name in late),
+                           self.sample_deadline))
+        return results
+
+    @staticmethod
+    def _timed(histogram, task):
+        start = time.monotonic()
+        try:
+            return task()
+        finally:
+            histogram.observe(time.monotonic() - start)
+
+    def check_overrun(self, cycle_start, period, stages=None):
+        """Count and report a cycle that ran longer than the poll period
+
+        stages maps the (stage, instance) timed during the cycle to the
+        seconds spent in them, the slowest are logged with the overrun.
+        """
+        elapsed = time.monotonic() - cycle_start
+        if elapsed > period:
+            self.overruns += 1
+            slowest = sorted((stages or {}).items(),
+                             key=lambda item: item[1],
+                             reverse=True)[:OVERRUN_REPORTED_STAGES]
+            LOG.warning("Tracking cycle overrun: elapsed=%.3fs period=%ss "
+                        "overruns=%d late_samples=%d deferred=%s stages=%s"
+                        % (elapsed, period, self.overruns, self.late_samples,
+                           ','.join(_format_name(name)
+                                    for name in self.deferred) or '-',
+                           ','.join('%s=%.3fs' % (_format_name(key), seconds)
+                                    for key, seconds in slowest) or '-'))
+        return elapsed
+
+
+def _format_name(name):
+    # ('ptp', 'ptp1') as ptp:ptp1, ('sample', '') as sample
+    if isinstance(name, tuple):
+        return ':'.join(str(part) for part in name if part)
+    return str(name)
@@ -0,0 +1,203 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Fixed size history of the offset samples of a clock.
+# The (timestamp, offset) samples are kept in a ring buffer of two
+# array('d'), appending never allocates. The statistics over a window of
+# the history are computed on demand: mean, standard deviation, maximum
+# absolute offset, MTIE and TDEV at observation intervals tau. With numpy,
+# installed in the tracking function images, the ring is unrolled into
+# arrays in a single gather and every statistic is vectorized. Without it
+# they are computed in Python, tens of milliseconds on a full history of
+# 4096 samples instead of a few.
+#
+# MTIE and TDEV assume the samples are evenly spaced, an observation
+# interval is converted to a number of samples with the median sampling
+# interval of the window.
+#
+import array
+import collections
+import math
+import threading
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+OffsetStatistics = collections.namedtuple(
+    'OffsetStatistics', ['count', 'mean', 'stddev', 'max_abs', 'mtie',
+                         'tdev'])
+
+
+class OffsetHistory:
+
+    def __init__(self, size):
+        self.size = max(2, size)
+        self._times = array.array('d', bytes(8 * self.size))
+        self._offsets = array.array('d', bytes(8 * self.size))
+        # Next slot written, and number of valid samples
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, offset, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            self._times[self._next] = timestamp
+            self._offsets[self._next] = offset
+            self._next = (self._next + 1) % self.size
+            self._count = min(self._count + 1, self.size)
+
+    def samples(self, window=None, now=None):
+        """Return the (timestamps, offsets) of a window, oldest first
+
+        window is in seconds back from now, None for the whole history.
+        Numpy arrays with numpy, lists without.
+        """
+        with self._lock:
+            start = (self._next - self._count) % self.size
+            if numpy is not None:
+                times = numpy.frombuffer(self._times, dtype=numpy.float64)
+                offsets = numpy.frombuffer(self._offsets,
+                                           dtype=numpy.float64)
+                order = numpy.roll(numpy.arange(self.size), -start)[
+                    :self._count]
+                times = times[order]
+                offsets = offsets[order]
+            else:
+                order = [(start + i) % self.size
+                         for i in range(self._count)]
+                times = [self._times[i] for i in order]
+                offsets = [self._offsets[i] for i in order]
+        if window is not None and self._count:
+            if now is None:
+                now = time.time()
+            if numpy is not None:
+                first = int(numpy.searchsorted(times, now - window))
+            else:
+                first = next((i for i, t in enumerate(times)
+                              if t >= now - window), len(times))
+            times = times[first:]
+            offsets = offsets[first:]
+        return times, offsets
+
+    def statistics(self, window=None, taus=(), now=None):
+        """Return the OffsetStatistics of a window
+
+        mtie and tdev map each observation interval of taus to its value,
+        None when the window is too short for it.
+        """
+        times, offsets = self.samples(window, now)
+        count = len(offsets)
+        if not count:
+            return OffsetStatistics(0, None, None, None,
+                                    dict((tau, None) for tau in taus),
+                                    dict((tau, None) for tau in taus))
+        if numpy is not None:
+            return _statistics_numpy(times, offsets, taus)
+        return _statistics_python(times, offsets, taus)
+
+
+def statistics_to_dict(statistics):
+    """Return OffsetStatistics as a dict that can be sent over rpc"""
+    result = statistics._asdict()
+    for name in ['mtie', 'tdev']:
+        result[name] = dict(('%g' % tau, value)
+                            for tau, value in result[name].items())
+    return result
+
+
+def parse_seconds_list(value):
+    """Parse a comma separated list of seconds, as in the settings"""
+    return tuple(float(item) for item in str(value).split(',')
+                 if item.strip())
+
+
+def _tau_samples(times, tau, median):
+    # Samples per observation interval
+    if len(times) < 2 or median <= 0:
+        return None
+    return max(1, int(round(tau / median)))
+
+
+def _statistics_numpy(times, offsets, taus):
+    count = len(offsets)
+    mean = float(offsets.mean())
+    stddev = float(offsets.std())
+    max_abs = float(numpy.abs(offsets).max())
+    median = float(numpy.median(numpy.diff(times))) if count > 1 else 0.0
+    mtie = {}
+    tdev = {}
+    for tau in taus:
+        n = _tau_samples(times, tau, median)
+        mtie[tau] = _mtie_numpy(offsets, n)
+        tdev[tau] = _tdev_numpy(offsets, n)
+    return OffsetStatistics(count, mean, stddev, max_abs, mtie, tdev)
+
+
+def _mtie_numpy(offsets, n):
+    if n is None or n >= len(offsets):
+        return None
+    windows = numpy.lib.stride_tricks.as_strided(
+        offsets, shape=(len(offsets) - n, n + 1),
+        strides=(offsets.strides[0], offsets.strides[0]))
+    return float((windows.max(axis=1) - windows.min(axis=1)).max())
+
+
+def _tdev_numpy(offsets, n):
+    if n is None or len(offsets) < 3 * n + 1:
+        return None
+    # Second differences at lag n, summed over sliding windows of n
+    second = offsets[2 * n:] - 2 * offsets[n:-n] + offsets[:-2 * n]
+    sums = numpy.cumsum(numpy.concatenate(([0.0], second)))
+    window_sums = sums[n:] - sums[:-n]
+    return float(math.sqrt(
+        (window_sums ** 2).mean() / (6.0 * n * n)))
+
+
+def _statistics_python(times, offsets, taus):
+    count = len(offsets)
+    mean = math.fsum(offsets) / count
+    stddev = math.sqrt(math.fsum((x - mean) ** 2 for x in offsets) / count)
+    max_abs = max(abs(x) for x in offsets)
+    intervals = sorted(b - a for a, b in zip(times, times[1:]))
+    median = 0.0
+    if intervals:
+        middle = len(intervals) // 2
+        median = intervals[middle] if len(intervals) % 2 else \
+            (intervals[middle - 1] + intervals[middle]) / 2
+    mtie = {}
+    tdev = {}
+    for tau in taus:
+        n = _tau_samples(times, tau, median)
+        mtie[tau] = _mtie_python(offsets, n)
+        tdev[tau] = _tdev_python(offsets, n)
+    return OffsetStatistics(count, mean, stddev, max_abs, mtie, tdev)
+
+
+def _mtie_python(offsets, n):
+    if n is None or n >= len(offsets):
+        return None
+    return max(max(offsets[i:i + n + 1]) - min(offsets[i:i + n + 1])
+               for i in range(len(offsets) - n))
+
+
+def _tdev_python(offsets, n):
+    if n is None or len(offsets) < 3 * n + 1:
+        return None
+    second = [offsets[i + 2 * n] - 2 * offsets[i + n] + offsets[i]
+              for i in range(len(offsets) - 2 * n)]
+    window_sums = [math.fsum(second[j:j + n])
+                   for j in range(len(second) - n + 1)]
+    return math.sqrt(math.fsum(s * s for s in window_sums) /
+                     len(window_sums) / (6.0 * n * n))
@@ -10,16 +10,24 @@ import os
 import re
 import socket
 import subprocess
+import time
 from glob import glob
 
 from trackingfunctionsdk.common.helpers import log_helper
 from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import input_trace
+from trackingfunctionsdk.common.helpers.phc_offset import PhcOffsetSampler
+from trackingfunctionsdk.common.helpers import pmc_client
+from trackingfunctionsdk.common.helpers import pmc_session
+from trackingfunctionsdk.common.helpers import stage_timer
 from trackingfunctionsdk.model.dto.osclockstate import OsClockState
 
 LOG = logging.getLogger(__name__)
 log_helper.config_logger(LOG)
 
 PLUGIN_STATUS_QUERY_EXEC = '/usr/sbin/pmc'
+PMC_CLIENT_MODE = os.environ.get('PTP4L_PMC_CLIENT',
+                                 constants.PMC_CLIENT_NATIVE).lower()
 
 
 class OsClockMonitor:
@@ -31,11 +39,23 @@ class OsClockMonitor:
         self.phc_interface = None
         self.ptp_device = None
         self.offset = None
+        # Spread of the offset samples of the last poll, in nanoseconds
+        self.offset_min = None
+        self.offset_max = None
+        # Offset samples minus the UTC offset, see OffsetHistory
+        self.offset_history = None
+        self.utc_offset_nanoseconds = None
+        self.phc_offset_sampler = None
         self.phc2sys_config = phc2sys_config
         self.config = None
         self.phc2sys_ha_enabled = False
         self.phc2sys_com_socket = None
         self.valid_phc_interfaces = None
+        # Cached phc2sys command line and utc offset, see
+        # _phc2sys_cache_key()
+        self._phc2sys_cmdline = None
+        self._utc_offset_key = None
+        self._utc_offset_expiry = 0
 
         self.phc2sys_tolerance_low = constants.PHC2SYS_TOLERANCE_LOW
         self.phc2sys_tolerance_high = constants.PHC2SYS_TOLERANCE_HIGH
@@ -80,10 +100,19 @@ class OsClockMonitor:
     def parse_phc2sys_config(self):
         LOG.debug("Parsing %s" % self.phc2sys_config)
         config = configparser.ConfigParser(delimiters=' ')
-        config.read(self.phc2sys_config)
+        config.read_string(self._read_phc2sys_config())
         self.config = config
 
+    def _read_phc2sys_config(self):
+        return input_trace.read('config', self.phc2sys_config, _read_text,
+                                self.phc2sys_config)
+
     def query_phc2sys_socket(self, query, unix_socket=None):
+        return input_trace.read('phc2sys_socket', query,
+                                self._query_phc2sys_socket, query,
+                                unix_socket)
+
+    def _query_phc2sys_socket(self, query, unix_socket):
         if unix_socket:
             try:
                 client_socket = socket.socket(
@@ -132,11 +161,31 @@ class OsClockMonitor:
         LOG.debug("Phc2sys HA interface: %s ptp_device: %s" %
                   (self.phc_interface, self.ptp_device))
 
-    def set_utc_offset(self, pidfile_path="/var/run/"):
+    def _phc2sys_cache_key(self, pidfile_path):
+        # phc2sys rewrites its pidfile when it restarts, so the pidfile and
+        # config file stats identify the running command line and config
+        # without reading either file
+        pidfile = pidfile_path + "phc2sys-" + self.phc2sys_instance + ".pid"
+        try:
+            pidfile_stat = os.stat(pidfile)
+            config_stat = os.stat(self.phc2sys_config)
+        except OSError:
+            return None
+        return (pidfile_stat.st_ino, pidfile_stat.st_mtime_ns,
+                config_stat.st_mtime_ns, self.phc_interface)
+
+    def set_utc_offset(self, pidfile_path=None):
+        pidfile_path = pidfile_path or constants.PIDFILE_PATH
+        cache_key = self._phc2sys_cache_key(pidfile_path)
+        if cache_key is not None and cache_key == self._utc_offset_key \
+                and time.monotonic() < self._utc_offset_expiry:
+            return
+
         # Check command line options for offset
         utc_offset = self._get_phc2sys_command_line_option(pidfile_path, '-O')
         domain_number = None
         uds_addr = None
+        utc_offset_valid = True
 
         # If not, check config file for uds_address and domainNumber
         # If uds_address, get utc_offset from TIME_PROPERTIES_DATA_SET using the phc2sys config
@@ -162,25 +211,34 @@ class OsClockMonitor:
                     LOG.debug("set_utc_offset: domainNumber is %s" %
                               domain_number)
 
-                #
-                # sudo /usr/sbin/pmc -u -b 0 'GET TIME_PROPERTIES_DATA_SET'
-                #
-                data = subprocess.check_output(
-                    [PLUGIN_STATUS_QUERY_EXEC, '-f', self.phc2sys_config, '-u', '-b', '0', '-d',
-                     domain_number, 'GET TIME_PROPERTIES_DATA_SET']).decode()
-
-                for line in data.split('\n'):
-                    if 'currentUtcOffset ' in line:
-                        utc_offset = line.split()[1]
-                    if 'currentUtcOffsetValid ' in line:
-                        utc_offset_valid = bool(int(line.split()[1]))
+                with stage_timer.timed('pmc', str(self.phc2sys_instance)):
+                    time_properties = input_trace.read(
+                        'time_properties', str(self.phc2sys_instance),
+                        self._get_time_properties_data_set, uds_addr,
+                        domain_number)
+                if 'currentUtcOffset' in time_properties:
+                    utc_offset = time_properties['currentUtcOffset']
+                if 'currentUtcOffsetValid' in time_properties:
+                    utc_offset_valid = bool(
+                        int(time_properties['currentUtcOffsetValid']))
 
                 if not utc_offset_valid:
                     utc_offset = constants.UTC_OFFSET
                     LOG.warning('currentUtcOffsetValid is %s, using the default currentUtcOffset %s'
                                 % (utc_offset_valid, utc_offset))
+            else:
+                utc_offset_valid = True
+
+        # Until ptp4l reports a valid offset it is queried on every poll
+        if utc_offset_valid:
+            self._utc_offset_key = cache_key
+            self._utc_offset_expiry = time.monotonic() + \
+                constants.UTC_OFFSET_CACHE_SECONDS
+        else:
+            self._utc_offset_key = None
 
         utc_offset_nanoseconds = abs(int(utc_offset)) * 1000000000
+        self.utc_offset_nanoseconds = utc_offset_nanoseconds
         self.phc2sys_tolerance_low = utc_offset_nanoseconds - \
             self.phc2sys_tolerance_threshold
         self.phc2sys_tolerance_high = utc_offset_nanoseconds + \
@@ -190,8 +248,35 @@ class OsClockMonitor:
         LOG.info('phc2sys_tolerance_low is %s, phc2sys_tolerance_high is %s'
                  % (self.phc2sys_tolerance_low, self.phc2sys_tolerance_high))
 
-    def get_os_clock_time_source(self, pidfile_path="/var/run/"):
+    def _get_time_properties_data_set(self, uds_addr, domain_number):
+        if PMC_CLIENT_MODE == constants.PMC_CLIENT_SHELL:
+            # Shares the pmc session of the ptp4l instance phc2sys follows
+            session = pmc_session.get_session(self.phc2sys_config, uds_addr,
+                                              domain_number)
+            try:
+                for response in session.query(
+                        ['GET TIME_PROPERTIES_DATA_SET']):
+                    return response.values
+            except pmc_client.PmcError as ex:
+                LOG.warning("pmc session query failed, running pmc: %s"
+                            % ex)
+        #
+        # sudo /usr/sbin/pmc -u -b 0 'GET TIME_PROPERTIES_DATA_SET'
+        #
+        data = subprocess.check_output(
+            [PLUGIN_STATUS_QUERY_EXEC, '-f', self.phc2sys_config, '-u', '-b', '0', '-d',
+             domain_number, 'GET TIME_PROPERTIES_DATA_SET']).decode()
+
+        time_properties = {}
+        for line in data.split('\n'):
+            fields = line.split()
+            if len(fields) > 1:
+                time_properties[fields[0]] = fields[1]
+        return time_properties
+
+    def get_os_clock_time_source(self, pidfile_path=None):
         """Determine which PHC is disciplining the OS clock"""
+        pidfile_path = pidfile_path or constants.PIDFILE_PATH
         self.phc_interface = None
         self.phc_interface = self._get_phc2sys_command_line_option(
             pidfile_path, '-s')
@@ -207,16 +292,29 @@ class OsClockMonitor:
         else:
             self.ptp_device = self._get_interface_phc_device()
 
-    def _get_phc2sys_command_line_option(self, pidfile_path, flag):
+    def _get_phc2sys_cmdline(self, pidfile_path):
+        cache_key = self._phc2sys_cache_key(pidfile_path)
+        if cache_key is not None and self._phc2sys_cmdline is not None \
+                and self._phc2sys_cmdline[0] == cache_key:
+            return self._phc2sys_cmdline[1]
+
         pidfile = pidfile_path + "phc2sys-" + self.phc2sys_instance + ".pid"
+        with open(pidfile, 'r') as f:
+            pid = f.readline().strip()
+        # Get command line params
+        cmdline_file = constants.HOST_PROC_PATH + pid + "/cmdline"
+        with open(cmdline_file, 'r') as f:
+            cmdline_args = f.readline().strip()
+        cmdline_args = cmdline_args.split("\x00")
+        if cache_key is not None:
+            self._phc2sys_cmdline = (cache_key, cmdline_args)
+        return cmdline_args
+
+    def _get_phc2sys_command_line_option(self, pidfile_path, flag):
         try:
-            with open(pidfile, 'r') as f:
-                pid = f.readline().strip()
-            # Get command line params
-            cmdline_file = "/host/proc/" + pid + "/cmdline"
-            with open(cmdline_file, 'r') as f:
-                cmdline_args = f.readline().strip()
-            cmdline_args = cmdline_args.split("\x00")
+            cmdline_args = input_trace.read(
+                'phc2sys_cmdline', str(self.phc2sys_instance),
+                self._get_phc2sys_cmdline, pidfile_path)
         except OSError as ex:
             LOG.warning("Cannot open file. %s" % ex)
             return None
@@ -233,9 +331,8 @@ class OsClockMonitor:
         return value
 
     def _check_config_file_interface(self):
-        with open(self.phc2sys_config, 'r') as f:
-            config_lines = f.readlines()
-            config_lines = [line.rstrip() for line in config_lines]
+        config_lines = [line.rstrip() for line in
+                        self._read_phc2sys_config().splitlines()]
 
         for line in config_lines:
             # Find the interface value inside the square brackets
@@ -248,15 +345,20 @@ class OsClockMonitor:
 
     def _get_interface_phc_device(self):
         """Determine the phc device for the interface"""
-        pattern = "/hostsys/class/net/" + self.phc_interface + "/device/ptp/*"
+        return input_trace.read('phc_device', self.phc_interface,
+                                self._find_interface_phc_device)
+
+    def _find_interface_phc_device(self):
+        pattern = constants.HOST_SYSFS_PATH + "class/net/" + \
+            self.phc_interface + "/device/ptp/*"
         ptp_device = glob(pattern)
         if len(ptp_device) == 0:
             # Try the 0th interface instead, required for some NIC types
             phc_interface_base = self.phc_interface[:-1] + "0"
             LOG.info("No ptp device found at %s trying %s instead"
                      % (pattern, phc_interface_base))
-            pattern = "/hostsys/class/net/" + phc_interface_base + \
-                      "/device/ptp/*"
+            pattern = constants.HOST_SYSFS_PATH + "class/net/" + \
+                phc_interface_base + "/device/ptp/*"
             ptp_device = glob(pattern)
             if len(ptp_device) == 0:
                 LOG.warning("No ptp device found for base interface at %s"
@@ -283,12 +385,15 @@ class OsClockMonitor:
             return
         try:
             ptp_device_path = "/dev/" + self.ptp_device
-            offset = subprocess.check_output(
-                [constants.PHC_CTL_PATH, ptp_device_path, 'cmp']
-            ).decode().split()[-1]
-            offset = offset.strip("-ns")
+            offset, self.offset_min, self.offset_max = input_trace.read(
+                'phc_offset', self.ptp_device, self._read_phc_offset,
+                ptp_device_path)
             LOG.debug("PHC offset is %s" % offset)
             self.offset = offset
+            if self.offset_history is not None and \
+                    self.utc_offset_nanoseconds is not None:
+                self.offset_history.append(
+                    int(offset) - self.utc_offset_nanoseconds)
         except Exception as ex:
             # We have seen rare instances where the ptp device cannot be read
             # but then works fine on the next attempt. Setting the offset to 0
@@ -302,6 +407,41 @@ class OsClockMonitor:
                         % ptp_device_path)
             self.offset = "0"
 
+    def _read_phc_offset(self, ptp_device_path):
+        # Return the offset and the spread of its samples, if known
+        with stage_timer.timed('phc_sample', self.ptp_device):
+            phc_offset = self._sample_phc_offset(ptp_device_path)
+        if phc_offset is not None:
+            # The offset is kept as a magnitude, so are the bounds of its
+            # samples
+            bounds = sorted([abs(phc_offset.minimum),
+                             abs(phc_offset.maximum)])
+            if phc_offset.minimum < 0 < phc_offset.maximum:
+                bounds[0] = 0
+            return str(abs(phc_offset.median)), bounds[0], bounds[1]
+        with stage_timer.timed('phc_ctl', self.ptp_device):
+            offset = subprocess.check_output(
+                [constants.PHC_CTL_PATH, ptp_device_path, 'cmp']
+            ).decode().split()[-1]
+        return offset.strip("-ns"), None, None
+
+    def _sample_phc_offset(self, ptp_device_path):
+        # Read the offset in process, phc_ctl is only used when the ioctls
+        # are not supported or the device cannot be read directly
+        if self.phc_offset_sampler is None or \
+                self.phc_offset_sampler.device != ptp_device_path:
+            if self.phc_offset_sampler is not None:
+                self.phc_offset_sampler.close()
+            self.phc_offset_sampler = PhcOffsetSampler(ptp_device_path)
+        if not self.phc_offset_sampler.is_supported():
+            return None
+        try:
+            return self.phc_offset_sampler.measure()
+        except OSError as ex:
+            LOG.debug("Unable to sample %s offset, using phc_ctl: %s"
+                      % (ptp_device_path, ex))
+            return None
+
     def set_os_clock_state(self):
         offset_int = int(self.offset)
         if offset_int > self.phc2sys_tolerance_high or \
@@ -357,6 +497,15 @@ class OsClockMonitor:
         return new_event, self.get_os_clock_state(), event_time
 
 
+def _read_text(path):
+    # Content of a config file, empty when it cannot be read
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except OSError:
+        return ''
+
+
 if __name__ == "__main__":
     # This file can be run in a ptp-notification pod to verify the
     # functionality of os_clock_monitor.
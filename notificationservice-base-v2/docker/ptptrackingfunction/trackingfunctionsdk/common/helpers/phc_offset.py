@@ -0,0 +1,152 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# In-process PHC to CLOCK_REALTIME offset measurement.
+# Reads the offset with the PTP_SYS_OFFSET_PRECISE or
+# PTP_SYS_OFFSET_EXTENDED ioctls of the PHC character device, the same
+# measurement 'phc_ctl /dev/ptpN cmp' makes, without forking phc_ctl on
+# every poll. Several samples are taken and summarized as median, min and
+# max.
+#
+import collections
+import errno
+import fcntl
+import logging
+import os
+import struct
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import log_helper
+
+LOG = logging.getLogger(__name__)
+log_helper.config_logger(LOG)
+
+# linux/ptp_clock.h
+PTP_MAX_SAMPLES = 25
+PTP_CLOCK_TIME = struct.Struct('qI4x')
+PTP_SYS_OFFSET_EXTENDED_HEADER = struct.Struct('I12x')
+PTP_SYS_OFFSET_EXTENDED_SIZE = PTP_SYS_OFFSET_EXTENDED_HEADER.size + \
+    PTP_MAX_SAMPLES * 3 * PTP_CLOCK_TIME.size
+PTP_SYS_OFFSET_PRECISE_SIZE = 3 * PTP_CLOCK_TIME.size + 16
+
+
+def _iowr(nr, size):
+    return (3 << 30) | (size << 16) | (ord('=') << 8) | nr
+
+
+PTP_SYS_OFFSET_PRECISE = _iowr(8, PTP_SYS_OFFSET_PRECISE_SIZE)
+PTP_SYS_OFFSET_EXTENDED = _iowr(9, PTP_SYS_OFFSET_EXTENDED_SIZE)
+
+METHOD_PRECISE = 'precise'
+METHOD_EXTENDED = 'extended'
+
+# errno values returned by drivers lacking an ioctl
+UNSUPPORTED_ERRNOS = (errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL)
+
+# Offsets are CLOCK_REALTIME minus PHC time in nanoseconds, as phc_ctl cmp
+# reports them
+PhcOffset = collections.namedtuple('PhcOffset',
+                                   ['median', 'minimum', 'maximum',
+                                    'samples', 'method'])
+
+
+def _nanoseconds(buffer, offset):
+    sec, nsec = PTP_CLOCK_TIME.unpack_from(buffer, offset)
+    return sec * 1000000000 + nsec
+
+
+def decode_precise(buffer):
+    """Return the offset of a PTP_SYS_OFFSET_PRECISE cross timestamp"""
+    device = _nanoseconds(buffer, 0)
+    sys_realtime = _nanoseconds(buffer, PTP_CLOCK_TIME.size)
+    return sys_realtime - device
+
+
+def decode_extended(buffer):
+    """Return the offsets of the PTP_SYS_OFFSET_EXTENDED samples
+
+    Each sample is a PHC reading between two system clock readings, the
+    offset is taken from the midpoint of the system readings.
+    """
+    n_samples, = PTP_SYS_OFFSET_EXTENDED_HEADER.unpack_from(buffer)
+    offsets = []
+    for sample in range(min(n_samples, PTP_MAX_SAMPLES)):
+        offset = PTP_SYS_OFFSET_EXTENDED_HEADER.size + \
+            sample * 3 * PTP_CLOCK_TIME.size
+        before = _nanoseconds(buffer, offset)
+        phc = _nanoseconds(buffer, offset + PTP_CLOCK_TIME.size)
+        after = _nanoseconds(buffer, offset + 2 * PTP_CLOCK_TIME.size)
+        offsets.append((before + after) // 2 - phc)
+    return offsets
+
+
+def summarize(offsets, method):
+    offsets = sorted(offsets)
+    return PhcOffset(offsets[len(offsets) // 2], offsets[0], offsets[-1],
+                     len(offsets), method)
+
+
+class PhcOffsetSampler:
+
+    def __init__(self, device, samples=constants.PHC_OFFSET_SAMPLES):
+        self.device = device
+        self.samples = max(1, min(samples, PTP_MAX_SAMPLES))
+        self._fd = None
+        # Methods the driver rejected, tried in this order
+        self._methods = [METHOD_PRECISE, METHOD_EXTENDED]
+
+    def is_supported(self):
+        return bool(self._methods)
+
+    def open(self):
+        if self._fd is None:
+            self._fd = os.open(self.device, os.O_RDONLY | os.O_CLOEXEC)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def measure(self):
+        """Sample the offset between CLOCK_REALTIME and the PHC
+
+        Returns a PhcOffset, or None when the driver supports none of the
+        ioctls. Raises OSError when the device cannot be read.
+        """
+        while self._methods:
+            method = self._methods[0]
+            try:
+                self.open()
+                if method == METHOD_PRECISE:
+                    offsets = self._measure_precise()
+                else:
+                    offsets = self._measure_extended()
+            except OSError as ex:
+                if ex.errno not in UNSUPPORTED_ERRNOS:
+                    self.close()
+                    raise
+                LOG.info("%s does not support the %s offset ioctl"
+                         % (self.device, method))
+                self._methods.pop(0)
+                continue
+            return summarize(offsets, method)
+        self.close()
+        return None
+
+    def _measure_precise(self):
+        offsets = []
+        for _ in range(self.samples):
+            buffer = bytearray(PTP_SYS_OFFSET_PRECISE_SIZE)
+            fcntl.ioctl(self._fd, PTP_SYS_OFFSET_PRECISE, buffer, True)
+            offsets.append(decode_precise(buffer))
+        return offsets
+
+    def _measure_extended(self):
+        buffer = bytearray(PTP_SYS_OFFSET_EXTENDED_SIZE)
+        PTP_SYS_OFFSET_EXTENDED_HEADER.pack_into(buffer, 0, self.samples)
+        fcntl.ioctl(self._fd, PTP_SYS_OFFSET_EXTENDED, buffer, True)
+        return decode_extended(buffer)
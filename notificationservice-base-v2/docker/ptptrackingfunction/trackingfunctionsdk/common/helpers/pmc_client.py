@@ -0,0 +1,481 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Native PTP management client for ptp4l.
+# It encodes IEEE 1588 management messages (plus the linuxptp *_NP
+# extensions) and exchanges them with ptp4l over its Unix domain socket,
+# which is what 'pmc -u -b 0' does, without forking a pmc process per query.
+#
+import collections
+import configparser
+import logging
+import os
+import select
+import socket
+import struct
+import time
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import log_helper
+
+LOG = logging.getLogger(__name__)
+log_helper.config_logger(LOG)
+
+# PTP header values for management messages
+PTP_VERSION = 2
+MESSAGE_TYPE_MANAGEMENT = 0x0d
+CONTROL_FIELD_MANAGEMENT = 0x04
+LOG_MESSAGE_INTERVAL_MANAGEMENT = 0x7f
+
+# Management actions
+ACTION_GET = 0
+ACTION_SET = 1
+ACTION_RESPONSE = 2
+ACTION_COMMAND = 3
+ACTION_ACKNOWLEDGE = 4
+
+# TLV types
+TLV_MANAGEMENT = 0x0001
+TLV_MANAGEMENT_ERROR_STATUS = 0x0002
+
+# Management IDs
+MID_DEFAULT_DATA_SET = 0x2000
+MID_PARENT_DATA_SET = 0x2002
+MID_TIME_PROPERTIES_DATA_SET = 0x2003
+MID_PORT_DATA_SET = 0x2004
+MID_TIME_STATUS_NP = 0xc000
+MID_SUBSCRIBE_EVENTS_NP = 0xc003
+
+# SUBSCRIBE_EVENTS_NP event bits
+NOTIFY_PORT_STATE = 0
+NOTIFY_TIME_SYNC = 1
+NOTIFY_PARENT_DATA_SET = 2
+EVENT_BITMASK_SIZE = 64
+
+# Datasets maintained per port, ptp4l answers once for each of its ports
+PORT_LEVEL_IDS = (MID_PORT_DATA_SET,)
+
+PORT_STATES = ('NONE', 'INITIALIZING', 'FAULTY', 'DISABLED', 'LISTENING',
+               'PRE_MASTER', 'MASTER', 'PASSIVE', 'UNCALIBRATED', 'SLAVE',
+               'GRAND_MASTER')
+
+WILDCARD_CLOCK_IDENTITY = b'\xff' * 8
+WILDCARD_PORT_NUMBER = 0xffff
+
+HEADER = struct.Struct('>BBHBBHq4x8sHHBb')
+MANAGEMENT = struct.Struct('>8sHBBBx')
+TLV = struct.Struct('>HH')
+MANAGEMENT_ID = struct.Struct('>H')
+MANAGEMENT_ERROR = struct.Struct('>HH4x')
+
+DEFAULT_DATA_SET = struct.Struct('>BxHBBBHB8sBx')
+PARENT_DATA_SET = struct.Struct('>8sHBxHiBBBHB8s')
+TIME_PROPERTIES_DATA_SET = struct.Struct('>hBB')
+PORT_DATA_SET = struct.Struct('>8sHBbqbBbBbB')
+TIME_STATUS_NP = struct.Struct('>qqiiHHQHi8s')
+SUBSCRIBE_EVENTS_NP = struct.Struct('>H%ds' % EVENT_BITMASK_SIZE)
+
+# Time properties flag bits
+FLAG_LEAP_61 = 0x01
+FLAG_LEAP_59 = 0x02
+FLAG_UTC_OFF_VALID = 0x04
+FLAG_PTP_TIMESCALE = 0x08
+FLAG_TIME_TRACEABLE = 0x10
+FLAG_FREQ_TRACEABLE = 0x20
+
+DefaultDataSet = collections.namedtuple('DefaultDataSet', [
+    'two_step', 'slave_only', 'number_ports', 'priority1', 'clock_class',
+    'clock_accuracy', 'offset_scaled_log_variance', 'priority2',
+    'clock_identity', 'domain_number'])
+
+ParentDataSet = collections.namedtuple('ParentDataSet', [
+    'parent_port_identity', 'parent_stats',
+    'observed_parent_offset_scaled_log_variance',
+    'observed_parent_clock_phase_change_rate', 'gm_priority1',
+    'gm_clock_class', 'gm_clock_accuracy', 'gm_offset_scaled_log_variance',
+    'gm_priority2', 'grandmaster_identity'])
+
+TimePropertiesDataSet = collections.namedtuple('TimePropertiesDataSet', [
+    'current_utc_offset', 'leap61', 'leap59', 'current_utc_offset_valid',
+    'ptp_timescale', 'time_traceable', 'frequency_traceable',
+    'time_source'])
+
+PortDataSet = collections.namedtuple('PortDataSet', [
+    'port_identity', 'port_state', 'log_min_delay_req_interval',
+    'peer_mean_path_delay', 'log_announce_interval',
+    'announce_receipt_timeout', 'log_sync_interval', 'delay_mechanism',
+    'log_min_pdelay_req_interval', 'version_number'])
+
+TimeStatusNp = collections.namedtuple('TimeStatusNp', [
+    'master_offset', 'ingress_time', 'cumulative_scaled_rate_offset',
+    'scaled_last_gm_phase_change', 'gm_time_base_indicator',
+    'gm_present', 'gm_identity'])
+
+SubscribeEventsNp = collections.namedtuple('SubscribeEventsNp', [
+    'duration', 'events'])
+
+ManagementError = collections.namedtuple('ManagementError', [
+    'error_id', 'management_id'])
+
+
+class PmcError(Exception):
+    pass
+
+
+def clock_identity_to_str(raw):
+    # Same format as pmc: xxxxxx.xxxx.xxxxxx
+    return '%02x%02x%02x.%02x%02x.%02x%02x%02x' % tuple(raw)
+
+
+def port_identity_to_str(raw, port_number):
+    return '%s-%d' % (clock_identity_to_str(raw), port_number)
+
+
+def decode_default_data_set(data):
+    (flags, number_ports, priority1, clock_class, clock_accuracy,
+     variance, priority2, clock_identity, domain_number) = \
+        DEFAULT_DATA_SET.unpack_from(data)
+    return DefaultDataSet(bool(flags & 0x01), bool(flags & 0x02),
+                          number_ports, priority1, clock_class,
+                          clock_accuracy, variance, priority2,
+                          clock_identity_to_str(clock_identity),
+                          domain_number)
+
+
+def decode_parent_data_set(data):
+    (parent_clock, parent_port, parent_stats, variance, phase_change_rate,
+     gm_priority1, gm_clock_class, gm_clock_accuracy, gm_variance,
+     gm_priority2, gm_identity) = PARENT_DATA_SET.unpack_from(data)
+    return ParentDataSet(port_identity_to_str(parent_clock, parent_port),
+                         parent_stats, variance, phase_change_rate,
+                         gm_priority1, gm_clock_class, gm_clock_accuracy,
+                         gm_variance, gm_priority2,
+                         clock_identity_to_str(gm_identity))
+
+
+def decode_time_properties_data_set(data):
+    utc_offset, flags, time_source = \
+        TIME_PROPERTIES_DATA_SET.unpack_from(data)
+    return TimePropertiesDataSet(utc_offset,
+                                 bool(flags & FLAG_LEAP_61),
+                                 bool(flags & FLAG_LEAP_59),
+                                 bool(flags & FLAG_UTC_OFF_VALID),
+                                 bool(flags & FLAG_PTP_TIMESCALE),
+                                 bool(flags & FLAG_TIME_TRACEABLE),
+                                 bool(flags & FLAG_FREQ_TRACEABLE),
+                                 time_source)
+
+
+def decode_port_data_set(data):
+    (clock_identity, port_number, port_state, log_min_delay_req_interval,
+     peer_mean_path_delay, log_announce_interval, announce_receipt_timeout,
+     log_sync_interval, delay_mechanism, log_min_pdelay_req_interval,
+     version_number) = PORT_DATA_SET.unpack_from(data)
+    if port_state < len(PORT_STATES):
+        port_state = PORT_STATES[port_state]
+    else:
+        port_state = 'UNKNOWN'
+    return PortDataSet(port_identity_to_str(clock_identity, port_number),
+                       port_state, log_min_delay_req_interval,
+                       peer_mean_path_delay >> 16, log_announce_interval,
+                       announce_receipt_timeout, log_sync_interval,
+                       delay_mechanism, log_min_pdelay_req_interval,
+                       version_number & 0x0f)
+
+
+def decode_time_status_np(data):
+    (master_offset, ingress_time, cumulative_scaled_rate_offset,
+     scaled_last_gm_phase_change, gm_time_base_indicator, _, _, _,
+     gm_present, gm_identity) = TIME_STATUS_NP.unpack_from(data)
+    return TimeStatusNp(master_offset, ingress_time,
+                        cumulative_scaled_rate_offset,
+                        scaled_last_gm_phase_change, gm_time_base_indicator,
+                        bool(gm_present), clock_identity_to_str(gm_identity))
+
+
+def encode_subscribe_events_np(events, duration):
+    bitmask = bytearray(EVENT_BITMASK_SIZE)
+    for event in events:
+        bitmask[event // 8] |= 1 << (event % 8)
+    return SUBSCRIBE_EVENTS_NP.pack(duration, bytes(bitmask))
+
+
+def decode_subscribe_events_np(data):
+    duration, bitmask = SUBSCRIBE_EVENTS_NP.unpack_from(data)
+    events = set(event for event in range(EVENT_BITMASK_SIZE * 8)
+                 if bitmask[event // 8] & (1 << (event % 8)))
+    return SubscribeEventsNp(duration, events)
+
+
+DECODERS = {
+    MID_DEFAULT_DATA_SET: decode_default_data_set,
+    MID_PARENT_DATA_SET: decode_parent_data_set,
+    MID_TIME_PROPERTIES_DATA_SET: decode_time_properties_data_set,
+    MID_PORT_DATA_SET: decode_port_data_set,
+    MID_TIME_STATUS_NP: decode_time_status_np,
+    MID_SUBSCRIBE_EVENTS_NP: decode_subscribe_events_np,
+}
+
+
+def encode_management(management_id, sequence_id, action=ACTION_GET,
+                      data=b'', domain_number=0, boundary_hops=0,
+                      source_port=(bytes(8), 0)):
+    tlv_body = MANAGEMENT_ID.pack(management_id) + data
+    length = HEADER.size + MANAGEMENT.size + TLV.size + len(tlv_body)
+    message = HEADER.pack(MESSAGE_TYPE_MANAGEMENT, PTP_VERSION, length,
+                          domain_number, 0, 0, 0, source_port[0],
+                          source_port[1], sequence_id,
+                          CONTROL_FIELD_MANAGEMENT,
+                          LOG_MESSAGE_INTERVAL_MANAGEMENT)
+    message += MANAGEMENT.pack(WILDCARD_CLOCK_IDENTITY, WILDCARD_PORT_NUMBER,
+                               boundary_hops, boundary_hops, action & 0x0f)
+    message += TLV.pack(TLV_MANAGEMENT, len(tlv_body)) + tlv_body
+    return message
+
+
+def decode_management(message):
+    """Decode a management message
+
+    Returns (sequence_id, action, management_id, payload) where the payload
+    is a typed dataset, a ManagementError or the raw data when there is no
+    decoder for the management id. Returns None for anything that is not a
+    management message.
+    """
+    if len(message) < HEADER.size + MANAGEMENT.size + TLV.size:
+        return None
+    header = HEADER.unpack_from(message)
+    if header[0] & 0x0f != MESSAGE_TYPE_MANAGEMENT:
+        return None
+    sequence_id = header[9]
+    _, _, _, _, action = MANAGEMENT.unpack_from(message, HEADER.size)
+    action &= 0x0f
+    offset = HEADER.size + MANAGEMENT.size
+    tlv_type, tlv_length = TLV.unpack_from(message, offset)
+    offset += TLV.size
+    body = message[offset:offset + tlv_length]
+    if tlv_type == TLV_MANAGEMENT_ERROR_STATUS:
+        error_id, management_id = MANAGEMENT_ERROR.unpack_from(body)
+        return sequence_id, action, management_id, \
+            ManagementError(error_id, management_id)
+    if tlv_type != TLV_MANAGEMENT or tlv_length < MANAGEMENT_ID.size:
+        return None
+    management_id, = MANAGEMENT_ID.unpack_from(body)
+    data = body[MANAGEMENT_ID.size:]
+    decoder = DECODERS.get(management_id)
+    if decoder is None:
+        return sequence_id, action, management_id, data
+    try:
+        payload = decoder(data)
+    except struct.error as ex:
+        LOG.warning("Truncated management message id 0x%04x: %s"
+                    % (management_id, ex))
+        return None
+    return sequence_id, action, management_id, payload
+
+
+def read_uds_settings(config_file):
+    # pmc -f <config> picks uds_address and domainNumber from the config
+    uds_address = constants.PTP4L_DEFAULT_UDS_ADDRESS
+    domain_number = 0
+    config = configparser.ConfigParser(delimiters=' ', strict=False)
+    try:
+        config.read(config_file)
+    except configparser.Error as ex:
+        LOG.warning("Unable to parse %s: %s" % (config_file, ex))
+        return uds_address, domain_number
+    if config.has_section('global'):
+        uds_address = config['global'].get('uds_address', uds_address)
+        try:
+            domain_number = int(config['global'].get('domainNumber', '0'))
+        except ValueError:
+            LOG.warning("Invalid domainNumber in %s, using 0" % config_file)
+    return uds_address, domain_number
+
+
+class PmcClient:
+    """Management client bound to a single ptp4l instance
+
+    The datagram socket is kept open for the lifetime of the client, a
+    query costs one sendto() per dataset and one recv() per response.
+    Responses that do not belong to a pending request, which is how ptp4l
+    delivers SUBSCRIBE_EVENTS_NP notifications, are passed to
+    notification_handler(management_id, payload) when one is set.
+    """
+    _instances = 0
+
+    def __init__(self, uds_address, domain_number=0, boundary_hops=0,
+                 timeout=constants.PMC_CLIENT_TIMEOUT, local_address=None):
+        self.uds_address = uds_address
+        self.domain_number = domain_number
+        self.boundary_hops = boundary_hops
+        self.timeout = timeout
+        PmcClient._instances += 1
+        if local_address is None:
+            local_address = constants.PMC_CLIENT_SOCKET_PATH.format(
+                os.getpid(), PmcClient._instances)
+        self.local_address = local_address
+        self.source_port = (bytes(8), os.getpid() & 0xffff)
+        self.number_ports = None
+        self.notification_handler = None
+        self._socket = None
+        self._sequence_id = 0
+
+    def __del__(self):
+        self.close()
+
+    def open(self):
+        if self._socket is not None:
+            return
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            if os.path.exists(self.local_address):
+                os.unlink(self.local_address)
+            sock.bind(self.local_address)
+        except OSError:
+            sock.close()
+            raise
+        sock.setblocking(False)
+        self._socket = sock
+        LOG.debug("Opened pmc client %s for %s"
+                  % (self.local_address, self.uds_address))
+
+    def is_open(self):
+        return self._socket is not None
+
+    def fileno(self):
+        return self._socket.fileno()
+
+    def close(self):
+        if self._socket is None:
+            return
+        self._socket.close()
+        self._socket = None
+        try:
+            os.unlink(self.local_address)
+        except OSError:
+            pass
+
+    def _next_sequence_id(self):
+        self._sequence_id = (self._sequence_id + 1) & 0xffff
+        return self._sequence_id
+
+    def _drain(self):
+        # Discard late responses from a previous query
+        while True:
+            try:
+                self._socket.recv(constants.PMC_CLIENT_BUFFER_SIZE)
+            except (BlockingIOError, InterruptedError):
+                return
+
+    def send(self, management_id, action=ACTION_GET, data=b''):
+        sequence_id = self._next_sequence_id()
+        message = encode_management(
+            management_id, sequence_id, action, data, self.domain_number,
+            self.boundary_hops, self.source_port)
+        self._socket.sendto(message, self.uds_address)
+        return sequence_id
+
+    def receive(self, timeout):
+        """Wait up to timeout seconds for one decoded management message"""
+        ready, _, _ = select.select([self._socket], [], [], max(timeout, 0))
+        if not ready:
+            return None
+        try:
+            message = self._socket.recv(constants.PMC_CLIENT_BUFFER_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return None
+        return decode_management(message)
+
+    def get(self, management_ids):
+        """Send a GET for each management id and collect the responses
+
+        Returns a dict of management id to the list of decoded datasets,
+        port level datasets have one entry per ptp4l port. Raises PmcError
+        when ptp4l does not answer at all.
+        """
+        self.open()
+        self._drain()
+        pending = {}
+        for management_id in management_ids:
+            pending[self.send(management_id)] = management_id
+        results = {management_id: [] for management_id in management_ids}
+        answered = {management_id: 0 for management_id in management_ids}
+        deadline = time.monotonic() + self.timeout
+        while not self._complete(answered):
+            decoded = self.receive(deadline - time.monotonic())
+            if decoded is None:
+                if time.monotonic() >= deadline:
+                    break
+                continue
+            sequence_id, action, management_id, payload = decoded
+            if action != ACTION_RESPONSE or \
+                    pending.get(sequence_id) != management_id:
+                self._dispatch(decoded)
+                continue
+            answered[management_id] += 1
+            if isinstance(payload, ManagementError):
+                LOG.warning("ptp4l at %s returned error 0x%04x for "
+                            "management id 0x%04x"
+                            % (self.uds_address, payload.error_id,
+                               management_id))
+                continue
+            results[management_id].append(payload)
+            if management_id == MID_DEFAULT_DATA_SET:
+                self.number_ports = payload.number_ports
+        if not any(answered.values()):
+            raise PmcError("No response from ptp4l at %s" % self.uds_address)
+        return results
+
+    def subscribe(self, events, duration):
+        """Register this client for ptp4l push notifications
+
+        ptp4l drops the subscription after duration seconds, it has to be
+        renewed before then. Raises PmcError when ptp4l does not confirm.
+        """
+        self.open()
+        sequence_id = self.send(MID_SUBSCRIBE_EVENTS_NP, ACTION_SET,
+                                encode_subscribe_events_np(events, duration))
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            decoded = self.receive(deadline - time.monotonic())
+            if decoded is None:
+                continue
+            if decoded[0] != sequence_id or \
+                    decoded[2] != MID_SUBSCRIBE_EVENTS_NP:
+                self._dispatch(decoded)
+                continue
+            if isinstance(decoded[3], ManagementError):
+                raise PmcError("ptp4l at %s rejected the subscription, "
+                               "error 0x%04x"
+                               % (self.uds_address, decoded[3].error_id))
+            return decoded[3]
+        raise PmcError("No subscription response from ptp4l at %s"
+                       % self.uds_address)
+
+    def read_notifications(self):
+        # Dispatch everything already queued on the socket
+        while True:
+            decoded = self.receive(0)
+            if decoded is None:
+                return
+            self._dispatch(decoded)
+
+    def _dispatch(self, decoded):
+        _, action, management_id, payload = decoded
+        if action != ACTION_RESPONSE or self.notification_handler is None \
+                or isinstance(payload, ManagementError):
+            return
+        self.notification_handler(management_id, payload)
+
+    def _complete(self, answered):
+        for management_id, count in answered.items():
+            if management_id in PORT_LEVEL_IDS:
+                if self.number_ports is None or count < self.number_ports:
+                    return False
+            elif count == 0:
+                return False
+        return True
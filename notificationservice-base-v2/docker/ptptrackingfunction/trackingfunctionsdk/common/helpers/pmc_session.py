@@ -0,0 +1,226 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Persistent interactive pmc co-process.
+# For sites that still rely on the pmc tool, one 'pmc -u -b 0' is kept
+# running per ptp4l instance. Every query writes its GET commands to the
+# pmc stdin in a single batch and the responses are parsed from the pmc
+# stdout as they stream in, instead of forking a pmc process per dataset.
+#
+import collections
+import logging
+import os
+import re
+import select
+import subprocess
+import threading
+import time
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import log_helper
+from trackingfunctionsdk.common.helpers.pmc_client import PmcError
+
+LOG = logging.getLogger(__name__)
+log_helper.config_logger(LOG)
+
+PMC_EXEC = '/usr/sbin/pmc'
+# Sent after the commands of every batch. ptp4l answers the management
+# messages in order, the header of the response to it ends the last
+# message of the batch and tells that every answer has been read.
+PMC_SESSION_SENTINEL = 'GET NULL_MANAGEMENT'
+
+# Datasets maintained per port, ptp4l answers once for each of its ports
+PORT_LEVEL_DATASETS = ('PORT_DATA_SET', 'PORT_PROPERTIES_NP',
+                       'PORT_STATS_NP')
+
+# First line of every message printed by pmc, e.g.
+#   507c6f.fffe.0b5a4d-0 seq 3 RESPONSE MANAGEMENT PORT_DATA_SET
+RESPONSE_HEADER = re.compile(
+    r'^\t(?P<port_identity>\S+) seq (?P<sequence_id>\d+) (?P<action>\S+) '
+    r'(?P<kind>MANAGEMENT_ERROR_STATUS|MANAGEMENT)(?: (?P<dataset>\S+))?')
+
+PmcResponse = collections.namedtuple(
+    'PmcResponse', ['port_identity', 'sequence_id', 'dataset', 'error',
+                    'values'])
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(config_file, uds_address, domain_number):
+    """Return the pmc session shared by every user of a ptp4l instance"""
+    key = (uds_address, int(domain_number))
+    with _sessions_lock:
+        if key not in _sessions:
+            _sessions[key] = PmcSession(config_file, uds_address,
+                                        int(domain_number))
+        return _sessions[key]
+
+
+class PmcSession:
+
+    def __init__(self, config_file, uds_address, domain_number=0,
+                 timeout=constants.PMC_SESSION_TIMEOUT, command=None):
+        self.config_file = config_file
+        self.uds_address = uds_address
+        self.domain_number = domain_number
+        self.timeout = timeout
+        self.command = command or [
+            PMC_EXEC, '-u', '-b', '0', '-f', config_file,
+            '-s', uds_address, '-d', str(domain_number)]
+        self.number_ports = None
+        self.restarts = 0
+        self._spawned = 0
+        self._process = None
+        self._buffer = b''
+        self._sequence_id = 0
+        self._lock = threading.Lock()
+
+    def is_running(self):
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        if self._spawned:
+            self.restarts += 1
+            LOG.warning("pmc session for %s exited, restarting (%d)"
+                        % (self.uds_address, self.restarts))
+        self.stop()
+        self._process = subprocess.Popen(
+            self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, bufsize=0)
+        os.set_blocking(self._process.stdout.fileno(), False)
+        self._spawned += 1
+        self._buffer = b''
+        # pmc numbers its messages from 0
+        self._sequence_id = 0
+        LOG.debug("Started pmc session %s" % ' '.join(self.command))
+
+    def stop(self):
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
+        self._process.stdout.close()
+        self._process = None
+
+    def query(self, commands):
+        """Send a batch of pmc commands and collect the responses
+
+        commands are pmc GET commands, e.g. 'GET PORT_DATA_SET'. Returns
+        the list of PmcResponse received for them, port level datasets
+        have one entry per ptp4l port. Raises PmcError when pmc does not
+        print any response within the timeout.
+        """
+        with self._lock:
+            if not self.is_running():
+                self.start()
+            expected = {}
+            for command in commands:
+                expected[self._sequence_id] = command.split()[-1]
+                self._sequence_id = (self._sequence_id + 1) & 0xffff
+            sentinel = self._sequence_id
+            self._sequence_id = (self._sequence_id + 1) & 0xffff
+            try:
+                self._process.stdin.write(
+                    ('\n'.join(list(commands) + [PMC_SESSION_SENTINEL]) +
+                     '\n').encode())
+            except OSError as ex:
+                self.stop()
+                raise PmcError("pmc session for %s failed: %s"
+                               % (self.uds_address, ex))
+            return self._collect(expected, sentinel)
+
+    def _collect(self, expected, sentinel):
+        responses = []
+        answered = {dataset: 0 for dataset in expected.values()}
+        deadline = time.monotonic() + self.timeout
+        complete = False
+        while not complete:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            stdout = self._process.stdout
+            ready, _, _ = select.select([stdout], [], [], remaining)
+            if not ready:
+                continue
+            data = stdout.read()
+            if data is None:
+                continue
+            if not data:
+                self.stop()
+                raise PmcError("pmc session for %s exited"
+                               % self.uds_address)
+            self._buffer += data
+            parsed, pending = self._parse()
+            if pending is not None and \
+                    int(pending.group('sequence_id')) == sentinel:
+                complete = True
+            for response in parsed:
+                if response.sequence_id == sentinel:
+                    complete = True
+                    continue
+                dataset = expected.get(response.sequence_id)
+                if dataset is None or (not response.error and
+                                       response.dataset != dataset):
+                    # Late answer to a query that timed out
+                    continue
+                answered[dataset] += 1
+                if response.error:
+                    # pmc does not print the dataset of error responses
+                    LOG.warning("ptp4l at %s returned an error status for %s"
+                                % (self.uds_address, dataset))
+                    continue
+                if response.dataset == 'DEFAULT_DATA_SET' and \
+                        'numberPorts' in response.values:
+                    self.number_ports = int(response.values['numberPorts'])
+                responses.append(response)
+        if not any(answered.values()):
+            raise PmcError("No response from pmc for %s" % self.uds_address)
+        return responses
+
+    def _parse(self):
+        # pmc may write a message in several pieces, a message is complete
+        # once the next line that is not one of its values has been read.
+        # Returns the complete responses and the header of the message
+        # still open, which is kept in the buffer with the partial line.
+        lines = self._buffer.decode(errors='replace').split('\n')
+        partial = lines.pop()
+        responses = []
+        header = None
+        values = None
+        start = 0
+        for index, line in enumerate(lines):
+            if line.startswith('\t\t') and header is not None:
+                fields = line.split(None, 1)
+                if fields:
+                    key = fields[0].rstrip(':')
+                    values[key] = fields[1].strip() if len(fields) > 1 \
+                        else ''
+                continue
+            if header is not None:
+                responses.append(self._response(header, values))
+                header = None
+            match = RESPONSE_HEADER.match(line)
+            if match and match.group('action') == 'RESPONSE':
+                header = match
+                values = {}
+                start = index
+        if header is None:
+            start = len(lines)
+        self._buffer = '\n'.join(lines[start:] + [partial]).encode()
+        return responses, header
+
+    def _response(self, header, values):
+        return PmcResponse(
+            header.group('port_identity'), int(header.group('sequence_id')),
+            header.group('dataset'),
+            header.group('kind') == 'MANAGEMENT_ERROR_STATUS', values)
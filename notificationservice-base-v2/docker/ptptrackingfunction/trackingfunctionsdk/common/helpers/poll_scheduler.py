@@ -0,0 +1,139 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Adaptive polling of the tracked resources.
+# Each resource type and instance is polled at its own interval. The
+# interval drops to the minimum when the state of the resource changes or
+# while it is in a transitional state such as Holdover, so holdover expiry
+# is detected promptly, and doubles after each stable poll up to the
+# maximum. The next poll of each resource is kept on a hashed timer wheel
+# so the tracking loop only wakes up for the resources that are due.
+#
+import math
+
+from trackingfunctionsdk.common.helpers import constants
+
+
+class TimerWheel:
+
+    def __init__(self, tick=constants.POLL_WHEEL_TICK,
+                 size=constants.POLL_WHEEL_SIZE, now=0.0):
+        self.tick = tick
+        self.size = size
+        self._slots = [[] for _ in range(size)]
+        # Last tick expired
+        self._current = self._tick(now)
+        # Timer name to the tick it is due, entries left in the slots by a
+        # timer rescheduled or cancelled are skipped on expiry
+        self._timers = {}
+
+    def _tick(self, now):
+        # Tolerates the rounding of a wait timed to the expiry of a tick
+        return int(math.floor(now / self.tick + 1e-6))
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __contains__(self, name):
+        return name in self._timers
+
+    def schedule(self, name, delay, now):
+        """(Re)schedule a timer to expire delay seconds after now"""
+        due = max(int(math.ceil((now + delay) / self.tick)),
+                  self._current + 1)
+        self._timers[name] = due
+        self._slots[due % self.size].append((due, name))
+
+    def cancel(self, name):
+        self._timers.pop(name, None)
+
+    def expire(self, now):
+        """Return the names of the timers due at now, oldest first"""
+        now_tick = self._tick(now)
+        if now_tick <= self._current:
+            return []
+        expired = []
+        # A full turn visits every slot once
+        first = max(self._current + 1, now_tick - self.size + 1)
+        for tick in range(first, now_tick + 1):
+            slot = self._slots[tick % self.size]
+            if not slot:
+                continue
+            pending = []
+            for due, name in slot:
+                if self._timers.get(name) != due:
+                    # Stale entry
+                    continue
+                if due <= now_tick:
+                    expired.append((due, name))
+                    del self._timers[name]
+                else:
+                    # Due in a later turn of the wheel
+                    pending.append((due, name))
+            slot[:] = pending
+        self._current = now_tick
+        expired.sort(key=lambda timer: timer[0])
+        return [name for _, name in expired]
+
+    def next_expiry(self):
+        """Return when the next timer is due, None without timers"""
+        if not self._timers:
+            return None
+        return min(self._timers.values()) * self.tick
+
+
+class PollInterval:
+
+    def __init__(self, min_interval, max_interval, interval=None):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.interval = self.max_interval if interval is None else interval
+
+    def update(self, changed, transitional):
+        """Return the interval to the next poll after a poll"""
+        if changed or transitional:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * 2, self.max_interval)
+        return self.interval
+
+
+class PollScheduler:
+
+    def __init__(self, min_interval, max_interval,
+                 tick=constants.POLL_WHEEL_TICK,
+                 size=constants.POLL_WHEEL_SIZE, now=0.0):
+        self.min_interval = min(min_interval, max_interval)
+        self.max_interval = max_interval
+        self.wheel = TimerWheel(tick, size, now)
+        self.intervals = {}
+        self.polls = 0
+
+    def due(self, now):
+        return self.wheel.expire(now)
+
+    def polled(self, name, changed, transitional, now):
+        """Schedule the next poll of a resource that was just polled"""
+        interval = self.intervals.get(name)
+        if interval is None:
+            interval = PollInterval(self.min_interval, self.max_interval)
+            self.intervals[name] = interval
+        self.polls += 1
+        delay = interval.update(changed, transitional)
+        self.wheel.schedule(name, delay, now)
+        return delay
+
+    def retry(self, name, now):
+        """Poll a resource again soon, its sample did not complete"""
+        self.wheel.schedule(name, self.min_interval, now)
+
+    def timeout(self, now):
+        """Return how long the tracking loop can sleep"""
+        expiry = self.wheel.next_expiry()
+        if expiry is None:
+            return self.max_interval
+        return min(max(expiry - now, 0.0), self.max_interval)
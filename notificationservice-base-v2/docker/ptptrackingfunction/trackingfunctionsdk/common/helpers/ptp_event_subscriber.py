@@ -0,0 +1,140 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Event driven ptp4l tracking.
+# Registers with each ptp4l instance through SUBSCRIBE_EVENTS_NP and wakes
+# the tracking loop as soon as ptp4l pushes a port state, time sync or
+# parent data set change, so PtpMonitor no longer has to find them by
+# polling every CONTROL_TIMEOUT seconds.
+#
+import functools
+import logging
+import select
+import threading
+import time
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import log_helper
+from trackingfunctionsdk.common.helpers import pmc_client
+
+LOG = logging.getLogger(__name__)
+log_helper.config_logger(LOG)
+
+SUBSCRIBED_EVENTS = (pmc_client.NOTIFY_PORT_STATE,
+                     pmc_client.NOTIFY_TIME_SYNC,
+                     pmc_client.NOTIFY_PARENT_DATA_SET)
+
+
+class Ptp4lSubscription:
+    def __init__(self, ptp_monitor, client):
+        self.ptp_monitor = ptp_monitor
+        self.client = client
+        self.renew_at = 0
+        # Last notified values, used to only react to actual changes
+        self.port_states = {}
+        self.time_status = None
+        self.parent = None
+
+
+class PtpEventSubscriber(threading.Thread):
+
+    def __init__(self, ptp_monitor_list, wakeup,
+                 duration=constants.PTP4L_SUBSCRIPTION_DURATION,
+                 retry=constants.PTP4L_SUBSCRIPTION_RETRY):
+        super(PtpEventSubscriber, self).__init__(name='ptp4l-subscriber',
+                                                 daemon=True)
+        self.wakeup = wakeup
+        self.duration = duration
+        self.retry = retry
+        self.subscriptions = []
+        self._stopped = threading.Event()
+        for ptp_monitor in ptp_monitor_list:
+            uds_address, domain_number = \
+                pmc_client.read_uds_settings(ptp_monitor.ptp4l_config)
+            client = pmc_client.PmcClient(uds_address, domain_number)
+            subscription = Ptp4lSubscription(ptp_monitor, client)
+            client.notification_handler = functools.partial(
+                self.handle_notification, subscription)
+            self.subscriptions.append(subscription)
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        LOG.info("Subscribing to events from %d ptp4l instance(s)"
+                 % len(self.subscriptions))
+        while not self._stopped.is_set():
+            now = time.monotonic()
+            for subscription in self.subscriptions:
+                if now >= subscription.renew_at:
+                    self.subscribe(subscription)
+            timeout = min(subscription.renew_at
+                          for subscription in self.subscriptions)
+            timeout = max(timeout - time.monotonic(), 0)
+            clients = [subscription.client
+                       for subscription in self.subscriptions
+                       if subscription.client.is_open()]
+            try:
+                readable, _, _ = select.select(clients, [], [], timeout)
+            except (OSError, ValueError) as ex:
+                LOG.warning("ptp4l event wait failed: %s" % ex)
+                time.sleep(self.retry)
+                continue
+            for client in readable:
+                client.read_notifications()
+        for subscription in self.subscriptions:
+            subscription.client.close()
+
+    def subscribe(self, subscription):
+        ptp_monitor = subscription.ptp_monitor
+        try:
+            subscription.client.subscribe(SUBSCRIBED_EVENTS, self.duration)
+        except (OSError, pmc_client.PmcError) as ex:
+            if ptp_monitor.subscription_active:
+                LOG.warning("Lost ptp4l event subscription for %s, "
+                            "polling every cycle: %s"
+                            % (ptp_monitor.ptp4l_service_name, ex))
+            ptp_monitor.subscription_active = False
+            subscription.renew_at = time.monotonic() + self.retry
+            return
+        if not ptp_monitor.subscription_active:
+            LOG.info("Subscribed to ptp4l events for %s"
+                     % ptp_monitor.ptp4l_service_name)
+            # Events may have been missed while unsubscribed
+            self.notify(subscription)
+        ptp_monitor.subscription_active = True
+        # Renew halfway through so a slow cycle cannot let it lapse
+        subscription.renew_at = time.monotonic() + self.duration / 2
+
+    def handle_notification(self, subscription, management_id, payload):
+        if management_id == pmc_client.MID_PORT_DATA_SET:
+            last_state = subscription.port_states.get(payload.port_identity)
+            subscription.port_states[payload.port_identity] = \
+                payload.port_state
+            if payload.port_state != last_state:
+                LOG.info("%s port %s state changed to %s"
+                         % (subscription.ptp_monitor.ptp4l_service_name,
+                            payload.port_identity, payload.port_state))
+                self.notify(subscription)
+        elif management_id == pmc_client.MID_TIME_STATUS_NP:
+            # Sent on every clock update, only the GM presence and identity
+            # affect the sync state
+            time_status = (payload.gm_present, payload.gm_identity)
+            subscription.ptp_monitor.record_master_offset(
+                payload.master_offset)
+            if time_status != subscription.time_status:
+                subscription.time_status = time_status
+                self.notify(subscription)
+        elif management_id == pmc_client.MID_PARENT_DATA_SET:
+            parent = (payload.gm_clock_class, payload.grandmaster_identity)
+            if parent != subscription.parent:
+                subscription.parent = parent
+                self.notify(subscription)
+
+    def notify(self, subscription):
+        subscription.ptp_monitor.signal_event()
+        self.wakeup()
@@ -13,16 +13,25 @@
 #
 import datetime
 import logging
+import os
 import sys
+import time
 
 from trackingfunctionsdk.model.dto.ptpstate import PtpState
 from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import input_trace
 from trackingfunctionsdk.common.helpers import log_helper
+from trackingfunctionsdk.common.helpers import pmc_client
+from trackingfunctionsdk.common.helpers import pmc_session
 from trackingfunctionsdk.common.helpers import ptpsync as utils
+from trackingfunctionsdk.common.helpers import stage_timer
 
 LOG = logging.getLogger(__name__)
 log_helper.config_logger(LOG)
 
+PMC_CLIENT_MODE = os.environ.get('PTP4L_PMC_CLIENT',
+                                 constants.PMC_CLIENT_NATIVE).lower()
+
 
 class PtpMonitor:
     _clock_class = None
@@ -33,6 +42,18 @@ class PtpMonitor:
     _clock_class_event_time = None
     _clock_class_retry = 3
 
+    # Event subscription state, see PtpEventSubscriber. While ptp4l pushes
+    # events the instance is only polled when an event arrives, while in
+    # a transitional state or every consistency_check_seconds.
+    subscription_active = False
+    consistency_check_seconds = None
+    master_offset = None
+    # Master offset samples, see OffsetHistory
+    offset_history = None
+    _event_pending = False
+    _last_poll_time = 0
+    _polled = True
+
     # Critical resources
     ptp4l_service_name = None
     ptp4l_config = None
@@ -52,6 +73,15 @@ class PtpMonitor:
 
     pmc_query_results = {}
 
+    # Datasets read through the native pmc client, see ptp_oper_dict
+    ptp_native_query = [pmc_client.MID_PORT_DATA_SET,
+                        pmc_client.MID_TIME_STATUS_NP,
+                        pmc_client.MID_PARENT_DATA_SET,
+                        pmc_client.MID_TIME_PROPERTIES_DATA_SET,
+                        pmc_client.MID_DEFAULT_DATA_SET]
+    _pmc_client = None
+    _pmc_session = None
+
     def __init__(self, ptp4l_instance, holdover_time, freq,
                  phc2sys_service_name, init=True):
 
@@ -62,13 +92,42 @@ class PtpMonitor:
             self.phc2sys_service_name = phc2sys_service_name
             self.holdover_time = int(holdover_time)
             self.freq = int(freq)
+            uds_address, domain_number = \
+                pmc_client.read_uds_settings(self.ptp4l_config)
+            if PMC_CLIENT_MODE == constants.PMC_CLIENT_NATIVE:
+                self._pmc_client = pmc_client.PmcClient(uds_address,
+                                                        domain_number)
+            elif PMC_CLIENT_MODE == constants.PMC_CLIENT_SHELL:
+                self._pmc_session = pmc_session.get_session(
+                    self.ptp4l_config, uds_address, domain_number)
             self._ptp_event_time = datetime.datetime.utcnow().timestamp()
             self._clock_class_event_time = \
                 datetime.datetime.utcnow().timestamp()
             self.set_ptp_sync_state()
             self.set_ptp_clock_class()
 
+    def signal_event(self):
+        self._event_pending = True
+
+    def poll_required(self):
+        if not self.subscription_active or \
+                self.consistency_check_seconds is None:
+            return True
+        if self._event_pending:
+            return True
+        # Holdover has to be timed out and Unknown resolved by polling
+        if self._ptp_sync_state not in [PtpState.Locked, PtpState.Freerun]:
+            return True
+        return time.monotonic() - self._last_poll_time >= \
+            self.consistency_check_seconds
+
     def set_ptp_sync_state(self):
+        self._polled = self.poll_required()
+        if not self._polled:
+            self._new_ptp_sync_event = False
+            return
+        self._event_pending = False
+        self._last_poll_time = time.monotonic()
         new_ptp_sync_event, ptp_sync_state, ptp_event_time = self.ptp_status()
         if ptp_sync_state != self._ptp_sync_state:
             self._new_ptp_sync_event = new_ptp_sync_event
@@ -77,11 +136,25 @@ class PtpMonitor:
         else:
             self._new_ptp_sync_event = new_ptp_sync_event
 
+    def record_master_offset(self, master_offset):
+        if master_offset is None:
+            return
+        self.master_offset = master_offset
+        if self.offset_history is not None:
+            try:
+                self.offset_history.append(float(master_offset))
+            except ValueError:
+                LOG.debug("Invalid master offset %s" % master_offset)
+
     def get_ptp_sync_state(self):
         return self._new_ptp_sync_event, self._ptp_sync_state, \
             self._ptp_event_time
 
     def set_ptp_clock_class(self):
+        if not self._polled:
+            # Nothing new was read from ptp4l this cycle
+            self._new_clock_class_event = False
+            return
         try:
             clock_class = self.pmc_query_results['clockClass']
             # Reset retry counter upon getting clock class
@@ -132,13 +205,21 @@ class PtpMonitor:
         # max holdover time is calculated to be in a 'safety' zone
         max_holdover_time = (self.holdover_time - self.freq * 2)
 
-        pmc, ptp4l, phc2sys, ptp4lconf = \
-            utils.check_critical_resources(self.ptp4l_service_name,
-                                           self.phc2sys_service_name)
+        with stage_timer.timed('critical_resources',
+                               self.ptp4l_service_name):
+            pmc, ptp4l, phc2sys, ptp4lconf = \
+                utils.check_critical_resources(self.ptp4l_service_name,
+                                               self.phc2sys_service_name)
         # run pmc command if preconditions met
         if pmc and ptp4l and phc2sys and ptp4lconf:
-            self.pmc_query_results, total_ptp_keywords, port_count = \
-                self.ptpsync()
+            with stage_timer.timed('pmc', self.ptp4l_service_name):
+                self.pmc_query_results, total_ptp_keywords, port_count = \
+                    input_trace.read('pmc', self.ptp4l_service_name,
+                                     self.ptpsync)
+            if not self.subscription_active:
+                # Recorded from the ptp4l events while subscribed
+                self.record_master_offset(
+                    self.pmc_query_results.get(constants.MASTER_OFFSET))
             sync_state = utils.check_results(self.pmc_query_results,
                                              total_ptp_keywords, port_count)
         else:
@@ -174,6 +255,83 @@ class PtpMonitor:
         return new_event, sync_state, self._ptp_event_time
 
     def ptpsync(self):
+        if self._pmc_client is not None:
+            try:
+                return self.ptpsync_native()
+            except (OSError, pmc_client.PmcError) as ex:
+                LOG.warning("Native pmc client failed for %s, falling back "
+                            "to pmc: %s" % (self.ptp4l_service_name, ex))
+        elif self._pmc_session is not None:
+            try:
+                return self.ptpsync_session()
+            except (OSError, pmc_client.PmcError) as ex:
+                LOG.warning("pmc session failed for %s, falling back "
+                            "to a single pmc run: %s"
+                            % (self.ptp4l_service_name, ex))
+        return self.ptpsync_pmc()
+
+    def ptpsync_native(self):
+        # Build the same result dict as ptpsync_pmc() from the typed
+        # datasets returned over the ptp4l UDS
+        result = {}
+        datasets = self._pmc_client.get(self.ptp_native_query)
+        port_count = 0
+        for port_data_set in datasets[pmc_client.MID_PORT_DATA_SET]:
+            port_count += 1
+            result[constants.PORT.format(port_count)] = \
+                port_data_set.port_state
+        for time_status in datasets[pmc_client.MID_TIME_STATUS_NP]:
+            result[constants.GM_PRESENT] = \
+                'true' if time_status.gm_present else 'false'
+            result[constants.MASTER_OFFSET] = str(time_status.master_offset)
+        for parent_data_set in datasets[pmc_client.MID_PARENT_DATA_SET]:
+            result[constants.GM_CLOCK_CLASS] = \
+                str(parent_data_set.gm_clock_class)
+            result[constants.GRANDMASTER_IDENTITY] = \
+                parent_data_set.grandmaster_identity
+        for time_properties in \
+                datasets[pmc_client.MID_TIME_PROPERTIES_DATA_SET]:
+            result[constants.TIME_TRACEABLE] = \
+                str(int(time_properties.time_traceable))
+        for default_data_set in datasets[pmc_client.MID_DEFAULT_DATA_SET]:
+            result[constants.CLOCK_IDENTITY] = \
+                default_data_set.clock_identity
+            result[constants.CLOCK_CLASS] = str(default_data_set.clock_class)
+
+        total_ptp_keywords = sum(len(oper[1:])
+                                 for oper in self.ptp_oper_dict.values())
+        if port_count == 0:
+            port_count = 1
+        total_ptp_keywords = total_ptp_keywords + port_count - 1
+        return result, total_ptp_keywords, port_count
+
+    def ptpsync_session(self):
+        # Same as ptpsync_pmc() with all the commands sent in one batch to
+        # the persistent pmc session
+        result = {}
+        commands = [oper[0].strip("'")
+                    for oper in self.ptp_oper_dict.values()]
+        ptp_keywords = [keyword for oper in self.ptp_oper_dict.values()
+                        for keyword in oper[1:]]
+        port_count = 0
+        for response in self._pmc_session.query(commands):
+            for item in ptp_keywords:
+                if item not in response.values:
+                    continue
+                if item == constants.PORT_STATE:
+                    port_count += 1
+                    result[constants.PORT.format(port_count)] = \
+                        response.values[item]
+                else:
+                    result[item] = response.values[item]
+
+        total_ptp_keywords = len(ptp_keywords)
+        if port_count == 0:
+            port_count = 1
+        total_ptp_keywords = total_ptp_keywords + port_count - 1
+        return result, total_ptp_keywords, port_count
+
+    def ptpsync_pmc(self):
         result = {}
         total_ptp_keywords = 0
         port_count = 0
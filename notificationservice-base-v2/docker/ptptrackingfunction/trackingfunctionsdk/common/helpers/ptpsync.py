@@ -18,6 +18,7 @@ import subprocess
 import logging
 from trackingfunctionsdk.common.helpers import constants
 from trackingfunctionsdk.common.helpers import log_helper
+from trackingfunctionsdk.common.helpers import resource_watcher
 
 LOG = logging.getLogger(__name__)
 log_helper.config_logger(LOG)
@@ -33,35 +34,26 @@ except:
 
 
 # run subprocess and returns out, err, errcode
+# the working directory is passed to the child so that monitors sampled
+# from different threads do not race on the process wide cwd
 def run_shell2(dir, ctx, args):
-    cwd = os.getcwd()
-    os.chdir(dir)
-
-    process = subprocess.Popen(args, shell=True,
+    process = subprocess.Popen(args, shell=True, cwd=dir,
                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     out, err = process.communicate()
     errcode = process.returncode
 
-    os.chdir(cwd)
-
     return out, err, errcode
 
 
+# presence is read from the resource watcher table when it is running
 def check_critical_resources(ptp4l_service_name, phc2sys_service_name):
-    pmc = False
-    ptp4l = False
-    phc2sys = False
-    ptp4lconf = False
-
-    if os.path.isfile('/usr/sbin/pmc'):
-        pmc = True
-    if os.path.isfile('/var/run/ptp4l-%s.pid' % ptp4l_service_name):
-        ptp4l = True
-    if os.path.isfile('/var/run/phc2sys-%s.pid' % phc2sys_service_name):
-        phc2sys = True
-    if os.path.isfile(constants.PTP_CONFIG_PATH +
-                      ('ptp4l-%s.conf' % ptp4l_service_name)):
-        ptp4lconf = True
+    pmc = resource_watcher.exists(constants.PMC_PATH)
+    ptp4l = resource_watcher.exists(
+        constants.PIDFILE_PATH + 'ptp4l-%s.pid' % ptp4l_service_name)
+    phc2sys = resource_watcher.exists(
+        constants.PIDFILE_PATH + 'phc2sys-%s.pid' % phc2sys_service_name)
+    ptp4lconf = resource_watcher.exists(
+        constants.PTP_CONFIG_PATH + 'ptp4l-%s.conf' % ptp4l_service_name)
     return pmc, ptp4l, phc2sys, ptp4lconf
 
 
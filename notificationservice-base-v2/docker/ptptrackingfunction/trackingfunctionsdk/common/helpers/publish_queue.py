@@ -0,0 +1,133 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Bounded outbound queue of the tracking function events.
+# The tracking loop queues the events of each cycle without waiting for
+# the brokers, a sender thread casts them with the PtpEventProducer.
+# An event still waiting when a newer one is queued for the same resource
+# and topic is replaced by it, only the latest state of a resource is
+# worth delivering. When the queue is full the oldest event is dropped.
+#
+import collections
+import logging
+import threading
+import time
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import log_helper
+
+LOG = logging.getLogger(__name__)
+log_helper.config_logger(LOG)
+
+PublishQueueMetrics = collections.namedtuple(
+    'PublishQueueMetrics', ['depth', 'queued', 'coalesced', 'dropped',
+                            'sent', 'failed', 'send_latency_last',
+                            'send_latency_max', 'send_latency_mean'])
+
+
+def coalesce_key(ptpstatus, source):
+    """Return the key of the resource a status is about on a topic"""
+    if 'ResourceType' in ptpstatus:
+        # v1 status
+        return source, ptpstatus['ResourceType']
+    resources = []
+    for instance, event in sorted(ptpstatus.items()):
+        try:
+            resource_address = \
+                event['data']['values'][0]['ResourceAddress']
+        except (KeyError, IndexError, TypeError):
+            resource_address = None
+        resources.append((instance, resource_address))
+    return source, tuple(resources)
+
+
+class PublishQueue(threading.Thread):
+
+    def __init__(self, producer, maxsize=constants.PUBLISH_QUEUE_SIZE):
+        super(PublishQueue, self).__init__(name='publish-queue',
+                                           daemon=True)
+        self.producer = producer
+        self.maxsize = max(1, maxsize)
+        # Key to (ptpstatus, source, queued time), in queuing order
+        self._pending = collections.OrderedDict()
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self.queued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.sent = 0
+        self.failed = 0
+        self.send_latency_last = 0.0
+        self.send_latency_max = 0.0
+        self._send_latency_total = 0.0
+
+    def put_many(self, statuses):
+        """Queue the (ptpstatus, source) pairs of a cycle, never blocks"""
+        with self._condition:
+            now = time.monotonic()
+            for ptpstatus, source in statuses:
+                key = coalesce_key(ptpstatus, source)
+                self.queued += 1
+                if key in self._pending:
+                    # Keeps its place in the queue
+                    self.coalesced += 1
+                elif len(self._pending) >= self.maxsize:
+                    self._pending.popitem(last=False)
+                    self.dropped += 1
+                    LOG.warning("Publish queue full, dropped the oldest "
+                                "event (%d dropped)" % self.dropped)
+                self._pending[key] = (ptpstatus, source, now)
+            self._condition.notify()
+
+    def stop(self):
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify()
+
+    def depth(self):
+        return len(self._pending)
+
+    def metrics(self):
+        sent = self.sent + self.failed
+        return PublishQueueMetrics(
+            self.depth(), self.queued, self.coalesced, self.dropped,
+            self.sent, self.failed, self.send_latency_last,
+            self.send_latency_max,
+            self._send_latency_total / sent if sent else 0.0)
+
+    def run(self):
+        while not self._stopped.is_set():
+            with self._condition:
+                while not self._pending and not self._stopped.is_set():
+                    self._condition.wait()
+                batch = list(self._pending.values())
+                self._pending.clear()
+            if batch:
+                self.send(batch)
+
+    def send(self, batch):
+        try:
+            local, registration = self.producer.publish_many(
+                [(ptpstatus, source) for ptpstatus, source, _ in batch])
+        except Exception as ex:
+            LOG.error("Failed to publish %d events: %s" % (len(batch), ex))
+            local = registration = False
+        now = time.monotonic()
+        # A producer without a registration broker reports it as failed
+        if (local or not self.producer.local_broker_client) and \
+                (registration or
+                 not self.producer.registration_broker_client):
+            self.sent += len(batch)
+        else:
+            self.failed += len(batch)
+        for _, _, queued_time in batch:
+            latency = now - queued_time
+            self._send_latency_total += latency
+            self.send_latency_max = max(self.send_latency_max, latency)
+        self.send_latency_last = now - batch[-1][2]
+        LOG.debug("Published %d events, depth %d, latency %.3fs"
+                  % (len(batch), self.depth(), self.send_latency_last))
@@ -0,0 +1,210 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# inotify based watcher for the critical resources of the tracking
+# function: the linuxptp daemon pidfiles, the linuxptp config files and
+# the pmc binary.
+# The watcher keeps an in-memory table of the files present in each
+# watched directory so the monitors no longer stat them on every poll,
+# and wakes the daemon as soon as a pidfile or config file appears or
+# goes away.
+#
+import ctypes
+import ctypes.util
+import fnmatch
+import logging
+import os
+import select
+import struct
+import threading
+
+from trackingfunctionsdk.common.helpers import input_trace
+from trackingfunctionsdk.common.helpers import log_helper
+
+LOG = logging.getLogger(__name__)
+log_helper.config_logger(LOG)
+
+# inotify(7) flags
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | \
+    IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+INOTIFY_EVENT = struct.Struct('iIII')
+INOTIFY_BUFFER_SIZE = 64 * 1024
+
+# Changes to these files wake the daemon
+WAKEUP_PATTERNS = ('*.pid', '*.conf')
+
+_watcher = None
+
+
+def exists(path):
+    """Return whether path is present
+
+    Answered from the running watcher's presence table when it covers the
+    directory of path, else by checking the filesystem.
+    """
+    return input_trace.read('exists', path, _exists, path)
+
+
+def _exists(path):
+    watcher = _watcher
+    if watcher is not None:
+        present = watcher.lookup(path)
+        if present is not None:
+            return present
+    return os.path.isfile(path)
+
+
+class ResourceWatcher(threading.Thread):
+
+    def __init__(self, directories, wakeup=None):
+        super(ResourceWatcher, self).__init__(name='resource-watcher',
+                                              daemon=True)
+        self.directories = [os.path.normpath(directory)
+                            for directory in directories]
+        self.wakeup = wakeup
+        # Directory to the set of names it contains
+        self.presence = {}
+        self._fd = None
+        self._watches = {}
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Set up the inotify watches and start the watcher thread
+
+        Returns False when inotify is not available, in which case the
+        monitors keep checking the filesystem.
+        """
+        global _watcher
+        try:
+            self._open()
+        except OSError as ex:
+            LOG.warning("Unable to watch critical resources, falling back "
+                        "to polling: %s" % ex)
+            self._close()
+            return False
+        _watcher = self
+        super(ResourceWatcher, self).start()
+        return True
+
+    def stop(self):
+        self._stopped.set()
+
+    def lookup(self, path):
+        """Return whether path is present, None if it is not watched"""
+        path = os.path.normpath(path)
+        names = self.presence.get(os.path.dirname(path))
+        if names is None:
+            return None
+        return os.path.basename(path) in names
+
+    def run(self):
+        global _watcher
+        LOG.info("Watching critical resources in %s"
+                 % ', '.join(self._watches.values()))
+        try:
+            while not self._stopped.is_set():
+                readable, _, _ = select.select([self._fd], [], [], 1)
+                if readable:
+                    self._read_events()
+        finally:
+            if _watcher is self:
+                _watcher = None
+            self._close()
+
+    def _open(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._inotify_add_watch = libc.inotify_add_watch
+        self._inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p,
+                                            ctypes.c_uint32]
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            self._fd = None
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        for directory in self.directories:
+            self._watch(directory)
+
+    def _close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _watch(self, directory):
+        wd = self._inotify_add_watch(self._fd, os.fsencode(directory),
+                                     WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            LOG.warning("Unable to watch %s: %s"
+                        % (directory, os.strerror(errno)))
+            self.presence.pop(directory, None)
+            return
+        self._watches[wd] = directory
+        self._scan(directory)
+
+    def _scan(self, directory):
+        try:
+            self.presence[directory] = set(os.listdir(directory))
+        except OSError as ex:
+            LOG.warning("Unable to list %s: %s" % (directory, ex))
+            self.presence.pop(directory, None)
+
+    def _read_events(self):
+        try:
+            data = os.read(self._fd, INOTIFY_BUFFER_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        changed = False
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                LOG.warning("inotify queue overflow, rescanning")
+                for directory in self._watches.values():
+                    self._scan(directory)
+                changed = True
+                continue
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                # Lookups fall back to the filesystem from now on
+                LOG.warning("Watched directory %s removed" % directory)
+                del self._watches[wd]
+                self.presence.pop(directory, None)
+                changed = True
+                continue
+            names = self.presence.get(directory)
+            if names is None:
+                continue
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                names.add(name)
+                LOG.debug("%s created" % os.path.join(directory, name))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                names.discard(name)
+                LOG.debug("%s removed" % os.path.join(directory, name))
+            else:
+                continue
+            if any(fnmatch.fnmatch(name, pattern)
+                   for pattern in WAKEUP_PATTERNS):
+                changed = True
+        if changed and self.wakeup:
+            self.wakeup()
@@ -0,0 +1,86 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Durations of the stages of the tracking loop.
+# The monitors, the loop and the publish queue time their stages (pmc,
+# phc_ctl, cgu read and parse, state machines, broker casts, ...) with the
+# process wide timer. Every stage and instance pair has its own histogram,
+# and the time spent in each stage since the start of the tick is kept to
+# explain a tracking cycle that overran the poll period. The broker casts
+# of the publish queue running meanwhile are part of the tick.
+#
+import threading
+import time
+
+from trackingfunctionsdk.common.helpers.histogram import DURATION_BUCKETS
+from trackingfunctionsdk.common.helpers.histogram import Histogram
+
+
+class _Stage:
+    __slots__ = ('timer', 'key', 'start')
+
+    def __init__(self, timer, key):
+        self.timer = timer
+        self.key = key
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.timer.observe(self.key, time.monotonic() - self.start)
+        return False
+
+
+class StageTimer:
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        # Histogram by (stage, instance)
+        self.durations = {}
+        # Seconds spent in each (stage, instance) since start_tick()
+        self._tick = {}
+        self._lock = threading.Lock()
+
+    def timed(self, stage, instance=''):
+        """Return a context manager timing a stage of an instance"""
+        return _Stage(self, (stage, instance))
+
+    def observe(self, key, duration):
+        # Stages are timed from the workers, the loop and the publish queue
+        with self._lock:
+            histogram = self.durations.get(key)
+            if histogram is None:
+                histogram = self.durations[key] = Histogram(self.buckets)
+            histogram.observe(duration)
+            self._tick[key] = self._tick.get(key, 0.0) + duration
+
+    def start_tick(self):
+        with self._lock:
+            self._tick = {}
+
+    def tick_durations(self):
+        """Return the seconds spent in each stage since start_tick()"""
+        with self._lock:
+            return dict(self._tick)
+
+    def histograms(self):
+        with self._lock:
+            return list(self.durations.items())
+
+
+_timer = StageTimer()
+
+
+def get_timer():
+    return _timer
+
+
+def timed(stage, instance=''):
+    """Time a stage of an instance with the process wide timer"""
+    return _timer.timed(stage, instance)
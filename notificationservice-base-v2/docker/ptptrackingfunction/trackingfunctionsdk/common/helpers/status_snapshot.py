@@ -0,0 +1,118 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Versioned snapshot of the tracker states answering the QueryStatus
+# requests.
+# The monitoring loop builds a new snapshot once a cycle changed a tracker
+# context and replaces the previous one with a single reference
+# assignment. A snapshot is never modified once built, the request handler
+# reads the current one and looks up the prebuilt response of the resource
+# path without taking the tracker context locks.
+#
+import collections
+import threading
+
+from trackingfunctionsdk.common.helpers import constants
+
+# A status of a resource, key is the key of its event in the responses and
+# instance the instance its event is encoded for
+ResourceStatus = collections.namedtuple(
+    'ResourceStatus', ['key', 'instance', 'value', 'event_time'])
+
+# Resources answered for SOURCE_SYNC_ALL, in the order their responses are
+# merged
+SYNC_ALL_RESOURCE_PATHS = (
+    constants.SOURCE_SYNC_GNSS_SYNC_STATUS,
+    constants.SOURCE_SYNC_PTP_CLOCK_CLASS,
+    constants.SOURCE_SYNC_PTP_LOCK_STATE,
+    constants.SOURCE_SYNC_OS_CLOCK,
+    constants.SOURCE_SYNC_SYNC_STATE)
+
+# Resources with a status per daemon instance
+INSTANCE_RESOURCE_PATHS = (
+    constants.SOURCE_SYNC_GNSS_SYNC_STATUS,
+    constants.SOURCE_SYNC_PTP_CLOCK_CLASS,
+    constants.SOURCE_SYNC_PTP_LOCK_STATE)
+
+
+def event_types(resource_path):
+    """Return the data and value types of the events of a resource"""
+    if resource_path in [constants.SOURCE_SYNC_PTP_CLOCK_CLASS,
+                         constants.SOURCE_SYNCE_CLOCK_QUALITY]:
+        return constants.DATA_TYPE_METRIC, constants.VALUE_TYPE_METRIC
+    return constants.DATA_TYPE_NOTIFICATION, constants.VALUE_TYPE_ENUMERATION
+
+
+class StatusSnapshot:
+
+    def __init__(self, version, event_encoder, statuses):
+        """statuses maps each resource path to its ResourceStatus list"""
+        self.version = version
+        self.event_encoder = event_encoder
+        self.statuses = statuses
+        self._responses = {}
+        self._lock = threading.Lock()
+        self.responses(event_encoder.node_name)
+
+    def responses(self, node_name):
+        """Return the responses for a node name, by resource path
+
+        The responses for the node of the tracking function are built with
+        the snapshot, the ones for the other names a client uses on its
+        first request. Callers must not modify them.
+        """
+        responses = self._responses.get(node_name)
+        if responses is None:
+            with self._lock:
+                responses = self._responses.get(node_name)
+                if responses is None:
+                    responses = self._build(node_name)
+                    self._responses[node_name] = responses
+        return responses
+
+    def _build(self, node_name):
+        responses = {}
+        for resource_path, statuses in self.statuses.items():
+            data_type, value_type = event_types(resource_path)
+            responses[resource_path] = collections.OrderedDict(
+                (status.key, self.event_encoder.encode(
+                    resource_path, status.value, status.event_time,
+                    status.instance, data_type, value_type, node_name))
+                for status in statuses)
+        sync_all = {}
+        for resource_path in SYNC_ALL_RESOURCE_PATHS:
+            sync_all.update(responses.get(resource_path, {}))
+        responses[constants.SOURCE_SYNC_ALL] = sync_all
+        return responses
+
+    def query(self, resource_path, node_name, optional=None):
+        """Return the status of a resource as answered to QueryStatus
+
+        With optional only the status of that instance is returned, None
+        when no resource of the path has that instance.
+        """
+        responses = self.responses(node_name)
+        if not optional:
+            return responses.get(resource_path, {})
+        if resource_path == constants.SOURCE_SYNC_ALL:
+            resource_paths = SYNC_ALL_RESOURCE_PATHS
+        else:
+            resource_paths = (resource_path,)
+        status = {}
+        found = None
+        for path in resource_paths:
+            if path in INSTANCE_RESOURCE_PATHS:
+                event = responses.get(path, {}).get(optional)
+                if event is not None:
+                    status[optional] = event
+                    found = True
+                elif found is None:
+                    found = False
+            else:
+                # Not an instance resource, the optional does not apply
+                status.update(responses.get(path, {}))
+        return None if found is False else status
@@ -0,0 +1,150 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+#
+# Replay of an input trace through the PtpMonitor, OsClockMonitor and
+# GnssMonitor state machines on a virtual clock, see input_trace.
+# The monitors are built from the setup recorded by the daemon and polled
+# at every recorded tick with the inputs they had then. The virtual clock
+# jumps from one tick to the next, a replay runs as fast as the state
+# machines do. The state changes are returned with their time in the
+# trace, two replays of a trace return the same changes.
+#
+import collections
+import logging
+import time
+
+from trackingfunctionsdk.common.helpers import gnss_monitor
+from trackingfunctionsdk.common.helpers import input_trace
+from trackingfunctionsdk.common.helpers import log_helper
+from trackingfunctionsdk.common.helpers import os_clock_monitor
+from trackingfunctionsdk.common.helpers import ptp_monitor
+from trackingfunctionsdk.model.dto.gnssstate import GnssState
+from trackingfunctionsdk.model.dto.osclockstate import OsClockState
+from trackingfunctionsdk.model.dto.ptpstate import PtpState
+
+LOG = logging.getLogger(__name__)
+log_helper.config_logger(LOG)
+
+# Modules whose time and datetime follow the virtual clock
+MONITOR_MODULES = (gnss_monitor, os_clock_monitor, ptp_monitor)
+
+ReplayTransition = collections.namedtuple(
+    'ReplayTransition', ['time', 'resource', 'instance', 'state'])
+
+ReplayResult = collections.namedtuple(
+    'ReplayResult', ['transitions', 'polls', 'failed_polls', 'reads',
+                     'virtual_seconds', 'wall_seconds'])
+
+
+class TraceReplay:
+
+    def __init__(self, trace):
+        self.trace = trace
+        # Tracker contexts by monitor name, as kept by the daemon
+        self.contexts = {}
+        self.monitors = {}
+
+    def run(self):
+        """Replay every tick of the trace, return the ReplayResult"""
+        player = input_trace.TracePlayer(self.trace)
+        clock = input_trace.VirtualClock(self.trace.header['time'],
+                                         self.trace.header['monotonic'])
+        ticks = player.ticks
+        transitions = []
+        polls = 0
+        failed_polls = 0
+        start = time.monotonic()
+        with input_trace.replaying(player), \
+                input_trace.virtual_time(clock, MONITOR_MODULES):
+            # Built with the inputs read before the first tick
+            if ticks:
+                player.horizon = ticks[0][0]
+                clock.advance_to(ticks[0][0])
+            self.build_monitors(player, clock.time())
+            for index, (elapsed, names) in enumerate(ticks):
+                clock.advance_to(elapsed)
+                player.horizon = ticks[index + 1][0] \
+                    if index + 1 < len(ticks) else float('inf')
+                for name in names:
+                    if name not in self.monitors:
+                        continue
+                    polls += 1
+                    try:
+                        transitions.extend(
+                            ReplayTransition(elapsed, resource, name[-1],
+                                             state)
+                            for resource, state in self.poll(name))
+                    except Exception as ex:
+                        failed_polls += 1
+                        LOG.warning("Replaying %s at %.3fs failed: %s"
+                                    % (name, elapsed, ex))
+        return ReplayResult(transitions, polls, failed_polls, player.reads,
+                            ticks[-1][0] - ticks[0][0] if ticks else 0.0,
+                            time.monotonic() - start)
+
+    def build_monitors(self, player, now):
+        for settings in player.setup('ptp4l', []):
+            name = ('ptp', settings['name'])
+            self.monitors[name] = ptp_monitor.PtpMonitor(
+                settings['name'], settings['holdover_seconds'],
+                settings['poll_freq_seconds'],
+                settings['phc2sys_service_name'])
+            self.contexts[name] = self._context(settings, PtpState.Freerun,
+                                                now)
+        for settings in player.setup('gnss', []):
+            name = ('gnss', settings['name'])
+            self.monitors[name] = gnss_monitor.GnssMonitor(
+                settings['config_file'], settings['nmea_serialport'],
+                settings['pci_addr'], settings['cgu_path'])
+            self.contexts[name] = self._context(
+                settings, GnssState.Failure_Nofix, now)
+        settings = player.setup('os_clock')
+        if settings is not None:
+            name = ('os_clock',)
+            self.monitors[name] = os_clock_monitor.OsClockMonitor(
+                phc2sys_config=settings['config'])
+            self.contexts[name] = self._context(
+                settings, OsClockState.Freerun, now)
+
+    @staticmethod
+    def _context(settings, sync_state, now):
+        return {'sync_state': sync_state,
+                'last_event_time': now,
+                'holdover_seconds': float(settings['holdover_seconds']),
+                'poll_freq_seconds': float(settings['poll_freq_seconds'])}
+
+    def poll(self, name):
+        """Poll a monitor as the daemon does, return its state changes"""
+        monitor = self.monitors[name]
+        context = self.contexts[name]
+        changes = []
+        if name[0] == 'ptp':
+            monitor.set_ptp_sync_state()
+            new_event, sync_state, event_time = \
+                monitor.get_ptp_sync_state()
+            new_clock_class_event, clock_class, _ = \
+                monitor.get_ptp_clock_class()
+            if new_clock_class_event:
+                changes.append(('clock_class', clock_class))
+        elif name[0] == 'gnss':
+            new_event, sync_state, event_time = monitor.get_gnss_status(
+                context['holdover_seconds'], context['poll_freq_seconds'],
+                context['sync_state'], context['last_event_time'])
+        else:
+            new_event, sync_state, event_time = monitor.os_clock_status(
+                context['holdover_seconds'], context['poll_freq_seconds'],
+                context['sync_state'], context['last_event_time'])
+        if new_event or sync_state != context['sync_state']:
+            changes.insert(0, (name[0], sync_state))
+            context['sync_state'] = sync_state
+            context['last_event_time'] = event_time
+        return changes
+
+
+def replay_file(path):
+    """Replay the input trace of a file, return the ReplayResult"""
+    return TraceReplay(input_trace.load_trace(path)).run()
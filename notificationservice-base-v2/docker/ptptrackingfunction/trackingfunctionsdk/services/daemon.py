@@ -4,21 +4,45 @@
 # SPDX-License-Identifier: Apache-2.0
 #
 import datetime
+import functools
 import json
 import logging
 import multiprocessing as mp
 import os
 import threading
 import time
-from oslo_utils import uuidutils
 
 from trackingfunctionsdk.client.ptpeventproducer import PtpEventProducer
 from trackingfunctionsdk.common.helpers import constants
 from trackingfunctionsdk.common.helpers import ptpsync as utils
 from trackingfunctionsdk.common.helpers import log_helper
+from trackingfunctionsdk.common.helpers.event_damper import DamperSettings
+from trackingfunctionsdk.common.helpers.event_damper import EventDamper
+from trackingfunctionsdk.common.helpers.event_damper import settings_enabled
+from trackingfunctionsdk.common.helpers.event_encoder import EventEncoder
 from trackingfunctionsdk.common.helpers.gnss_monitor import GnssMonitor
+from trackingfunctionsdk.common.helpers import input_trace
+from trackingfunctionsdk.common.helpers.kernel_log_subject import \
+    KernelLogSubject
+from trackingfunctionsdk.common.helpers.metrics_exporter import \
+    start_metrics_exporter
+from trackingfunctionsdk.common.helpers.monitor_scheduler import \
+    MonitorScheduler
+from trackingfunctionsdk.common.helpers import offset_history
+from trackingfunctionsdk.common.helpers.offset_history import OffsetHistory
 from trackingfunctionsdk.common.helpers.os_clock_monitor import OsClockMonitor
+from trackingfunctionsdk.common.helpers.poll_scheduler import PollScheduler
+from trackingfunctionsdk.common.helpers.ptp_event_subscriber import \
+    PtpEventSubscriber
 from trackingfunctionsdk.common.helpers.ptp_monitor import PtpMonitor
+from trackingfunctionsdk.common.helpers.publish_queue import PublishQueue
+from trackingfunctionsdk.common.helpers.resource_watcher import \
+    ResourceWatcher
+from trackingfunctionsdk.common.helpers import stage_timer
+from trackingfunctionsdk.common.helpers.status_snapshot import \
+    ResourceStatus
+from trackingfunctionsdk.common.helpers.status_snapshot import \
+    StatusSnapshot
 from trackingfunctionsdk.model.dto.ptpstate import PtpState
 from trackingfunctionsdk.model.dto.gnssstate import GnssState
 from trackingfunctionsdk.model.dto.osclockstate import OsClockState
@@ -31,26 +55,6 @@ log_helper.config_logger(LOG)
 
 THIS_NODE_NAME = os.environ.get("THIS_NODE_NAME", 'controller-0')
 
-# Event source to event type mapping
-source_type = {
-    '/sync/gnss-status/gnss-sync-status':
-        'event.sync.gnss-status.gnss-state-change',
-    '/sync/ptp-status/clock-class':
-        'event.sync.ptp-status.ptp-clock-class-change',
-    '/sync/ptp-status/lock-state':
-        'event.sync.ptp-status.ptp-state-change', 
-    '/sync/sync-status/os-clock-sync-state':
-        'event.sync.sync-status.os-clock-sync-state-change',
-    '/sync/sync-status/sync-state':
-        'event.sync.sync-status.synchronization-state-change',
-    '/sync/synce-status/clock-quality':
-        'event.sync.synce-status.synce-clock-quality-change',
-    '/sync/synce-status/lock-state-extended':
-        'event.sync.synce-status.synce-state-change-extended',
-    '/sync/synce-status/lock-state':
-        'event.sync.synce-status.synce-state-change',
-}
-
 '''Entry point of Default Process Worker'''
 
 
@@ -88,34 +92,6 @@ class PtpWatcherDefault:
             self.init_time = time.time()
             self.daemon_context = daemon_context
 
-        def _build_event_response(
-            self, resource_path, last_event_time, resource_address,
-                sync_state, value_type=constants.VALUE_TYPE_ENUMERATION):
-            if resource_path in [constants.SOURCE_SYNC_PTP_CLOCK_CLASS,
-                                 constants.SOURCE_SYNCE_CLOCK_QUALITY]:
-                data_type = constants.DATA_TYPE_METRIC
-            else:
-                data_type = constants.DATA_TYPE_NOTIFICATION
-            lastStatus = {
-                'id': uuidutils.generate_uuid(),
-                'specversion': constants.SPEC_VERSION,
-                'source': resource_path,
-                'type': source_type[resource_path],
-                'time': last_event_time,
-                'data': {
-                    'version': constants.DATA_VERSION,
-                    'values': [
-                        {
-                            'data_type': data_type,
-                            'ResourceAddress': resource_address,
-                            'value_type': value_type,
-                            'value': sync_state.upper()
-                        }
-                    ]
-                }
-            }
-            return lastStatus
-
         def query_status(self, **rpc_kwargs):
             lastStatus = {}
             resource_address = rpc_kwargs.get('ResourceAddress', None)
@@ -123,137 +99,17 @@ class PtpWatcherDefault:
             if resource_address:
                 _, nodename, resource_path = utils.parse_resource_address(
                     resource_address)
-                if resource_path == constants.SOURCE_SYNC_GNSS_SYNC_STATUS or \
-                   resource_path == constants.SOURCE_SYNC_ALL:
-                    self.watcher.gnsstracker_context_lock.acquire()
-                    if optional and self.watcher.gnsstracker_context.get(optional):
-                        sync_state = \
-                            self.watcher.gnsstracker_context[optional].get(
-                                'sync_state', GnssState.Failure_Nofix)
-                        last_event_time = \
-                            self.watcher.gnsstracker_context[optional].get(
-                                'last_event_time', time.time())
-                        lastStatus[optional] = self._build_event_response(
-                            constants.SOURCE_SYNC_GNSS_SYNC_STATUS,
-                            last_event_time,
-                            utils.format_resource_address(nodename,
-                                constants.SOURCE_SYNC_GNSS_SYNC_STATUS),
-                            sync_state)
-                    elif not optional:
-                        for config in self.daemon_context['GNSS_INSTANCES']:
-                            sync_state = \
-                                self.watcher.gnsstracker_context[config].get(
-                                    'sync_state', GnssState.Failure_Nofix)
-                            last_event_time = \
-                                self.watcher.gnsstracker_context[config].get(
-                                    'last_event_time', time.time())
-                            lastStatus[config] = self._build_event_response(
-                                constants.SOURCE_SYNC_GNSS_SYNC_STATUS,
-                                last_event_time,
-                                utils.format_resource_address(nodename,
-                                    constants.SOURCE_SYNC_GNSS_SYNC_STATUS),
-                                sync_state)
-                    else:
-                        lastStatus = None
-                    self.watcher.gnsstracker_context_lock.release()
-                if resource_path == constants.SOURCE_SYNC_PTP_CLOCK_CLASS or \
-                   resource_path == constants.SOURCE_SYNC_ALL:
-                    self.watcher.ptptracker_context_lock.acquire()
-                    if optional and self.watcher.ptptracker_context.get(optional):
-                        clock_class = \
-                            self.watcher.ptptracker_context[optional].get(
-                                'clock_class', '248')
-                        last_clock_class_event_time = \
-                            self.watcher.ptptracker_context[optional].get(
-                                'last_clock_class_event_time', time.time())
-                        lastStatus[optional] = self._build_event_response(
-                            constants.SOURCE_SYNC_PTP_CLOCK_CLASS,
-                            last_clock_class_event_time,
-                            utils.format_resource_address(nodename,
-                                constants.SOURCE_SYNC_PTP_CLOCK_CLASS),
-                            clock_class, constants.VALUE_TYPE_METRIC)
-                    elif not optional:
-                        for config in self.daemon_context['PTP4L_INSTANCES']:
-                            clock_class = \
-                                self.watcher.ptptracker_context[config].get(
-                                    'clock_class', '248')
-                            last_clock_class_event_time = \
-                                self.watcher.ptptracker_context[config].get(
-                                    'last_clock_class_event_time',
-                                    time.time())
-                            lastStatus[config] = self._build_event_response(
-                                constants.SOURCE_SYNC_PTP_CLOCK_CLASS,
-                                last_clock_class_event_time,
-                                utils.format_resource_address(nodename,
-                                    constants.SOURCE_SYNC_PTP_CLOCK_CLASS),
-                                clock_class, constants.VALUE_TYPE_METRIC)
-                    else:
-                        lastStatus = None
-                    self.watcher.ptptracker_context_lock.release()
-                if resource_path == constants.SOURCE_SYNC_PTP_LOCK_STATE or \
-                   resource_path == constants.SOURCE_SYNC_ALL:
-                    self.watcher.ptptracker_context_lock.acquire()
-                    if optional and self.watcher.ptptracker_context.get(optional):
-                        sync_state = \
-                            self.watcher.ptptracker_context[optional].get(
-                                'sync_state', PtpState.Freerun)
-                        last_event_time = \
-                            self.watcher.ptptracker_context[optional].get(
-                                'last_event_time', time.time())
-                        lastStatus[optional] = self._build_event_response(
-                            constants.SOURCE_SYNC_PTP_LOCK_STATE,
-                            last_event_time,
-                            utils.format_resource_address(nodename,
-                                constants.SOURCE_SYNC_PTP_LOCK_STATE),
-                            sync_state)
-                    elif not optional:
-                        for config in self.daemon_context['PTP4L_INSTANCES']:
-                            sync_state = \
-                                self.watcher.ptptracker_context[config].get(
-                                    'sync_state', PtpState.Freerun)
-                            last_event_time = \
-                                self.watcher.ptptracker_context[config].get(
-                                    'last_event_time', time.time())
-                            lastStatus[config] = self._build_event_response(
-                                constants.SOURCE_SYNC_PTP_LOCK_STATE,
-                                last_event_time,
-                                utils.format_resource_address(nodename,
-                                    constants.SOURCE_SYNC_PTP_LOCK_STATE),
-                                sync_state)
-                    else:
-                        lastStatus = None
-                    self.watcher.ptptracker_context_lock.release()
-
-                if resource_path == constants.SOURCE_SYNC_OS_CLOCK or \
-                   resource_path == constants.SOURCE_SYNC_ALL:
-                    self.watcher.osclocktracker_context_lock.acquire()
-                    sync_state = \
-                        self.watcher.osclocktracker_context.get(
-                            'sync_state', OsClockState.Freerun)
-                    last_event_time = \
-                        self.watcher.osclocktracker_context.get(
-                            'last_event_time', time.time())
-                    self.watcher.osclocktracker_context_lock.release()
-                    lastStatus['os_clock_status'] = self._build_event_response(
-                        constants.SOURCE_SYNC_OS_CLOCK, last_event_time,
-                        utils.format_resource_address(nodename,
-                            constants.SOURCE_SYNC_OS_CLOCK),
-                        sync_state)
-                if resource_path == constants.SOURCE_SYNC_SYNC_STATE or \
-                   resource_path == constants.SOURCE_SYNC_ALL:
-                    self.watcher.overalltracker_context_lock.acquire()
-                    sync_state = self.watcher.overalltracker_context.get(
-                        'sync_state', OverallClockState.Freerun)
-                    last_event_time = self.watcher.overalltracker_context.get(
-                        'last_event_time', time.time())
-                    self.watcher.overalltracker_context_lock.release()
-                    lastStatus['overall_sync_status'] = \
-                        self._build_event_response(
-                            constants.SOURCE_SYNC_SYNC_STATE, last_event_time,
-                            utils.format_resource_address(nodename,
-                                constants.SOURCE_SYNC_SYNC_STATE),
-                            sync_state)
-                LOG.debug("query_status: {}".format(lastStatus))
+                if rpc_kwargs.get('statistics', False):
+                    # Offset statistics instead of the status
+                    lastStatus = self.watcher.offset_statistics(
+                        resource_path, optional)
+                    LOG.debug("query_status: statistics %s" % lastStatus)
+                    return lastStatus
+                # Published by the monitoring loop, read without locking
+                snapshot = self.watcher.status_snapshot
+                lastStatus = snapshot.query(resource_path, nodename, optional)
+                LOG.debug("query_status: version %d %s"
+                          % (snapshot.version, lastStatus))
 
             return lastStatus
 
@@ -268,6 +124,12 @@ class PtpWatcherDefault:
 
         self.daemon_context = json.loads(daemon_context_json)
 
+        # Record the inputs of the monitors from their first read, the
+        # trace can be replayed with trace_replay
+        input_trace_file = os.environ.get('INPUT_TRACE_FILE')
+        if input_trace_file:
+            input_trace.start_recording(input_trace_file)
+
         # PTP Context
         self.ptptracker_context = {}
         for config in self.daemon_context['PTP4L_INSTANCES']:
@@ -327,7 +189,34 @@ class PtpWatcherDefault:
 
         self.event_timeout = float(os.environ.get('CONTROL_TIMEOUT', 2))
 
+        # Monitors of a cycle are sampled concurrently, each sample has
+        # to complete within the poll period
+        self.monitor_scheduler = MonitorScheduler(
+            int(os.environ.get('MONITOR_SAMPLE_WORKERS', 4)),
+            float(os.environ.get('MONITOR_SAMPLE_DEADLINE',
+                                 self.event_timeout)))
+        # Each resource is polled at its own interval, from every
+        # POLL_INTERVAL_MIN while changing or in holdover to every
+        # POLL_INTERVAL_MAX while stable
+        self.poll_scheduler = PollScheduler(
+            min(float(os.environ.get('POLL_INTERVAL_MIN',
+                                     constants.POLL_INTERVAL_MIN_SECONDS)),
+                self.event_timeout),
+            float(os.environ.get('POLL_INTERVAL_MAX', self.event_timeout)),
+            now=time.monotonic())
+        # Durations of the stages of the loop, the monitors and the
+        # publish queue, explain the cycles overrunning the poll period
+        self.stage_timer = stage_timer.get_timer()
+
         self.node_name = self.daemon_context['THIS_NODE_NAME']
+        self.event_encoder = EventEncoder(self.node_name)
+        self.metrics_port = int(os.environ.get('METRICS_PORT',
+                                               constants.METRICS_PORT))
+
+        # Answers the QueryStatus requests, replaced after every cycle that
+        # changed a tracker context
+        self.status_snapshot = None
+        self.__update_status_snapshot()
 
         self.namespace = self.daemon_context.get(
             'THIS_NAMESPACE', 'notification')
@@ -341,10 +230,20 @@ class PtpWatcherDefault:
         self.broker_endpoint = RpcEndpointInfo(broker_transport_endpoint)
         self.registration_broker_endpoint = \
             RpcEndpointInfo(registration_transport_endpoint)
+        # Sidecars unpacking the /sync snapshot events are required
+        sync_snapshot = os.environ.get(
+            "PTP_SYNC_SNAPSHOT_EVENTS", "false").lower() == "true"
         self.ptpeventproducer = PtpEventProducer(
             self.node_name,
             self.broker_endpoint.TransportEndpoint,
-            self.registration_broker_endpoint.TransportEndpoint)
+            self.registration_broker_endpoint.TransportEndpoint,
+            sync_snapshot)
+        # Events are cast by the queue's sender thread so a slow broker
+        # does not hold up the monitors
+        self.publish_queue = PublishQueue(
+            self.ptpeventproducer,
+            int(os.environ.get('PUBLISH_QUEUE_SIZE',
+                               constants.PUBLISH_QUEUE_SIZE)))
 
         self.__ptprequest_handler = \
             PtpWatcherDefault.PtpRequestHandlerDefault(
@@ -357,6 +256,20 @@ class PtpWatcherDefault:
         self.observer_list = [
             GnssMonitor(i) for i in self.daemon_context['GNSS_CONFIGS']]
 
+        # Follow the kernel log for GNSS DPLL events, cgu polling becomes a
+        # slow verification for the monitors while events are received
+        self.kernel_log_subject = None
+        if os.environ.get("GNSS_KERNEL_EVENTS", "false").lower() == "true" \
+                and self.observer_list:
+            cgu_verify_seconds = float(os.environ.get(
+                "GNSS_CGU_VERIFY_SECONDS",
+                constants.GNSS_CGU_VERIFY_SECONDS))
+            self.kernel_log_subject = KernelLogSubject(
+                wakeup=self.signal_ptp_event)
+            for gnss in self.observer_list:
+                gnss.cgu_verify_seconds = cgu_verify_seconds
+                self.kernel_log_subject.attach(gnss)
+
         # Setup OS Clock monitor
         self.os_clock_monitor = OsClockMonitor(
             phc2sys_config=self.daemon_context['PHC2SYS_CONFIG'])
@@ -369,6 +282,123 @@ class PtpWatcherDefault:
                        self.daemon_context['PHC2SYS_SERVICE_NAME'])
             for config in self.daemon_context['PTP4L_INSTANCES']]
 
+        if input_trace.recording():
+            self.__record_input_trace_setup()
+
+        # Keep the offsets of the last polls for the offset statistics
+        offset_history_size = int(os.environ.get(
+            'OFFSET_HISTORY_SIZE', constants.OFFSET_HISTORY_SIZE))
+        self.offset_statistics_windows = offset_history.parse_seconds_list(
+            os.environ.get('OFFSET_STATISTICS_WINDOWS',
+                           constants.OFFSET_STATISTICS_WINDOWS))
+        self.offset_statistics_taus = offset_history.parse_seconds_list(
+            os.environ.get('OFFSET_STATISTICS_TAUS',
+                           constants.OFFSET_STATISTICS_TAUS))
+        for ptp_monitor in self.ptp_monitor_list:
+            ptp_monitor.offset_history = OffsetHistory(offset_history_size)
+        self.os_clock_monitor.offset_history = \
+            OffsetHistory(offset_history_size)
+
+        # Damp the lock state and clock class events of flapping
+        # instances, losing sync is always reported right away
+        damper_settings = DamperSettings(
+            float(os.environ.get('PTP_EVENT_DWELL_SECONDS',
+                                 constants.PTP_EVENT_DWELL_SECONDS)),
+            float(os.environ.get('PTP_EVENT_LOCKED_DWELL_SECONDS',
+                                 constants.PTP_EVENT_LOCKED_DWELL_SECONDS)),
+            float(os.environ.get('PTP_EVENT_SUPPRESSION_SECONDS',
+                                 constants.PTP_EVENT_SUPPRESSION_SECONDS)))
+        self.ptp_event_dampers = {}
+        if settings_enabled(damper_settings):
+            LOG.info("Damping ptp4l events: %s" % (damper_settings,))
+            for ptp_monitor in self.ptp_monitor_list:
+                self.ptp_event_dampers[ptp_monitor.ptp4l_service_name] = (
+                    EventDamper(damper_settings, [PtpState.Freerun],
+                                [PtpState.Locked]),
+                    EventDamper(damper_settings,
+                                [constants.CLOCK_CLASS_FREERUN],
+                                utils.ptp4l_clock_class_locked))
+
+        # Setup ptp4l event subscription, polling becomes a slow
+        # consistency check for subscribed instances
+        self.ptp_event_subscriber = None
+        if os.environ.get("PTP4L_SUBSCRIBE_EVENTS", "false").lower() \
+                == "true" and self.ptp_monitor_list:
+            consistency_check_seconds = float(os.environ.get(
+                "PTP4L_CONSISTENCY_CHECK_SECONDS",
+                constants.PTP4L_CONSISTENCY_CHECK_SECONDS))
+            for ptp_monitor in self.ptp_monitor_list:
+                ptp_monitor.consistency_check_seconds = \
+                    consistency_check_seconds
+            self.ptp_event_subscriber = PtpEventSubscriber(
+                self.ptp_monitor_list, self.signal_ptp_event)
+
+        # Watch the pidfiles and configs instead of checking them each poll,
+        # a daemon going away or coming back triggers a cycle right away
+        self.resource_watcher = ResourceWatcher(
+            [constants.PIDFILE_PATH, constants.LINUXPTP_CONFIG_PATH,
+             os.path.dirname(constants.PMC_PATH)],
+            self.signal_ptp_event)
+
+    def __record_input_trace_setup(self):
+        # What a replay needs to build the same monitors
+        input_trace.setup('ptp4l', [
+            {'name': ptp_monitor.ptp4l_service_name,
+             'phc2sys_service_name': ptp_monitor.phc2sys_service_name,
+             'holdover_seconds': float(self.ptptracker_context[
+                 ptp_monitor.ptp4l_service_name]['holdover_seconds']),
+             'poll_freq_seconds': float(self.ptptracker_context[
+                 ptp_monitor.ptp4l_service_name]['poll_freq_seconds'])}
+            for ptp_monitor in self.ptp_monitor_list])
+        input_trace.setup('gnss', [
+            {'name': gnss.ts2phc_service_name,
+             'config_file': gnss.config_file,
+             'nmea_serialport': gnss.gnss_cgu_handler.nmea_serialport,
+             'pci_addr': gnss.gnss_cgu_handler.pci_addr,
+             'cgu_path': gnss.gnss_cgu_handler.cgu_path,
+             'holdover_seconds': float(self.gnsstracker_context[
+                 gnss.ts2phc_service_name]['holdover_seconds']),
+             'poll_freq_seconds': float(self.gnsstracker_context[
+                 gnss.ts2phc_service_name]['poll_freq_seconds'])}
+            for gnss in self.observer_list])
+        input_trace.setup('os_clock', {
+            'config': self.os_clock_monitor.phc2sys_config,
+            'holdover_seconds': float(
+                self.osclocktracker_context['holdover_seconds']),
+            'poll_freq_seconds': float(
+                self.osclocktracker_context['poll_freq_seconds'])})
+
+    def offset_statistics(self, resource_path, instance=None):
+        """Return the offset statistics of the clocks of a resource
+
+        The statistics of the ptp4l instances are returned for the lock
+        state, the ones of the OS clock for the OS clock state, both for
+        SOURCE_SYNC_ALL. They are keyed like the status of the resource,
+        then by window.
+        """
+        histories = []
+        if resource_path in [constants.SOURCE_SYNC_PTP_LOCK_STATE,
+                             constants.SOURCE_SYNC_ALL]:
+            histories.extend(
+                (ptp_monitor.ptp4l_service_name, ptp_monitor.offset_history)
+                for ptp_monitor in self.ptp_monitor_list
+                if instance in [None, ptp_monitor.ptp4l_service_name])
+        if resource_path in [constants.SOURCE_SYNC_OS_CLOCK,
+                             constants.SOURCE_SYNC_ALL]:
+            histories.append(('os_clock_status',
+                              self.os_clock_monitor.offset_history))
+        now = time.time()
+        result = {}
+        for key, history in histories:
+            if history is None:
+                continue
+            result[key] = dict(
+                ('%g' % window, offset_history.statistics_to_dict(
+                    history.statistics(window, self.offset_statistics_taus,
+                                       now)))
+                for window in self.offset_statistics_windows)
+        return result
+
     def signal_ptp_event(self):
         if self.event:
             self.event.set()
@@ -379,17 +409,62 @@ class PtpWatcherDefault:
         # start location listener
         self.__start_listener()
 
+        if self.ptp_event_subscriber:
+            self.ptp_event_subscriber.start()
+        if self.kernel_log_subject:
+            self.kernel_log_subject.start()
+        self.resource_watcher.start()
+        self.publish_queue.start()
+        if self.metrics_port:
+            start_metrics_exporter(self, self.metrics_port)
+
+        # Every resource is polled on the first cycle
+        signaled = True
         while True:
             # announce the location
+            cycle_start = time.monotonic()
+            self.stage_timer.start_tick()
             forced = self.forced_publishing
             self.forced_publishing = False
+            tasks = self.__monitor_tasks()
+            if not (forced or signaled):
+                # Only the resources due
+                due = self.poll_scheduler.due(cycle_start)
+                tasks = dict((name, tasks[name]) for name in due
+                             if name in tasks)
+            input_trace.tick(tasks)
+            with self.stage_timer.timed('sample'):
+                samples = self.monitor_scheduler.sample(tasks)
+            if forced and self.monitor_scheduler.deferred:
+                # Publish the late resources once their sample completes
+                self.forced_publishing = True
+            # The events of the cycle, queued together at its end
+            publications = []
             if self.ptptracker_context:
-                self.__publish_ptpstatus(forced)
+                with self.stage_timer.timed('state_machine', 'ptp'):
+                    self.__publish_ptpstatus(samples, publications, forced)
             if self.gnsstracker_context:
-                self.__publish_gnss_status(forced)
-            self.__publish_os_clock_status(forced)
-            self.__publish_overall_sync_status(forced)
-            if self.event.wait(self.event_timeout):
+                with self.stage_timer.timed('state_machine', 'gnss'):
+                    self.__publish_gnss_status(samples, publications, forced)
+            with self.stage_timer.timed('state_machine', 'os_clock'):
+                self.__publish_os_clock_status(samples, publications, forced)
+            # The overall state is only computed from this cycle's inputs
+            overall_state = self.overalltracker_context.get('sync_state')
+            with self.stage_timer.timed('state_machine', 'overall'):
+                self.__publish_overall_sync_status(publications, forced)
+            if publications:
+                # Every context change comes with a publication
+                with self.stage_timer.timed('status_snapshot'):
+                    self.__update_status_snapshot()
+                self.publish_queue.put_many(publications)
+            self.__schedule_polls(
+                tasks, samples, overall_state, cycle_start)
+            self.monitor_scheduler.check_overrun(
+                cycle_start, self.event_timeout,
+                self.stage_timer.tick_durations())
+            signaled = self.event.wait(
+                self.poll_scheduler.timeout(time.monotonic()))
+            if signaled:
                 LOG.debug("daemon control event is asserted")
                 self.event.clear()
             else:
@@ -411,6 +486,120 @@ class PtpWatcherDefault:
 
         self.ptpeventproducer.stop_status_listener(self.location_info)
 
+    def __update_status_snapshot(self):
+        # Only the monitoring loop changes the contexts, no locking needed
+        now = time.time()
+        statuses = {}
+        if self.gnsstracker_context:
+            statuses[constants.SOURCE_SYNC_GNSS_SYNC_STATUS] = [
+                ResourceStatus(
+                    config, config,
+                    self.gnsstracker_context[config].get(
+                        'sync_state', GnssState.Failure_Nofix),
+                    self.gnsstracker_context[config].get(
+                        'last_event_time', now))
+                for config in self.daemon_context['GNSS_INSTANCES']]
+        if self.ptptracker_context:
+            statuses[constants.SOURCE_SYNC_PTP_CLOCK_CLASS] = [
+                ResourceStatus(
+                    config, config,
+                    self.ptptracker_context[config].get(
+                        'clock_class', constants.CLOCK_CLASS_FREERUN),
+                    self.ptptracker_context[config].get(
+                        'last_clock_class_event_time', now))
+                for config in self.daemon_context['PTP4L_INSTANCES']]
+            statuses[constants.SOURCE_SYNC_PTP_LOCK_STATE] = [
+                ResourceStatus(
+                    config, config,
+                    self.ptptracker_context[config].get(
+                        'sync_state', PtpState.Freerun),
+                    self.ptptracker_context[config].get(
+                        'last_event_time', now))
+                for config in self.daemon_context['PTP4L_INSTANCES']]
+        statuses[constants.SOURCE_SYNC_OS_CLOCK] = [ResourceStatus(
+            'os_clock_status', None,
+            self.osclocktracker_context.get(
+                'sync_state', OsClockState.Freerun),
+            self.osclocktracker_context.get('last_event_time', now))]
+        statuses[constants.SOURCE_SYNC_SYNC_STATE] = [ResourceStatus(
+            'overall_sync_status', None,
+            self.overalltracker_context.get(
+                'sync_state', OverallClockState.Freerun),
+            self.overalltracker_context.get('last_event_time', now))]
+        version = self.status_snapshot.version + 1 \
+            if self.status_snapshot else 1
+        self.status_snapshot = StatusSnapshot(version, self.event_encoder,
+                                              statuses)
+
+    def __schedule_polls(self, tasks, samples, overall_state, now):
+        for name in tasks:
+            sample = samples.get(name)
+            if name in self.monitor_scheduler.deferred:
+                self.poll_scheduler.retry(name, now)
+                continue
+            if sample is None:
+                # Failed, retried at a relaxing interval
+                self.poll_scheduler.polled(name, False, False, now)
+                continue
+            changed = sample[0]
+            transitional = sample[1] == constants.HOLDOVER_PHC_STATE
+            if name[0] == 'ptp':
+                changed = changed or sample[3]
+                # A damped change is only let through by a later poll
+                dampers = self.ptp_event_dampers.get(name[1], ())
+                transitional = transitional or \
+                    any(damper.pending for damper in dampers)
+            self.poll_scheduler.polled(name, changed, transitional, now)
+        # The overall state has no monitor of its own, its timer keeps the
+        # loop polling while it is in holdover
+        sync_state = self.overalltracker_context.get('sync_state')
+        self.poll_scheduler.polled(
+            ('overall',), sync_state != overall_state,
+            sync_state == constants.HOLDOVER_PHC_STATE, now)
+
+    def __monitor_tasks(self):
+        tasks = {}
+        if self.ptptracker_context:
+            for ptp_monitor in self.ptp_monitor_list:
+                context = self.ptptracker_context[
+                    ptp_monitor.ptp4l_service_name]
+                tasks[('ptp', ptp_monitor.ptp4l_service_name)] = \
+                    functools.partial(
+                        self.__sample_ptp_status,
+                        float(context['holdover_seconds']),
+                        float(context['poll_freq_seconds']),
+                        context.get('sync_state', 'Unknown'),
+                        context.get('last_event_time', time.time()),
+                        ptp_monitor)
+        if self.gnsstracker_context:
+            for gnss in self.observer_list:
+                context = self.gnsstracker_context[gnss.ts2phc_service_name]
+                tasks[('gnss', gnss.ts2phc_service_name)] = \
+                    functools.partial(
+                        self.__get_gnss_status,
+                        float(context['holdover_seconds']),
+                        float(context['poll_freq_seconds']),
+                        context.get('sync_state', 'Unknown'),
+                        context.get('last_event_time', time.time()),
+                        gnss)
+        context = self.osclocktracker_context
+        tasks[('os_clock',)] = functools.partial(
+            self.__get_os_clock_status,
+            float(context['holdover_seconds']),
+            float(context['poll_freq_seconds']),
+            context.get('sync_state', 'Unknown'),
+            context.get('last_event_time', time.time()))
+        return tasks
+
+    def __sample_ptp_status(self, holdover_time, freq, sync_state,
+                            last_event_time, ptp_monitor):
+        new_event, sync_state, new_event_time = self.__get_ptp_status(
+            holdover_time, freq, sync_state, last_event_time, ptp_monitor)
+        new_clock_class_event, clock_class, clock_class_event_time = \
+            ptp_monitor.get_ptp_clock_class()
+        return new_event, sync_state, new_event_time, \
+            new_clock_class_event, clock_class, clock_class_event_time
+
     def __get_gnss_status(self, holdover_time, freq, sync_state,
                           last_event_time, gnss_monitor):
         new_event, sync_state, new_event_time = gnss_monitor.get_gnss_status(
@@ -515,16 +704,13 @@ class PtpWatcherDefault:
 
     '''announce location'''
 
-    def __publish_os_clock_status(self, forced=False):
-        holdover_time = float(self.osclocktracker_context['holdover_seconds'])
-        freq = float(self.osclocktracker_context['poll_freq_seconds'])
-        sync_state = self.osclocktracker_context.get('sync_state', 'Unknown')
-        last_event_time = self.osclocktracker_context.get('last_event_time',
-                                                          time.time())
+    def __publish_os_clock_status(self, samples, publications,
+                                  forced=False):
         lastStatus = {}
+        if ('os_clock',) not in samples:
+            return
 
-        new_event, sync_state, new_event_time = self.__get_os_clock_status(
-            holdover_time, freq, sync_state, last_event_time)
+        new_event, sync_state, new_event_time = samples[('os_clock',)]
         LOG.info("os_clock_status: state is %s, new_event is %s "
                  % (sync_state, new_event))
         if new_event or forced:
@@ -535,32 +721,12 @@ class PtpWatcherDefault:
 
             LOG.debug("Publish OS Clock Status")
             # publish new event in API version v2 format
-            resource_address = utils.format_resource_address(
-                self.node_name, constants.SOURCE_SYNC_OS_CLOCK)
-            lastStatus['os_clock_status'] = {
-                'id': uuidutils.generate_uuid(),
-                'specversion': constants.SPEC_VERSION,
-                'source': constants.SOURCE_SYNC_OS_CLOCK,
-                'type': source_type[constants.SOURCE_SYNC_OS_CLOCK],
-                'time': new_event_time,
-                'data': {
-                    'version': constants.DATA_VERSION,
-                    'values': [
-                        {
-                            'data_type': constants.DATA_TYPE_NOTIFICATION,
-                            'ResourceAddress': resource_address,
-                            'value_type': constants.VALUE_TYPE_ENUMERATION,
-                            'value': sync_state.upper()
-                        }
-                    ]
-                }
-            }
-            self.ptpeventproducer.publish_status(
-                lastStatus, constants.SOURCE_SYNC_OS_CLOCK)
-            self.ptpeventproducer.publish_status(
-                lastStatus, constants.SOURCE_SYNC_ALL)
+            lastStatus['os_clock_status'] = self.event_encoder.encode(
+                constants.SOURCE_SYNC_OS_CLOCK, sync_state, new_event_time)
+            publications.append((lastStatus, constants.SOURCE_SYNC_OS_CLOCK))
+            publications.append((lastStatus, constants.SOURCE_SYNC_ALL))
 
-    def __publish_overall_sync_status(self, forced=False):
+    def __publish_overall_sync_status(self, publications, forced=False):
         lastStatus = {}
         holdover_time = float(self.overalltracker_context['holdover_seconds'])
         freq = float(self.overalltracker_context['poll_freq_seconds'])
@@ -581,48 +747,20 @@ class PtpWatcherDefault:
             self.overalltracker_context_lock.release()
 
             LOG.debug("Publish overall sync status.")
-            resource_address = utils.format_resource_address(
-                self.node_name, constants.SOURCE_SYNC_SYNC_STATE)
-            lastStatus['overall_sync_status'] = {
-                'id': uuidutils.generate_uuid(),
-                'specversion': constants.SPEC_VERSION,
-                'source': constants.SOURCE_SYNC_SYNC_STATE,
-                'type': source_type[constants.SOURCE_SYNC_SYNC_STATE],
-                'time': new_event_time,
-                'data': {
-                    'version': constants.DATA_VERSION,
-                    'values': [
-                        {
-                            'data_type': constants.DATA_TYPE_NOTIFICATION,
-                            'ResourceAddress': resource_address,
-                            'value_type': constants.VALUE_TYPE_ENUMERATION,
-                            'value': sync_state.upper()
-                        }
-                    ]
-                }
-            }
-            self.ptpeventproducer.publish_status(
-                lastStatus, constants.SOURCE_SYNC_SYNC_STATE)
-            self.ptpeventproducer.publish_status(
-                lastStatus, constants.SOURCE_SYNC_ALL)
+            lastStatus['overall_sync_status'] = self.event_encoder.encode(
+                constants.SOURCE_SYNC_SYNC_STATE, sync_state, new_event_time)
+            publications.append((lastStatus, constants.SOURCE_SYNC_SYNC_STATE))
+            publications.append((lastStatus, constants.SOURCE_SYNC_ALL))
 
-    def __publish_gnss_status(self, forced=False):
+    def __publish_gnss_status(self, samples, publications,
+                              forced=False):
         lastStatus = {}
         for gnss in self.observer_list:
-            holdover_time = float(
-                self.gnsstracker_context[
-                    gnss.ts2phc_service_name]['holdover_seconds'])
-            freq = float(self.gnsstracker_context[
-                gnss.ts2phc_service_name]['poll_freq_seconds'])
-            sync_state = \
-                self.gnsstracker_context[gnss.ts2phc_service_name].get(
-                    'sync_state', 'Unknown')
-            last_event_time = \
-                self.gnsstracker_context[gnss.ts2phc_service_name].get(
-                    'last_event_time', time.time())
-
-            new_event, sync_state, new_event_time = self.__get_gnss_status(
-                holdover_time, freq, sync_state, last_event_time, gnss)
+            sample = samples.get(('gnss', gnss.ts2phc_service_name))
+            if sample is None:
+                continue
+
+            new_event, sync_state, new_event_time = sample
             LOG.info("%s gnss_status: state is %s, new_event is %s"
                      % (gnss.ts2phc_service_name, sync_state, new_event))
 
@@ -638,54 +776,38 @@ class PtpWatcherDefault:
                 LOG.debug("Publish GNSS status.")
 
                 # publish new event in API version v2 format
-                resource_address = utils.format_resource_address(
-                    self.node_name, constants.SOURCE_SYNC_GNSS_SYNC_STATUS)
-                lastStatus[gnss.ts2phc_service_name] = {
-                    'id': uuidutils.generate_uuid(),
-                    'specversion': constants.SPEC_VERSION,
-                    'source': constants.SOURCE_SYNC_GNSS_SYNC_STATUS,
-                    'type': source_type[
-                        constants.SOURCE_SYNC_GNSS_SYNC_STATUS],
-                    'time': new_event_time,
-                    'data': {
-                        'version': constants.DATA_VERSION,
-                        'values': [
-                            {
-                                'data_type': constants.DATA_TYPE_NOTIFICATION,
-                                'ResourceAddress': resource_address,
-                                'value_type': constants.VALUE_TYPE_ENUMERATION,
-                                'value': sync_state.upper()
-                            }
-                        ]
-                    }
-                }
-                self.ptpeventproducer.publish_status(
-                    lastStatus, constants.SOURCE_SYNC_GNSS_SYNC_STATUS)
-                self.ptpeventproducer.publish_status(
-                    lastStatus, constants.SOURCE_SYNC_ALL)
-
-    def __publish_ptpstatus(self, forced=False):
+                lastStatus[gnss.ts2phc_service_name] = \
+                    self.event_encoder.encode(
+                        constants.SOURCE_SYNC_GNSS_SYNC_STATUS, sync_state,
+                        new_event_time, gnss.ts2phc_service_name)
+                # The status accumulates the instances updated so far
+                status = dict(lastStatus)
+                publications.append(
+                    (status, constants.SOURCE_SYNC_GNSS_SYNC_STATUS))
+                publications.append((status, constants.SOURCE_SYNC_ALL))
+
+    def __publish_ptpstatus(self, samples, publications,
+                            forced=False):
         lastStatus = {}
         lastClockClassStatus = {}
         for ptp_monitor in self.ptp_monitor_list:
-            holdover_time = float(self.ptptracker_context[
-                ptp_monitor.ptp4l_service_name]['holdover_seconds'])
-            freq = float(self.ptptracker_context[
-                ptp_monitor.ptp4l_service_name]['poll_freq_seconds'])
-            sync_state = \
-                self.ptptracker_context[ptp_monitor.ptp4l_service_name].get(
-                    'sync_state', 'Unknown')
-            last_event_time = \
-                self.ptptracker_context[ptp_monitor.ptp4l_service_name].get(
-                    'last_event_time', time.time())
-
-            new_event, sync_state, new_event_time = self.__get_ptp_status(
-                holdover_time, freq, sync_state, last_event_time, ptp_monitor)
+            sample = samples.get(('ptp', ptp_monitor.ptp4l_service_name))
+            if sample is None:
+                continue
+
+            new_event, sync_state, new_event_time, \
+                new_clock_class_event, clock_class, clock_class_event_time = \
+                sample
+            dampers = self.ptp_event_dampers.get(
+                ptp_monitor.ptp4l_service_name)
+            if dampers:
+                new_event, sync_state, new_event_time = \
+                    dampers[0].update(sync_state, new_event_time)
+                new_clock_class_event, clock_class, clock_class_event_time = \
+                    dampers[1].update(clock_class, clock_class_event_time)
             LOG.info("%s PTP sync state: state is %s, new_event is %s" % (
                 ptp_monitor.ptp4l_service_name, sync_state, new_event))
 
-            new_clock_class_event, clock_class, clock_class_event_time = \
-                ptp_monitor.get_ptp_clock_class()
             LOG.info("%s PTP clock class: clockClass is %s, new_event is %s"
                      % (ptp_monitor.ptp4l_service_name, clock_class,
                         new_clock_class_event))
@@ -709,34 +831,17 @@ class PtpWatcherDefault:
                     },
                     'EventTimestamp': new_event_time
                 }
-                self.ptpeventproducer.publish_status(lastStatus, 'PTP')
+                publications.append((lastStatus, 'PTP'))
                 lastStatus = {}
                 # publish new event in API version v2 format
-                resource_address = utils.format_resource_address(
-                    self.node_name, constants.SOURCE_SYNC_PTP_LOCK_STATE)
-                lastStatus[ptp_monitor.ptp4l_service_name] = {
-                    'id': uuidutils.generate_uuid(),
-                    'specversion': constants.SPEC_VERSION,
-                    'source': constants.SOURCE_SYNC_PTP_LOCK_STATE,
-                    'type': source_type[constants.SOURCE_SYNC_PTP_LOCK_STATE],
-                    'time': new_event_time,
-                    'data': {
-                        'version': constants.DATA_VERSION,
-                        'values': [
-                            {
-                                'data_type': constants.DATA_TYPE_NOTIFICATION,
-                                'ResourceAddress': resource_address,
-                                'value_type': constants.VALUE_TYPE_ENUMERATION,
-                                'value': sync_state.upper()
-                            }
-                        ]
-                    }
-                }
+                lastStatus[ptp_monitor.ptp4l_service_name] = \
+                    self.event_encoder.encode(
+                        constants.SOURCE_SYNC_PTP_LOCK_STATE, sync_state,
+                        new_event_time, ptp_monitor.ptp4l_service_name)
                 self.ptptracker_context_lock.release()
-                self.ptpeventproducer.publish_status(
-                    lastStatus, constants.SOURCE_SYNC_PTP_LOCK_STATE)
-                self.ptpeventproducer.publish_status(
-                    lastStatus, constants.SOURCE_SYNC_ALL)
+                publications.append(
+                    (lastStatus, constants.SOURCE_SYNC_PTP_LOCK_STATE))
+                publications.append((lastStatus, constants.SOURCE_SYNC_ALL))
 
             if new_clock_class_event or forced:
                 # update context
@@ -747,35 +852,20 @@ class PtpWatcherDefault:
                     'last_clock_class_event_time'] \
                     = clock_class_event_time
 
-                resource_address = utils.format_resource_address(
-                    self.node_name, constants.SOURCE_SYNC_PTP_CLOCK_CLASS)
-
-                lastClockClassStatus[ptp_monitor.ptp4l_service_name] = {
-                    'id': uuidutils.generate_uuid(),
-                    'specversion': constants.SPEC_VERSION,
-                    'source': constants.SOURCE_SYNC_PTP_CLOCK_CLASS,
-                    'type': source_type[constants.SOURCE_SYNC_PTP_CLOCK_CLASS],
-                    'time': clock_class_event_time,
-                    'data': {
-                        'version': constants.DATA_VERSION,
-                        'values': [
-                            {
-                                'data_type': constants.DATA_TYPE_NOTIFICATION,
-                                'ResourceAddress': resource_address,
-                                'value_type': constants.VALUE_TYPE_METRIC,
-                                'value': clock_class
-                            }
-                        ]
-                    }
-                }
+                lastClockClassStatus[ptp_monitor.ptp4l_service_name] = \
+                    self.event_encoder.encode(
+                        constants.SOURCE_SYNC_PTP_CLOCK_CLASS, clock_class,
+                        clock_class_event_time,
+                        ptp_monitor.ptp4l_service_name,
+                        value_type=constants.VALUE_TYPE_METRIC)
                 self.ptptracker_context_lock.release()
                 LOG.info("Publishing clockClass for %s: %s"
                          % (ptp_monitor.ptp4l_service_name, clock_class))
-                self.ptpeventproducer.publish_status(
-                    lastClockClassStatus,
-                    constants.SOURCE_SYNC_PTP_CLOCK_CLASS)
-                self.ptpeventproducer.publish_status(lastClockClassStatus,
-                                                     constants.SOURCE_SYNC_ALL)
+                # The status accumulates the instances updated so far
+                status = dict(lastClockClassStatus)
+                publications.append(
+                    (status, constants.SOURCE_SYNC_PTP_CLOCK_CLASS))
+                publications.append((status, constants.SOURCE_SYNC_ALL))
 
 
 class DaemonControl(object):
@@ -4,8 +4,11 @@
 # SPDX-License-Identifier: Apache-2.0
 #
 
+import json
+import tempfile
 import unittest
 import mock
+from trackingfunctionsdk.common.helpers import cgu_handler
 from trackingfunctionsdk.common.helpers.cgu_handler import CguHandler
 import os
 
@@ -16,6 +19,18 @@ class CguHandlerTests(unittest.TestCase):
     missingCguHandler = CguHandler("./no_such_file.conf")
     invalidCguHandler = CguHandler(testpath + "test_input_files/ts2phc_invalid.conf")
 
+    def setUp(self):
+        # Keep the PCI address lookups away from the host sysfs and cache
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.cache_file = os.path.join(self.tmpdir.name, "gnss-pci-addr.json")
+        self.sysfs_path = os.path.join(self.tmpdir.name, "sys/")
+        for name, value in (("GNSS_PCI_ADDR_CACHE", self.cache_file),
+                            ("HOST_SYSFS_PATH", self.sysfs_path)):
+            patcher = mock.patch.object(cgu_handler.constants, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
     def test_get_gnss_nmea_serialport(self):
         # Test success path
         self.testCguHandler.get_gnss_nmea_serialport_from_ts2phc_config()
@@ -43,6 +58,49 @@ class CguHandlerTests(unittest.TestCase):
             testpath + "test_input_files/mock_kern.log")
         self.assertEqual(self.testCguHandler.pci_addr, None)
 
+    def test_convert_nmea_serialport_to_pci_addr_sysfs(self):
+        tty_dir = os.path.join(self.sysfs_path, "class", "tty", "ttyGNSS_1a00_0")
+        os.makedirs(tty_dir)
+        os.symlink("../../../0000:1a:00.0", os.path.join(tty_dir, "device"))
+        handler = CguHandler(None, "/dev/ttyGNSS_1a00_0")
+        handler.convert_nmea_serialport_to_pci_addr("./no_such_file.log")
+        self.assertEqual(handler.pci_addr, "0000:1a:00.0")
+        self.assertFalse(os.path.exists(self.cache_file))
+
+    def test_convert_nmea_serialport_to_pci_addr_cached(self):
+        handler = CguHandler(None, "/dev/ttyGNSS_1800_0")
+        handler.convert_nmea_serialport_to_pci_addr(
+            testpath + "test_input_files/mock_kern.log")
+        with open(self.cache_file) as infile:
+            self.assertEqual(json.load(infile),
+                             {"/dev/ttyGNSS_1800_0": "0000:18:00.0"})
+
+        # The log is not read again
+        handler.pci_addr = None
+        handler.convert_nmea_serialport_to_pci_addr("./no_such_file.log")
+        self.assertEqual(handler.pci_addr, "0000:18:00.0")
+
+    def test_scan_kernel_log(self):
+        log_file = os.path.join(self.tmpdir.name, "kern.log")
+        with open(testpath + "test_input_files/mock_kern.log") as infile:
+            content = infile.read()
+        # Re-registered at another address after the mock log entries
+        content += ("\n2022-06-04T08:00:00.000 controller-0 kernel: info [    4.1] "
+                    "ice 0000:51:00.0: ttyGNSS_1800_0 registered\n")
+        content += "2022-06-04T08:00:00.000 controller-0 kernel: info filler\n" * 50
+        with open(log_file, "w") as outfile:
+            outfile.write(content)
+        for block_size in (64, 1024 * 1024):
+            self.assertEqual(cgu_handler.scan_kernel_log(
+                log_file, "ttyGNSS_1800_0", block_size), "0000:51:00.0")
+            self.assertEqual(cgu_handler.scan_kernel_log(
+                log_file, "ttyGNSS_1a00_0", block_size), "0000:1a:00.0")
+            self.assertIsNone(cgu_handler.scan_kernel_log(
+                log_file, "ttyGNSS_not_present", block_size))
+
+        open(log_file, "w").close()
+        self.assertIsNone(cgu_handler.scan_kernel_log(log_file, "ttyGNSS_1800_0"))
+
     @mock.patch('trackingfunctionsdk.common.helpers.cgu_handler.os.path')
     def test_get_cgu_path_from_pci_addr(self, mock_path):
         # Setup mock
@@ -105,3 +163,20 @@ class CguHandlerTests(unittest.TestCase):
         self.testCguHandler.read_cgu()
         self.testCguHandler.cgu_output_to_dict()
         self.assertDictEqual(self.testCguHandler.cgu_output_parsed, reference_dict)
+
+    def test_cgu_output_unchanged(self):
+        self.testCguHandler.cgu_path = testpath + "test_input_files/mock_cgu_output_logan_beach"
+        self.testCguHandler.read_cgu()
+        self.testCguHandler.cgu_output_to_dict()
+        cgu_status = self.testCguHandler.cgu_status
+        self.assertEqual(cgu_status.pps_dpll.phase_offset, "-86")
+        self.assertEqual(len(cgu_status.inputs), 9)
+        self.assertEqual(cgu_status.inputs[-1].name, "GNSS-1PPS")
+
+        # Same content is not parsed again
+        self.testCguHandler.read_cgu()
+        with mock.patch('trackingfunctionsdk.common.helpers.cgu_handler.parse_cgu_output') \
+                as parse_patched:
+            self.testCguHandler.cgu_output_to_dict()
+            parse_patched.assert_not_called()
+        self.assertIs(self.testCguHandler.cgu_status, cgu_status)
@@ -0,0 +1,60 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import unittest
+
+from trackingfunctionsdk.common.helpers.event_damper import DamperSettings
+from trackingfunctionsdk.common.helpers.event_damper import EventDamper
+from trackingfunctionsdk.model.dto.ptpstate import PtpState
+
+
+class EventDamperTests(unittest.TestCase):
+
+    def setUp(self):
+        self.clock_class = EventDamper(DamperSettings(4, 10, 20), ['248'],
+                                       ['6', '7'])
+
+    def test_first_value(self):
+        self.assertEqual(self.clock_class.update('6', 100.0, now=0),
+                         (True, '6', 100.0))
+        self.assertEqual(self.clock_class.update('6', 100.0, now=2),
+                         (False, '6', 100.0))
+
+    def test_switchover_burst(self):
+        self.clock_class.update('6', 100.0, now=0)
+        published = []
+        # 6 -> 7 -> 6 -> 248 -> 6 -> 7 -> 6 over 12 seconds, polled every 2s
+        for now, value in [(30, '7'), (32, '6'), (34, '248'), (36, '6'),
+                           (38, '7'), (40, '6'), (42, '6'), (44, '6'),
+                           (46, '6'), (48, '6'), (50, '6'), (52, '6'),
+                           (54, '6'), (56, '6')]:
+            new_event, value, event_time = \
+                self.clock_class.update(value, 1000.0 + now, now=now)
+            if new_event:
+                published.append((now, value, event_time))
+        # Freerun right away, back to locked once stable for the locked
+        # dwell time and out of the suppression window
+        self.assertEqual(published, [(34, '248', 1034.0),
+                                     (54, '6', 1040.0)])
+        self.assertEqual(self.clock_class.suppressed, 3)
+
+    def test_dwell(self):
+        self.clock_class.update('6', 100.0, now=0)
+        self.assertEqual(self.clock_class.update('7', 130.0, now=30),
+                         (False, '6', 100.0))
+        self.assertEqual(self.clock_class.update('7', 130.0, now=33),
+                         (False, '6', 100.0))
+        self.assertEqual(self.clock_class.update('7', 130.0, now=34),
+                         (True, '7', 130.0))
+
+    def test_lock_state(self):
+        damper = EventDamper(DamperSettings(0, 6, 0), [PtpState.Freerun],
+                             [PtpState.Locked])
+        damper.update(PtpState.Locked, 100.0, now=0)
+        self.assertTrue(damper.update(PtpState.Holdover, 110.0, now=10)[0])
+        self.assertTrue(damper.update(PtpState.Freerun, 120.0, now=12)[0])
+        self.assertFalse(damper.update(PtpState.Locked, 130.0, now=14)[0])
+        self.assertEqual(damper.update(PtpState.Locked, 130.0, now=20),
+                         (True, PtpState.Locked, 130.0))
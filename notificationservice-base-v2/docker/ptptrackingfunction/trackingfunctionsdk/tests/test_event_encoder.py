@@ -0,0 +1,70 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import unittest
+
+import mock
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers.event_encoder import EventEncoder
+
+
+class EventEncoderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.encoder = EventEncoder('controller-0')
+
+    def test_encode(self):
+        event = self.encoder.encode(constants.SOURCE_SYNC_PTP_LOCK_STATE,
+                                    'Locked', 1000.0, 'ptp4l-legacy')
+        self.assertEqual(event['source'],
+                         constants.SOURCE_SYNC_PTP_LOCK_STATE)
+        self.assertEqual(event['type'],
+                         'event.sync.ptp-status.ptp-state-change')
+        self.assertEqual(event['time'], 1000.0)
+        self.assertEqual(event['data']['values'], [{
+            'data_type': constants.DATA_TYPE_NOTIFICATION,
+            'ResourceAddress':
+                '/./controller-0/sync/ptp-status/lock-state',
+            'value_type': constants.VALUE_TYPE_ENUMERATION,
+            'value': 'LOCKED'}])
+
+        event = self.encoder.encode(
+            constants.SOURCE_SYNC_PTP_CLOCK_CLASS, 6, 1000.0,
+            'ptp4l-legacy', constants.DATA_TYPE_METRIC,
+            constants.VALUE_TYPE_METRIC, node_name='compute-1')
+        self.assertEqual(event['data']['values'][0]['value'], 6)
+        self.assertEqual(event['data']['values'][0]['ResourceAddress'],
+                         '/./compute-1/sync/ptp-status/clock-class')
+
+    def test_event_reused(self):
+        event = self.encoder.encode(constants.SOURCE_SYNC_OS_CLOCK,
+                                    'Locked', 1000.0)
+        with mock.patch('trackingfunctionsdk.common.helpers.event_encoder.'
+                        'uuidutils.generate_uuid') as generate_patched:
+            self.assertIs(self.encoder.encode(constants.SOURCE_SYNC_OS_CLOCK,
+                                              'Locked', 1000.0), event)
+            generate_patched.assert_not_called()
+
+        # A new state or time is a new event
+        self.assertIsNot(self.encoder.encode(constants.SOURCE_SYNC_OS_CLOCK,
+                                             'Locked', 1002.0), event)
+        changed = self.encoder.encode(constants.SOURCE_SYNC_OS_CLOCK,
+                                      'Freerun', 1002.0)
+        self.assertNotEqual(changed['id'], event['id'])
+        self.assertEqual(changed['data']['values'][0]['value'], 'FREERUN')
+
+    def test_instances(self):
+        first = self.encoder.encode(constants.SOURCE_SYNC_GNSS_SYNC_STATUS,
+                                    'Locked', 1000.0, 'ts2phc1')
+        second = self.encoder.encode(constants.SOURCE_SYNC_GNSS_SYNC_STATUS,
+                                     'Locked', 1000.0, 'ts2phc2')
+        self.assertNotEqual(first['id'], second['id'])
+        self.assertIs(self.encoder.template(
+            constants.SOURCE_SYNC_GNSS_SYNC_STATUS),
+            self.encoder.template(constants.SOURCE_SYNC_GNSS_SYNC_STATUS))
+        self.assertIs(self.encoder.encode(
+            constants.SOURCE_SYNC_GNSS_SYNC_STATUS, 'Locked', 1000.0,
+            'ts2phc1'), first)
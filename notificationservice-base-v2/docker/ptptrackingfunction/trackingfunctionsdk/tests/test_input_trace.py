@@ -0,0 +1,148 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import datetime
+import os
+import shutil
+import tempfile
+import time
+import types
+import unittest
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import input_trace
+from trackingfunctionsdk.common.helpers.trace_replay import TraceReplay
+
+
+def failing_reader():
+    raise FileNotFoundError("/var/run/phc2sys-phc2sys1.pid")
+
+
+class InputTraceTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(input_trace.stop_recording)
+
+    def test_record(self):
+        path = os.path.join(self.directory, 'trace.jsonl.gz')
+        input_trace.start_recording(path)
+        self.assertTrue(input_trace.recording())
+        for value in [True, True, False]:
+            input_trace.read('exists', '/usr/sbin/pmc', lambda: value)
+        input_trace.tick({('ptp', 'ptp1'): None, ('os_clock',): None})
+        with self.assertRaises(FileNotFoundError):
+            input_trace.read('phc2sys_cmdline', 'phc2sys1', failing_reader)
+        input_trace.stop_recording()
+        # Not recorded once stopped
+        self.assertEqual(input_trace.read('cgu', 'ts2phc1', str.upper,
+                                          'cgu'), 'CGU')
+
+        trace = input_trace.load_trace(path)
+        self.assertEqual(trace.header['trace'], input_trace.TRACE_VERSION)
+        # The unchanged presence is recorded once
+        self.assertEqual([record[1:] for record in trace.records], [
+            ['exists', '/usr/sbin/pmc', True],
+            ['exists', '/usr/sbin/pmc', False],
+            ['tick', '', [['ptp', 'ptp1'], ['os_clock']]],
+            ['phc2sys_cmdline', 'phc2sys1', None,
+             ['FileNotFoundError', '/var/run/phc2sys-phc2sys1.pid']]])
+
+    def test_truncated_trace(self):
+        path = os.path.join(self.directory, 'trace.jsonl')
+        with open(path, 'w') as trace_file:
+            trace_file.write('{"trace":1,"time":0,"monotonic":0}\n'
+                             '[0.5,"exists","/usr/sbin/pmc",true]\n'
+                             '[0.7,"exists","/usr/sb')
+        self.assertEqual(len(input_trace.load_trace(path).records), 1)
+
+    def test_player(self):
+        player = input_trace.TracePlayer(input_trace.Trace(
+            {'trace': 1, 'time': 0, 'monotonic': 0},
+            [[0.5, 'exists', '/usr/sbin/pmc', True],
+             [1.0, 'tick', '', [['ptp', 'ptp1']]],
+             [1.2, 'exists', '/usr/sbin/pmc', False],
+             [1.3, 'phc_offset', 'ptp0', None, ['OSError', 'busy']],
+             [3.0, 'tick', '', [['ptp', 'ptp1']]]]))
+        self.assertEqual(player.ticks, [(1.0, [('ptp', 'ptp1')]),
+                                        (3.0, [('ptp', 'ptp1')])])
+        player.horizon = 1.0
+        self.assertTrue(player.read('exists', '/usr/sbin/pmc'))
+        with self.assertRaises(input_trace.InputTraceError):
+            player.read('phc_offset', 'ptp0')
+        # The inputs read during the tick of 1.0
+        player.horizon = 3.0
+        self.assertFalse(player.read('exists', '/usr/sbin/pmc'))
+        with self.assertRaises(OSError):
+            player.read('phc_offset', 'ptp0')
+        with input_trace.replaying(player):
+            self.assertFalse(input_trace.read('exists', '/usr/sbin/pmc',
+                                              failing_reader))
+        # Replayed errors included
+        self.assertEqual(player.reads, 4)
+
+    def test_virtual_time(self):
+        module = types.ModuleType('monitor')
+        module.datetime = datetime
+        module.time = time
+        clock = input_trace.VirtualClock(1000.0, 50.0)
+        clock.advance_to(2.5)
+        with input_trace.virtual_time(clock, [module]):
+            self.assertEqual(module.time.monotonic(), 52.5)
+            self.assertAlmostEqual(
+                module.datetime.datetime.utcnow().timestamp(), 1002.5)
+        self.assertIs(module.time, time)
+
+
+class TraceReplayTests(unittest.TestCase):
+
+    ptp_config = constants.PTP_CONFIG_PATH + 'ptp4l-ptp1.conf'
+    locked = {constants.PORT.format(1): 'SLAVE',
+              constants.GM_PRESENT: 'true',
+              constants.MASTER_OFFSET: '-5',
+              constants.GM_CLOCK_CLASS: '6',
+              constants.GRANDMASTER_IDENTITY: '507c6f.fffe.0b5a4d',
+              constants.TIME_TRACEABLE: '1',
+              constants.CLOCK_IDENTITY: '507c6f.fffe.21c4c0',
+              constants.CLOCK_CLASS: '6'}
+
+    def trace(self):
+        records = [
+            [0.0, 'setup', 'ptp4l', [{'name': 'ptp1',
+                                      'phc2sys_service_name': 'phc2sys1',
+                                      'holdover_seconds': 30,
+                                      'poll_freq_seconds': 2}]]]
+        for path in [constants.PMC_PATH, self.ptp_config,
+                     constants.PIDFILE_PATH + 'ptp4l-ptp1.pid',
+                     constants.PIDFILE_PATH + 'phc2sys-phc2sys1.pid']:
+            records.append([0.0, 'exists', path, True])
+        records.append([0.01, 'pmc', 'ptp1', [self.locked, 8, 1]])
+        for elapsed in range(1, 61, 2):
+            records.append([float(elapsed), 'tick', '', [['ptp', 'ptp1']]])
+            if elapsed == 9:
+                # ptp4l lost its master, the results read by the tick are
+                # incomplete
+                records.append([9.01, 'pmc', 'ptp1', [{}, 8, 1]])
+        records.sort(key=lambda record: record[0])
+        return input_trace.Trace({'trace': 1, 'time': 1700000000.0,
+                                  'monotonic': 5000.0}, records)
+
+    def test_holdover_timing(self):
+        result = TraceReplay(self.trace()).run()
+        self.assertEqual(result.polls, 30)
+        self.assertEqual(result.failed_polls, 0)
+        self.assertEqual(result.virtual_seconds, 58.0)
+        self.assertEqual(
+            [(change.time, change.resource, change.state)
+             for change in result.transitions],
+            [(1.0, 'ptp', 'Locked'),
+             (9.0, 'ptp', 'Holdover'),
+             # Read three more times before reporting Freerun
+             (15.0, 'clock_class', '248'),
+             # Holdover for 30s minus twice the poll period
+             (35.0, 'ptp', 'Freerun')])
+        self.assertEqual(TraceReplay(self.trace()).run().transitions,
+                         result.transitions)
@@ -0,0 +1,118 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import mock
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers.gnss_monitor import GnssMonitor
+from trackingfunctionsdk.common.helpers.kernel_log_subject import \
+    KernelLogSubject
+
+testpath = os.environ.get("TESTPATH", "")
+
+DPLL_EVENT = "2022-06-03T19:36:08.021 controller-0 kernel: warning " \
+             "[   11.134103] ice 0000:18:00.0: <DPLL0> state changed to: " \
+             "holdover, pin GNSS-1PPS\n"
+
+
+class FakeObserver:
+    def __init__(self, pci_addr):
+        self.dmesg_values_to_check = {'pin': 'GNSS-1PPS',
+                                      'pci_addr': pci_addr}
+        self.kernel_events_active = False
+        self.lines = []
+        self.updated = threading.Event()
+
+    def update(self, subject, matched_line):
+        self.lines.append(matched_line)
+        self.updated.set()
+
+
+class KernelLogSubjectTests(unittest.TestCase):
+
+    def setUp(self):
+        self.wakeup = threading.Event()
+        self.observer = FakeObserver('0000:18:00.0')
+        self.other_observer = FakeObserver('0000:1a:00.0')
+
+    def start_subject(self, sources):
+        subject = KernelLogSubject(sources, self.wakeup.set, retry=0.1)
+        subject.attach(self.observer)
+        subject.attach(self.other_observer)
+        subject.start()
+        self.addCleanup(subject.join)
+        self.addCleanup(subject.stop)
+        deadline = time.monotonic() + 2
+        while not self.observer.kernel_events_active:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        return subject
+
+    def test_match(self):
+        subject = KernelLogSubject(())
+        subject.attach(self.observer)
+        subject.attach(self.other_observer)
+        self.assertEqual(subject.match(DPLL_EVENT), [self.observer])
+        self.assertEqual(subject.match(
+            DPLL_EVENT.replace('GNSS-1PPS', 'SMA1')), [])
+        # Lines without a pin apply to every pin of the NIC
+        self.assertEqual(subject.match(
+            DPLL_EVENT.replace(', pin GNSS-1PPS', '')), [self.observer])
+        with open(testpath + "test_input_files/mock_kern.log") as f:
+            matches = [subject.match(line) for line in f]
+        self.assertEqual(sum(len(observers) for observers in matches), 4)
+
+    def test_follow_file_rotation(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        kern_log = os.path.join(tmpdir.name, 'kern.log')
+        with open(kern_log, 'w') as f:
+            f.write(DPLL_EVENT)
+        self.start_subject((os.path.join(tmpdir.name, 'no_kmsg'),
+                            kern_log))
+
+        # Lines logged before the subject started are skipped
+        with open(kern_log, 'a') as f:
+            f.write(DPLL_EVENT.replace('holdover', 'freerun'))
+        self.assertTrue(self.observer.updated.wait(2))
+        self.assertTrue(self.wakeup.wait(2))
+        self.assertEqual(len(self.observer.lines), 1)
+        self.assertIn('freerun', self.observer.lines[0])
+
+        self.observer.updated.clear()
+        os.rename(kern_log, kern_log + '.1')
+        with open(kern_log, 'w') as f:
+            f.write(DPLL_EVENT.replace('holdover', 'locked_ho_acq'))
+        self.assertTrue(self.observer.updated.wait(2))
+        self.assertIn('locked_ho_acq', self.observer.lines[-1])
+        self.assertEqual(self.other_observer.lines, [])
+
+
+class GnssMonitorKernelEventTests(unittest.TestCase):
+
+    @mock.patch('trackingfunctionsdk.common.helpers.gnss_monitor.'
+                'resource_watcher.exists', return_value=True)
+    def test_cgu_read_on_event(self, exists_patched):
+        gnss_monitor = GnssMonitor(
+            constants.TS2PHC_CONFIG_PATH + "ts2phc-ts1.conf",
+            "/dev/ttyGNSS_1800_0", "0000:18:00.0",
+            testpath + "test_input_files/mock_cgu_output_logan_beach")
+        gnss_monitor.kernel_events_active = True
+        gnss_monitor.cgu_verify_seconds = 60
+        gnss_monitor._last_cgu_read = time.monotonic()
+        with mock.patch.object(gnss_monitor.gnss_cgu_handler,
+                               'read_cgu') as read_patched:
+            gnss_monitor.set_gnss_status()
+            read_patched.assert_not_called()
+            gnss_monitor.update(None, DPLL_EVENT)
+            read_patched.assert_called_once()
+            gnss_monitor.set_gnss_status()
+            read_patched.assert_called_once()
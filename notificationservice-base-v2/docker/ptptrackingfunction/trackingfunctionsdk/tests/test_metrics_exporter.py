@@ -0,0 +1,144 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import time
+import unittest
+
+import mock
+
+from trackingfunctionsdk.common.helpers import cgu_handler
+from trackingfunctionsdk.common.helpers import metrics_exporter
+from trackingfunctionsdk.common.helpers.event_damper import DamperSettings
+from trackingfunctionsdk.common.helpers.event_damper import EventDamper
+from trackingfunctionsdk.common.helpers.histogram import Histogram
+from trackingfunctionsdk.common.helpers.offset_history import OffsetHistory
+from trackingfunctionsdk.common.helpers.publish_queue import \
+    PublishQueueMetrics
+from trackingfunctionsdk.common.helpers.stage_timer import StageTimer
+
+
+@unittest.skipIf(metrics_exporter.prometheus_client is None,
+                 "prometheus_client is not installed")
+class PtpMetricsCollectorTests(unittest.TestCase):
+
+    def setUp(self):
+        ptp_monitor = mock.Mock(
+            ptp4l_service_name='ptp1', subscription_active=False,
+            master_offset=None, offset_history=OffsetHistory(16),
+            pmc_query_results={'master_offset': '-12', 'clockClass': '6',
+                               'gm.ClockClass': '6', 'port1': 'SLAVE',
+                               'port2': 'MASTER'})
+        ptp_monitor.get_ptp_sync_state.return_value = \
+            (False, 'Locked', 1000.0)
+        os_clock_monitor = mock.Mock(phc2sys_instance='phc2sys-legacy',
+                                     offset=37000000002, offset_min=None,
+                                     offset_max=None, offset_history=None)
+        os_clock_monitor.get_os_clock_state.return_value = 'Locked'
+        gnss = mock.Mock(ts2phc_service_name='ts2phc1', _state='SYNCHRONIZED')
+        gnss.gnss_cgu_handler.cgu_status = cgu_handler.CguStatus(
+            [], cgu_handler.CguDpll('GNSS-1PPS', 'locked_ho_acq', None),
+            cgu_handler.CguDpll('GNSS-1PPS', 'locked_ho_acq', '-86'))
+        histogram = Histogram()
+        histogram.observe(0.002)
+        damper = EventDamper(DamperSettings(1, 1, 0))
+        damper.suppressed = 3
+        self.watcher = mock.Mock(
+            ptp_monitor_list=[ptp_monitor], observer_list=[gnss],
+            os_clock_monitor=os_clock_monitor,
+            ptp_event_dampers={'ptp1': (damper, damper)},
+            offset_statistics_windows=(60.0,), offset_statistics_taus=(1.0,))
+        self.watcher.monitor_scheduler = mock.Mock(
+            sample_durations={('ptp', 'ptp1'): histogram,
+                              ('os_clock',): Histogram()},
+            late_samples=1, failed_samples=0, overruns=2)
+        self.watcher.stage_timer = StageTimer()
+        self.watcher.stage_timer.observe(('pmc', 'ptp1'), 0.03)
+        self.watcher.publish_queue.metrics.return_value = \
+            PublishQueueMetrics(0, 10, 2, 0, 8, 0, 0.001, 0.01, 0.002)
+        self.registry = metrics_exporter.prometheus_client.CollectorRegistry(
+            auto_describe=False)
+        self.registry.register(
+            metrics_exporter.PtpMetricsCollector(self.watcher))
+
+    def sample(self, name, **labels):
+        return self.registry.get_sample_value(name, labels)
+
+    def test_ptp4l(self):
+        self.assertEqual(self.sample(
+            'ptp_tracking_ptp4l_master_offset_nanoseconds', instance='ptp1'),
+            -12)
+        self.assertEqual(self.sample('ptp_tracking_ptp4l_clock_class',
+                                     instance='ptp1'), 6)
+        self.assertEqual(self.sample('ptp_tracking_ptp4l_port_state',
+                                     instance='ptp1', port='2',
+                                     state='MASTER'), 1)
+        self.assertEqual(self.sample('ptp_tracking_ptp4l_sync_state',
+                                     instance='ptp1', state='Locked'), 1)
+        self.assertEqual(self.sample(
+            'ptp_tracking_ptp4l_events_suppressed_total', instance='ptp1',
+            resource='clock-class'), 3)
+
+        # The offset pushed by ptp4l when subscribed
+        ptp_monitor = self.watcher.ptp_monitor_list[0]
+        ptp_monitor.subscription_active = True
+        ptp_monitor.master_offset = 5
+        self.assertEqual(self.sample(
+            'ptp_tracking_ptp4l_master_offset_nanoseconds', instance='ptp1'),
+            5)
+
+    def test_os_clock_and_gnss(self):
+        self.assertEqual(self.sample(
+            'ptp_tracking_os_clock_offset_nanoseconds',
+            instance='phc2sys-legacy'), 37000000002)
+        self.assertIsNone(self.sample(
+            'ptp_tracking_os_clock_offset_min_nanoseconds',
+            instance='phc2sys-legacy'))
+        self.assertEqual(self.sample('ptp_tracking_gnss_dpll_status',
+                                     instance='ts2phc1', dpll='pps',
+                                     status='locked_ho_acq'), 1)
+        self.assertEqual(self.sample(
+            'ptp_tracking_gnss_pps_dpll_phase_offset', instance='ts2phc1'),
+            -86)
+
+    def test_polling_and_publishing(self):
+        self.assertEqual(self.sample(
+            'ptp_tracking_poll_duration_seconds_bucket', resource='ptp',
+            instance='ptp1', le='0.0025'), 1)
+        self.assertEqual(self.sample(
+            'ptp_tracking_poll_duration_seconds_count', resource='os_clock',
+            instance=''), 0)
+        self.assertEqual(self.sample(
+            'ptp_tracking_stage_duration_seconds_bucket', stage='pmc',
+            instance='ptp1', le='0.05'), 1)
+        self.assertEqual(self.sample('ptp_tracking_loop_overruns_total'), 2)
+        self.assertEqual(self.sample('ptp_tracking_publish_events_total',
+                                     outcome='coalesced'), 2)
+        self.assertEqual(self.sample('ptp_tracking_publish_latency_seconds',
+                                     statistic='max'), 0.01)
+
+    def test_offset_statistics(self):
+        history = self.watcher.ptp_monitor_list[0].offset_history
+        for second, offset in enumerate([-4, 4, -4, 4]):
+            history.append(offset, time.time() - 10 + second)
+        self.assertEqual(self.sample(
+            'ptp_tracking_offset_max_abs_nanoseconds', clock='ptp4l',
+            instance='ptp1', window='60'), 4)
+        self.assertEqual(self.sample(
+            'ptp_tracking_offset_mtie_nanoseconds', clock='ptp4l',
+            instance='ptp1', window='60', tau='1'), 8)
+        # No history for the system clock
+        self.assertIsNone(self.sample(
+            'ptp_tracking_offset_mean_nanoseconds', clock='os_clock',
+            instance='phc2sys-legacy', window='60'))
+
+    def test_failing_collection(self):
+        self.watcher.os_clock_monitor.get_os_clock_state.side_effect = \
+            Exception('not ready')
+        # The other metrics are still collected
+        self.assertIsNone(self.sample(
+            'ptp_tracking_os_clock_offset_nanoseconds',
+            instance='phc2sys-legacy'))
+        self.assertEqual(self.sample('ptp_tracking_ptp4l_clock_class',
+                                     instance='ptp1'), 6)
@@ -0,0 +1,77 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import threading
+import time
+import unittest
+
+import mock
+
+from trackingfunctionsdk.common.helpers import monitor_scheduler
+from trackingfunctionsdk.common.helpers.monitor_scheduler import \
+    MonitorScheduler
+
+
+class MonitorSchedulerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = MonitorScheduler(4, 0.2)
+        self.addCleanup(self.scheduler.shutdown)
+
+    def test_sample_concurrently(self):
+        barrier = threading.Barrier(3, timeout=1)
+        tasks = {name: barrier.wait for name in ['ptp1', 'ptp2', 'gnss1']}
+        results = self.scheduler.sample(tasks)
+        self.assertEqual(set(results), set(tasks))
+        self.assertEqual(self.scheduler.deferred, [])
+
+    def test_late_sample_is_deferred(self):
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            release.wait(1)
+            return 'slow'
+
+        tasks = {'ptp1': slow, 'ptp2': lambda: 'fast'}
+        results = self.scheduler.sample(tasks)
+        self.assertEqual(results, {'ptp2': 'fast'})
+        self.assertEqual(self.scheduler.deferred, ['ptp1'])
+
+        # Not resubmitted while running, result collected once done
+        release.set()
+        time.sleep(0.05)
+        results = self.scheduler.sample(tasks)
+        self.assertEqual(results, {'ptp1': 'slow', 'ptp2': 'fast'})
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.scheduler.late_samples, 1)
+
+    def test_failed_sample(self):
+        def fail():
+            raise OSError("pmc failed")
+
+        results = self.scheduler.sample({'ptp1': fail, 'ptp2': lambda: 2})
+        self.assertEqual(results, {'ptp2': 2})
+        self.assertEqual(self.scheduler.failed_samples, 1)
+
+    def test_check_overrun(self):
+        self.scheduler.check_overrun(time.monotonic(), 2)
+        self.assertEqual(self.scheduler.overruns, 0)
+        self.scheduler.check_overrun(time.monotonic() - 3, 2)
+        self.assertEqual(self.scheduler.overruns, 1)
+
+    def test_overrun_stages(self):
+        self.scheduler.deferred = [('ptp', 'ptp1')]
+        stages = {('pmc', 'ptp1'): 2.5, ('sample', ''): 2.6,
+                  ('state_machine', 'ptp'): 0.001}
+        with mock.patch.object(monitor_scheduler, 'LOG') as log:
+            self.scheduler.check_overrun(time.monotonic() - 3, 2, stages)
+        message = log.warning.call_args[0][0]
+        self.assertIn('overruns=1', message)
+        self.assertIn('deferred=ptp:ptp1', message)
+        # Slowest first
+        self.assertIn('stages=sample=2.600s,pmc:ptp1=2.500s,'
+                      'state_machine:ptp=0.001s', message)
@@ -0,0 +1,77 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import math
+import unittest
+
+import mock
+
+from trackingfunctionsdk.common.helpers import offset_history
+from trackingfunctionsdk.common.helpers.offset_history import OffsetHistory
+
+
+class OffsetHistoryTests(unittest.TestCase):
+
+    def fill(self, offsets, size=None):
+        history = OffsetHistory(size or len(offsets))
+        for second, offset in enumerate(offsets):
+            history.append(offset, 100.0 + second)
+        return history
+
+    def test_ring(self):
+        history = self.fill(range(10), size=4)
+        self.assertEqual(len(history), 4)
+        times, offsets = history.samples()
+        self.assertEqual(list(offsets), [6, 7, 8, 9])
+        self.assertEqual(list(times), [106, 107, 108, 109])
+        # Only the samples of the last 1.5s
+        _, offsets = history.samples(1.5, now=109.0)
+        self.assertEqual(list(offsets), [8, 9])
+
+    def test_statistics(self):
+        history = self.fill([-4, 4, -4, 4, 0])
+        statistics = history.statistics(taus=(1, 2, 10), now=104.0)
+        self.assertEqual(statistics.count, 5)
+        self.assertAlmostEqual(statistics.mean, 0)
+        self.assertAlmostEqual(statistics.stddev, math.sqrt(64 / 5.0))
+        self.assertEqual(statistics.max_abs, 4)
+        self.assertEqual(statistics.mtie, {1: 8, 2: 8, 10: None})
+        # Second differences -16, 16, -12 summed in windows of 1
+        self.assertAlmostEqual(statistics.tdev[1],
+                               math.sqrt((256 + 256 + 144) / 3.0 / 6))
+        self.assertIsNone(statistics.tdev[2])
+
+    def test_empty(self):
+        statistics = OffsetHistory(8).statistics(60, taus=(1,), now=0.0)
+        self.assertEqual(statistics.count, 0)
+        self.assertIsNone(statistics.mean)
+        self.assertEqual(statistics.mtie, {1: None})
+        self.assertEqual(
+            offset_history.statistics_to_dict(statistics)['tdev'],
+            {'1': None})
+
+    @unittest.skipIf(offset_history.numpy is None, "numpy is not installed")
+    def test_without_numpy(self):
+        offsets = [math.sin(i / 3.0) * 100 + i % 7 for i in range(200)]
+        history = self.fill(offsets, size=128)
+        taus = (1, 4, 10, 50)
+        vectorized = history.statistics(100, taus, now=299.0)
+        with mock.patch.object(offset_history, 'numpy', None):
+            python = history.statistics(100, taus, now=299.0)
+        self.assertEqual(vectorized.count, python.count)
+        for name in ['mean', 'stddev', 'max_abs']:
+            self.assertAlmostEqual(getattr(vectorized, name),
+                                   getattr(python, name))
+        for tau in taus:
+            self.assertAlmostEqual(vectorized.mtie[tau], python.mtie[tau])
+            if python.tdev[tau] is None:
+                self.assertIsNone(vectorized.tdev[tau])
+            else:
+                self.assertAlmostEqual(vectorized.tdev[tau],
+                                       python.tdev[tau])
+
+    def test_parse_seconds_list(self):
+        self.assertEqual(offset_history.parse_seconds_list('60, 600,'),
+                         (60.0, 600.0))
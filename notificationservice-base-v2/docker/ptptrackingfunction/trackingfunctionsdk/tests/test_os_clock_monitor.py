@@ -4,12 +4,15 @@
 # SPDX-License-Identifier: Apache-2.0
 #
 import os
+import shutil
+import tempfile
 import unittest
 from unittest.mock import mock_open
 
 import mock
 
 from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers.phc_offset import PhcOffset
 from trackingfunctionsdk.common.helpers.os_clock_monitor import OsClockMonitor
 from trackingfunctionsdk.model.dto.osclockstate import OsClockState
 
@@ -85,6 +88,19 @@ class OsClockMonitorTests(unittest.TestCase):
         self.clockmon.get_os_clock_offset()
         assert self.clockmon.offset == '37000000015'
 
+    @mock.patch('trackingfunctionsdk.common.helpers.os_clock_monitor.subprocess.check_output')
+    @mock.patch('trackingfunctionsdk.common.helpers.os_clock_monitor.PhcOffsetSampler.measure',
+                return_value=PhcOffset(-37000000012, -37000000020, -37000000008, 5,
+                                       'extended'))
+    def test_get_os_clock_offset_native(self, measure_patched, subprocess_patched):
+        self.clockmon = OsClockMonitor(phc2sys_config=phc2sys_test_config, init=False)
+        self.clockmon.ptp_device = 'ptp0'
+        self.clockmon.get_os_clock_offset()
+        assert self.clockmon.offset == '37000000012'
+        assert self.clockmon.offset_min == 37000000008
+        assert self.clockmon.offset_max == 37000000020
+        subprocess_patched.assert_not_called()
+
     def test_set_os_closck_state(self):
         self.clockmon = OsClockMonitor(phc2sys_config=phc2sys_test_config, init=False)
         self.clockmon.offset = '37000000015'
@@ -92,3 +108,40 @@ class OsClockMonitorTests(unittest.TestCase):
         self.assertEqual(self.clockmon.get_os_clock_state(), OsClockState.Locked)
 
         # TODO Test for handling clock state change to LOCKED and FREERUN
+
+    @mock.patch('trackingfunctionsdk.common.helpers.os_clock_monitor.OsClockMonitor.'
+                '_get_time_properties_data_set')
+    def test_set_utc_offset_cached(self, time_properties_patched):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.clockmon = OsClockMonitor(phc2sys_config=phc2sys_test_config, init=False)
+        self.clockmon.phc2sys_config = os.path.join(tmpdir, "phc2sys-test.conf")
+        shutil.copy(testpath + "test_input_files/phc2sys-test.conf",
+                    self.clockmon.phc2sys_config)
+        self.clockmon.parse_phc2sys_config()
+        self.clockmon.phc_interface = "ens2f0"
+        pidfile = os.path.join(tmpdir, "phc2sys-phc2sys-test.pid")
+        with open(pidfile, 'w') as f:
+            f.write("101\n")
+
+        # Not cached until ptp4l reports a valid offset
+        time_properties_patched.return_value = {
+            'currentUtcOffset': '37', 'currentUtcOffsetValid': '0'}
+        self.clockmon.set_utc_offset(tmpdir + "/")
+        self.clockmon.set_utc_offset(tmpdir + "/")
+        self.assertEqual(time_properties_patched.call_count, 2)
+
+        time_properties_patched.return_value = {
+            'currentUtcOffset': '38', 'currentUtcOffsetValid': '1'}
+        self.clockmon.set_utc_offset(tmpdir + "/")
+        self.clockmon.set_utc_offset(tmpdir + "/")
+        self.assertEqual(time_properties_patched.call_count, 3)
+        self.assertEqual(self.clockmon.phc2sys_tolerance_low,
+                         38000000000 - self.clockmon.phc2sys_tolerance_threshold)
+
+        # phc2sys restarted
+        os.unlink(pidfile)
+        with open(pidfile, 'w') as f:
+            f.write("102\n")
+        self.clockmon.set_utc_offset(tmpdir + "/")
+        self.assertEqual(time_properties_patched.call_count, 4)
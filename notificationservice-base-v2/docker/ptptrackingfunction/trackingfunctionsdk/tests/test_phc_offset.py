@@ -0,0 +1,60 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import unittest
+
+from trackingfunctionsdk.common.helpers import phc_offset
+from trackingfunctionsdk.common.helpers.phc_offset import PhcOffsetSampler
+
+
+def pack_clock_time(buffer, offset, nanoseconds):
+    phc_offset.PTP_CLOCK_TIME.pack_into(buffer, offset,
+                                        nanoseconds // 1000000000,
+                                        nanoseconds % 1000000000)
+
+
+class PhcOffsetTests(unittest.TestCase):
+
+    def test_ioctl_numbers(self):
+        self.assertEqual(phc_offset.PTP_SYS_OFFSET_PRECISE, 0xc0403d08)
+        self.assertEqual(phc_offset.PTP_SYS_OFFSET_EXTENDED, 0xc4c03d09)
+
+    def test_decode_precise(self):
+        buffer = bytearray(phc_offset.PTP_SYS_OFFSET_PRECISE_SIZE)
+        pack_clock_time(buffer, 0, 1700000037000000500)
+        pack_clock_time(buffer, 16, 1700000000000000000)
+        self.assertEqual(phc_offset.decode_precise(buffer), -37000000500)
+
+    def test_decode_extended(self):
+        buffer = bytearray(phc_offset.PTP_SYS_OFFSET_EXTENDED_SIZE)
+        phc_offset.PTP_SYS_OFFSET_EXTENDED_HEADER.pack_into(buffer, 0, 3)
+        sys_time = 1700000000000000000
+        for sample, (delay, error) in enumerate([(100, 15), (40, 5),
+                                                 (60, 25)]):
+            offset = 16 + sample * 48
+            pack_clock_time(buffer, offset, sys_time)
+            pack_clock_time(buffer, offset + 16,
+                            sys_time + delay // 2 + 37000000000 + error)
+            pack_clock_time(buffer, offset + 32, sys_time + delay)
+            sys_time += 1000
+        offsets = phc_offset.decode_extended(buffer)
+        self.assertEqual(offsets, [-37000000015, -37000000005,
+                                   -37000000025])
+        summary = phc_offset.summarize(offsets, phc_offset.METHOD_EXTENDED)
+        self.assertEqual(summary.median, -37000000015)
+        self.assertEqual(summary.minimum, -37000000025)
+        self.assertEqual(summary.maximum, -37000000005)
+        self.assertEqual(summary.samples, 3)
+
+    def test_unsupported_device(self):
+        # Character device without the ioctls
+        sampler = PhcOffsetSampler('/dev/null')
+        self.assertIsNone(sampler.measure())
+        self.assertFalse(sampler.is_supported())
+
+        sampler = PhcOffsetSampler('/dev/no_such_ptp')
+        with self.assertRaises(OSError):
+            sampler.measure()
+        self.assertTrue(sampler.is_supported())
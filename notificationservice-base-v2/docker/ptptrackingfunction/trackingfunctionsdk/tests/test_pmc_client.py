@@ -0,0 +1,214 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import os
+import select
+import socket
+import struct
+import tempfile
+import threading
+import unittest
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import pmc_client
+from trackingfunctionsdk.common.helpers import ptpsync as utils
+from trackingfunctionsdk.common.helpers.ptp_monitor import PtpMonitor
+
+testpath = os.environ.get("TESTPATH", "")
+
+CLOCK_ID = bytes.fromhex('507c6ffffe5d4a10')
+GM_ID = bytes.fromhex('001122fffe334455')
+
+
+def build_datasets(port_states=(9,), gm_present=1, gm_clock_class=6,
+                   time_flags=0x14, clock_class=248):
+    return {
+        pmc_client.MID_DEFAULT_DATA_SET: [pmc_client.DEFAULT_DATA_SET.pack(
+            0x01, len(port_states), 128, clock_class, 0xfe, 0xffff, 128,
+            CLOCK_ID, 24)],
+        pmc_client.MID_PARENT_DATA_SET: [pmc_client.PARENT_DATA_SET.pack(
+            GM_ID, 1, 0, 0xffff, 0x7fffffff, 128, gm_clock_class, 0x21,
+            0x4e5d, 128, GM_ID)],
+        pmc_client.MID_TIME_PROPERTIES_DATA_SET: [
+            pmc_client.TIME_PROPERTIES_DATA_SET.pack(37, time_flags, 0x20)],
+        pmc_client.MID_TIME_STATUS_NP: [pmc_client.TIME_STATUS_NP.pack(
+            -12, 1700000000000000000, 0, 0, 0, 0, 0, 0, gm_present, GM_ID)],
+        pmc_client.MID_PORT_DATA_SET: [pmc_client.PORT_DATA_SET.pack(
+            CLOCK_ID, port, state, 0, 0, 1, 3, 0, 1, 0, 2)
+            for port, state in enumerate(port_states, 1)],
+    }
+
+
+class FakePtp4l(threading.Thread):
+    # Answers GET requests on a UDS like ptp4l does
+
+    def __init__(self, path, datasets):
+        super(FakePtp4l, self).__init__(daemon=True)
+        self.datasets = datasets
+        self.requests = []
+        self.subscriber = None
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(path)
+        self.sock.settimeout(5)
+
+    def run(self):
+        while True:
+            try:
+                message, address = self.sock.recvfrom(1500)
+            except (OSError, socket.timeout):
+                return
+            header = pmc_client.HEADER.unpack_from(message)
+            offset = pmc_client.HEADER.size + pmc_client.MANAGEMENT.size + \
+                pmc_client.TLV.size
+            management_id, = pmc_client.MANAGEMENT_ID.unpack_from(
+                message, offset)
+            self.requests.append(management_id)
+            if management_id == pmc_client.MID_SUBSCRIBE_EVENTS_NP:
+                self.subscriber = address
+                data = message[offset + pmc_client.MANAGEMENT_ID.size:]
+                self.sock.sendto(pmc_client.encode_management(
+                    management_id, header[9], pmc_client.ACTION_RESPONSE,
+                    data, header[3]), address)
+                continue
+            for data in self.datasets.get(management_id, []):
+                response = pmc_client.encode_management(
+                    management_id, header[9], pmc_client.ACTION_RESPONSE,
+                    data, header[3])
+                self.sock.sendto(response, address)
+
+    def notify(self, management_id, data, sequence_id=1000):
+        self.sock.sendto(pmc_client.encode_management(
+            management_id, sequence_id, pmc_client.ACTION_RESPONSE, data),
+            self.subscriber)
+
+    def stop(self):
+        self.sock.close()
+
+
+class PmcClientTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.uds_address = os.path.join(self.tmpdir.name, 'ptp4l')
+        self.client = pmc_client.PmcClient(
+            self.uds_address, domain_number=24,
+            local_address=os.path.join(self.tmpdir.name, 'pmc'))
+
+    def tearDown(self):
+        self.client.close()
+        self.tmpdir.cleanup()
+
+    def start_server(self, **kwargs):
+        server = FakePtp4l(self.uds_address, build_datasets(**kwargs))
+        server.start()
+        self.addCleanup(server.stop)
+        return server
+
+    def test_encode_get(self):
+        message = pmc_client.encode_management(
+            pmc_client.MID_PORT_DATA_SET, 7, domain_number=24)
+        self.assertEqual(len(message), 54)
+        header = pmc_client.HEADER.unpack_from(message)
+        self.assertEqual(header[0], pmc_client.MESSAGE_TYPE_MANAGEMENT)
+        self.assertEqual(header[2], len(message))
+        self.assertEqual(header[3], 24)
+        self.assertEqual(header[9], 7)
+        self.assertEqual(message[-2:], struct.pack('>H', 0x2004))
+
+    def test_decode_error_status(self):
+        body = struct.pack('>HH4x', 0x0002, pmc_client.MID_TIME_STATUS_NP)
+        message = pmc_client.encode_management(
+            0, 3, pmc_client.ACTION_RESPONSE)
+        message = message[:48] + struct.pack('>HH', 2, len(body)) + body
+        sequence_id, action, management_id, payload = \
+            pmc_client.decode_management(message)
+        self.assertEqual(sequence_id, 3)
+        self.assertEqual(management_id, pmc_client.MID_TIME_STATUS_NP)
+        self.assertIsInstance(payload, pmc_client.ManagementError)
+
+    def test_get_datasets(self):
+        self.start_server(port_states=(9, 6))
+        results = self.client.get(PtpMonitor.ptp_native_query)
+        default_data_set = results[pmc_client.MID_DEFAULT_DATA_SET][0]
+        self.assertEqual(default_data_set.number_ports, 2)
+        self.assertEqual(default_data_set.clock_identity,
+                         '507c6f.fffe.5d4a10')
+        self.assertEqual(
+            [port.port_state for port in
+             results[pmc_client.MID_PORT_DATA_SET]], ['SLAVE', 'MASTER'])
+        time_status = results[pmc_client.MID_TIME_STATUS_NP][0]
+        self.assertEqual(time_status.master_offset, -12)
+        self.assertTrue(time_status.gm_present)
+        time_properties = \
+            results[pmc_client.MID_TIME_PROPERTIES_DATA_SET][0]
+        self.assertEqual(time_properties.current_utc_offset, 37)
+        self.assertTrue(time_properties.current_utc_offset_valid)
+        self.assertTrue(time_properties.time_traceable)
+        parent_data_set = results[pmc_client.MID_PARENT_DATA_SET][0]
+        self.assertEqual(parent_data_set.gm_clock_class, 6)
+        self.assertEqual(parent_data_set.grandmaster_identity,
+                         '001122.fffe.334455')
+
+    def test_get_no_response(self):
+        # ptp4l socket missing
+        with self.assertRaises(OSError):
+            self.client.get([pmc_client.MID_DEFAULT_DATA_SET])
+
+        # ptp4l not answering
+        silent = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        silent.bind(self.uds_address)
+        self.addCleanup(silent.close)
+        self.client.timeout = 0.05
+        with self.assertRaises(pmc_client.PmcError):
+            self.client.get([pmc_client.MID_DEFAULT_DATA_SET])
+
+    def test_subscribe(self):
+        server = self.start_server()
+        notifications = []
+        self.client.notification_handler = \
+            lambda management_id, payload: notifications.append(payload)
+        ack = self.client.subscribe([pmc_client.NOTIFY_PORT_STATE,
+                                     pmc_client.NOTIFY_TIME_SYNC], 180)
+        self.assertEqual(ack.duration, 180)
+        self.assertEqual(ack.events, {0, 1})
+
+        server.notify(pmc_client.MID_PORT_DATA_SET,
+                      pmc_client.PORT_DATA_SET.pack(
+                          CLOCK_ID, 1, 4, 0, 0, 1, 3, 0, 1, 0, 2))
+        select.select([self.client], [], [], 1)
+        self.client.read_notifications()
+        self.assertEqual(len(notifications), 1)
+        self.assertEqual(notifications[0].port_state, 'LISTENING')
+
+    def test_read_uds_settings(self):
+        uds_address, domain_number = pmc_client.read_uds_settings(
+            testpath + "test_input_files/phc2sys-test.conf")
+        self.assertEqual(uds_address, '/var/run/ptp4l-ptp-inst1')
+        self.assertEqual(domain_number, 24)
+
+        uds_address, domain_number = pmc_client.read_uds_settings(
+            "./no_such_file.conf")
+        self.assertEqual(uds_address, constants.PTP4L_DEFAULT_UDS_ADDRESS)
+        self.assertEqual(domain_number, 0)
+
+    def test_ptpsync_native(self):
+        self.start_server()
+        ptp_monitor = PtpMonitor('ptp1', 30, 2, 'phc2sys1', init=False)
+        ptp_monitor._pmc_client = self.client
+        result, total_ptp_keywords, port_count = ptp_monitor.ptpsync()
+        self.assertEqual(result, {
+            'port1': 'SLAVE',
+            'gmPresent': 'true',
+            'master_offset': '-12',
+            'gm.ClockClass': '6',
+            'grandmasterIdentity': '001122.fffe.334455',
+            'timeTraceable': '1',
+            'clockIdentity': '507c6f.fffe.5d4a10',
+            'clockClass': '248'})
+        self.assertEqual(total_ptp_keywords, 8)
+        self.assertEqual(port_count, 1)
+        self.assertEqual(utils.check_results(result, total_ptp_keywords,
+                                             port_count),
+                         constants.LOCKED_PHC_STATE)
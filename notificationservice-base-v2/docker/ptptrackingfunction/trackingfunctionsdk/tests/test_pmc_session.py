@@ -0,0 +1,166 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import os
+import sys
+import tempfile
+import unittest
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers import pmc_client
+from trackingfunctionsdk.common.helpers import pmc_session
+from trackingfunctionsdk.common.helpers import ptpsync as utils
+from trackingfunctionsdk.common.helpers.ptp_monitor import PtpMonitor
+
+# Stands in for an interactive 'pmc -u -b 0', printing the responses of
+# each command read from stdin the way pmc_show() does. With a pause as
+# argument, every message is written in two pieces that far apart.
+FAKE_PMC = r'''
+import sys
+import time
+
+pause = float(sys.argv[1]) if len(sys.argv) > 1 else 0
+
+DATASETS = {
+    'PORT_DATA_SET': [
+        {'portIdentity': '507c6f.fffe.5d4a10-1', 'portState': 'SLAVE'},
+        {'portIdentity': '507c6f.fffe.5d4a10-2', 'portState': 'MASTER'}],
+    'TIME_STATUS_NP': [{'master_offset': '-12', 'gmPresent': 'true'}],
+    'PARENT_DATA_SET': [{'gm.ClockClass': '6',
+                         'grandmasterIdentity': '001122.fffe.334455'}],
+    'TIME_PROPERTIES_DATA_SET': [{'currentUtcOffset': '37',
+                                  'currentUtcOffsetValid': '1',
+                                  'timeTraceable': '1'}],
+    'DEFAULT_DATA_SET': [{'numberPorts': '2',
+                          'clockIdentity': '507c6f.fffe.5d4a10',
+                          'clockClass': '248'}],
+    # Answered by each port
+    'NULL_MANAGEMENT': [{}, {}],
+}
+
+sequence_id = 0
+for line in sys.stdin:
+    command = line.split()
+    if command == ['EXIT']:
+        sys.exit(1)
+    sys.stdout.write('sending: %s\n' % ' '.join(command))
+    sys.stdout.flush()
+    dataset = command[-1]
+    if dataset not in DATASETS:
+        sys.stdout.write('\t507c6f.fffe.5d4a10-0 seq %d RESPONSE '
+                         'MANAGEMENT_ERROR_STATUS \n' % sequence_id)
+    for values in DATASETS.get(dataset, []):
+        sys.stdout.write('\t507c6f.fffe.5d4a10-0 seq %d RESPONSE '
+                         'MANAGEMENT %s ' % (sequence_id, dataset))
+        for index, (key, value) in enumerate(values.items()):
+            if index == 1 and pause:
+                sys.stdout.flush()
+                time.sleep(pause)
+            sys.stdout.write('\n\t\t%-27s%s' % (key, value))
+        sys.stdout.write('\n')
+        sys.stdout.flush()
+    sequence_id += 1
+'''
+
+
+class PmcSessionTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        fake_pmc = os.path.join(self.tmpdir.name, 'pmc.py')
+        with open(fake_pmc, 'w') as f:
+            f.write(FAKE_PMC)
+        self.session = pmc_session.PmcSession(
+            'ptp4l-ptp1.conf', '/var/run/ptp4l-ptp1', 0, timeout=2,
+            command=[sys.executable, fake_pmc])
+        self.addCleanup(self.session.stop)
+
+    def test_query_batch(self):
+        responses = self.session.query(['GET DEFAULT_DATA_SET',
+                                        'GET PORT_DATA_SET'])
+        self.assertEqual([response.dataset for response in responses],
+                         ['DEFAULT_DATA_SET', 'PORT_DATA_SET',
+                          'PORT_DATA_SET'])
+        self.assertEqual(self.session.number_ports, 2)
+        self.assertEqual(responses[2].values['portState'], 'MASTER')
+        self.assertEqual(responses[1].sequence_id, 1)
+
+        # The same process answers the next batch
+        process = self.session._process
+        responses = self.session.query(['GET TIME_PROPERTIES_DATA_SET'])
+        self.assertIs(self.session._process, process)
+        # Sequence id 2 went to the sentinel of the first batch
+        self.assertEqual(responses[0].sequence_id, 3)
+        self.assertEqual(responses[0].values['currentUtcOffset'], '37')
+
+    def test_error_status(self):
+        responses = self.session.query(['GET CLOCK_DESCRIPTION',
+                                        'GET TIME_STATUS_NP'])
+        self.assertEqual(len(responses), 1)
+        self.assertEqual(responses[0].dataset, 'TIME_STATUS_NP')
+
+    def test_query_split_messages(self):
+        # pmc stalled in the middle of its messages, e.g. on a loaded core
+        session = pmc_session.PmcSession(
+            'ptp4l-ptp1.conf', '/var/run/ptp4l-ptp1', 0, timeout=2,
+            command=self.session.command + ['0.05'])
+        self.addCleanup(session.stop)
+        responses = session.query(['GET PARENT_DATA_SET',
+                                   'GET DEFAULT_DATA_SET'])
+        self.assertEqual([response.values for response in responses], [
+            {'gm.ClockClass': '6',
+             'grandmasterIdentity': '001122.fffe.334455'},
+            {'numberPorts': '2', 'clockIdentity': '507c6f.fffe.5d4a10',
+             'clockClass': '248'}])
+        # The answers of the second port to the sentinel are left over
+        responses = session.query(['GET TIME_STATUS_NP'])
+        self.assertEqual(responses[0].values,
+                         {'master_offset': '-12', 'gmPresent': 'true'})
+
+    def test_restart(self):
+        self.session.query(['GET TIME_STATUS_NP'])
+        with self.assertRaises(pmc_client.PmcError):
+            self.session.query(['EXIT'])
+        responses = self.session.query(['GET TIME_STATUS_NP'])
+        self.assertEqual(responses[0].values['gmPresent'], 'true')
+        self.assertEqual(responses[0].sequence_id, 0)
+        self.assertEqual(self.session.restarts, 1)
+
+        self.session._process.kill()
+        self.session._process.wait()
+        responses = self.session.query(['GET TIME_STATUS_NP'])
+        self.assertEqual(responses[0].values['master_offset'], '-12')
+        self.assertEqual(self.session.restarts, 2)
+
+    def test_get_session_shared(self):
+        session = pmc_session.get_session('ptp4l-ptp9.conf',
+                                          '/var/run/ptp4l-ptp9', 24)
+        self.assertIs(pmc_session.get_session('phc2sys-ptp9.conf',
+                                              '/var/run/ptp4l-ptp9', '24'),
+                      session)
+        self.assertIsNot(pmc_session.get_session('ptp4l-ptp9.conf',
+                                                 '/var/run/ptp4l-ptp9', 0),
+                         session)
+
+    def test_ptpsync_session(self):
+        ptp_monitor = PtpMonitor('ptp1', 30, 2, 'phc2sys1', init=False)
+        ptp_monitor._pmc_session = self.session
+        result, total_ptp_keywords, port_count = ptp_monitor.ptpsync()
+        self.assertEqual(result, {
+            'port1': 'SLAVE',
+            'port2': 'MASTER',
+            'gmPresent': 'true',
+            'master_offset': '-12',
+            'gm.ClockClass': '6',
+            'grandmasterIdentity': '001122.fffe.334455',
+            'timeTraceable': '1',
+            'clockIdentity': '507c6f.fffe.5d4a10',
+            'clockClass': '248'})
+        self.assertEqual(total_ptp_keywords, 9)
+        self.assertEqual(port_count, 2)
+        self.assertEqual(utils.check_results(result, total_ptp_keywords,
+                                             port_count),
+                         constants.LOCKED_PHC_STATE)
@@ -0,0 +1,75 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import unittest
+
+from trackingfunctionsdk.common.helpers.poll_scheduler import PollScheduler
+from trackingfunctionsdk.common.helpers.poll_scheduler import TimerWheel
+
+
+class TimerWheelTests(unittest.TestCase):
+
+    def setUp(self):
+        self.wheel = TimerWheel(tick=0.1, size=16, now=100.0)
+
+    def test_expire(self):
+        self.wheel.schedule('ptp1', 0.5, 100.0)
+        self.wheel.schedule('gnss1', 0.3, 100.0)
+        self.assertAlmostEqual(self.wheel.next_expiry(), 100.3)
+        self.assertEqual(self.wheel.expire(100.2), [])
+        # Woken at the expiry computed from next_expiry
+        self.assertEqual(self.wheel.expire(self.wheel.next_expiry()),
+                         ['gnss1'])
+        self.assertEqual(self.wheel.expire(101.0), ['ptp1'])
+        self.assertEqual(len(self.wheel), 0)
+        self.assertIsNone(self.wheel.next_expiry())
+
+    def test_reschedule(self):
+        self.wheel.schedule('ptp1', 0.2, 100.0)
+        self.wheel.schedule('ptp1', 0.6, 100.0)
+        self.assertEqual(self.wheel.expire(100.3), [])
+        self.assertEqual(self.wheel.expire(100.6), ['ptp1'])
+        self.wheel.schedule('ptp1', 0.2, 100.6)
+        self.wheel.cancel('ptp1')
+        self.assertEqual(self.wheel.expire(101.0), [])
+
+    def test_later_turn(self):
+        # Beyond the 1.6s covered by a turn of the wheel
+        self.wheel.schedule('os_clock', 5.0, 100.0)
+        self.wheel.schedule('ptp1', 0.5, 100.0)
+        self.assertEqual(self.wheel.expire(102.0), ['ptp1'])
+        self.assertIn('os_clock', self.wheel)
+        self.assertEqual(self.wheel.expire(104.9), [])
+        # Long sleep past several turns
+        self.assertEqual(self.wheel.expire(110.0), ['os_clock'])
+
+
+class PollSchedulerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = PollScheduler(0.5, 4, tick=0.1, size=64, now=0.0)
+
+    def test_adaptive_interval(self):
+        name = ('ptp', 'ptp1')
+        # Stable, relaxing up to the maximum
+        self.assertEqual(self.scheduler.polled(name, False, False, 0.0), 4)
+        # A change or holdover tightens it to the minimum
+        self.assertEqual(self.scheduler.polled(name, True, False, 4.0), 0.5)
+        self.assertEqual(self.scheduler.polled(name, False, True, 4.5), 0.5)
+        self.assertEqual(self.scheduler.polled(name, False, False, 5.0), 1)
+        self.assertEqual(self.scheduler.polled(name, False, False, 6.0), 2)
+        self.assertEqual(self.scheduler.polled(name, False, False, 8.0), 4)
+        self.assertEqual(self.scheduler.polled(name, False, False, 12.0), 4)
+
+    def test_due(self):
+        self.scheduler.polled(('ptp', 'ptp1'), True, False, 0.0)
+        self.scheduler.polled(('os_clock',), False, False, 0.0)
+        self.assertAlmostEqual(self.scheduler.timeout(0.2), 0.3)
+        self.assertEqual(self.scheduler.due(0.5), [('ptp', 'ptp1')])
+        self.assertAlmostEqual(self.scheduler.timeout(0.5), 3.5)
+        self.scheduler.retry(('ptp', 'ptp1'), 0.5)
+        self.assertEqual(self.scheduler.due(4.0),
+                         [('ptp', 'ptp1'), ('os_clock',)])
+        self.assertEqual(self.scheduler.timeout(4.0), 4)
@@ -0,0 +1,103 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import os
+import tempfile
+import unittest
+
+from trackingfunctionsdk.common.helpers import pmc_client
+from trackingfunctionsdk.common.helpers.ptp_event_subscriber import \
+    PtpEventSubscriber
+from trackingfunctionsdk.common.helpers.ptp_monitor import PtpMonitor
+from trackingfunctionsdk.model.dto.ptpstate import PtpState
+from trackingfunctionsdk.tests.test_pmc_client import CLOCK_ID
+from trackingfunctionsdk.tests.test_pmc_client import FakePtp4l
+from trackingfunctionsdk.tests.test_pmc_client import GM_ID
+from trackingfunctionsdk.tests.test_pmc_client import build_datasets
+
+
+class PtpEventSubscriberTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.uds_address = os.path.join(self.tmpdir.name, 'ptp4l')
+        config = os.path.join(self.tmpdir.name, 'ptp4l-ptp1.conf')
+        with open(config, 'w') as f:
+            f.write("[global]\nuds_address %s\n" % self.uds_address)
+        self.ptp_monitor = PtpMonitor('ptp1', 30, 2, 'phc2sys1', init=False)
+        self.ptp_monitor.ptp4l_config = config
+        self.ptp_monitor.ptp4l_service_name = 'ptp1'
+        self.ptp_monitor.consistency_check_seconds = 10
+        self.wakeups = 0
+        self.subscriber = PtpEventSubscriber([self.ptp_monitor], self.wakeup)
+        subscription = self.subscriber.subscriptions[0]
+        subscription.client.local_address = \
+            os.path.join(self.tmpdir.name, 'pmc')
+        self.addCleanup(subscription.client.close)
+
+    def wakeup(self):
+        self.wakeups += 1
+
+    def test_subscribe(self):
+        subscription = self.subscriber.subscriptions[0]
+        self.subscriber.retry = 0.05
+        subscription.client.timeout = 0.05
+        self.subscriber.subscribe(subscription)
+        self.assertFalse(self.ptp_monitor.subscription_active)
+        self.assertEqual(self.wakeups, 0)
+
+        server = FakePtp4l(self.uds_address, build_datasets())
+        server.start()
+        self.addCleanup(server.stop)
+        self.subscriber.subscribe(subscription)
+        self.assertTrue(self.ptp_monitor.subscription_active)
+        self.assertIsNotNone(server.subscriber)
+        # Missed events are recovered by polling once after subscribing
+        self.assertEqual(self.wakeups, 1)
+        self.assertTrue(self.ptp_monitor.poll_required())
+
+    def test_handle_notification(self):
+        subscription = self.subscriber.subscriptions[0]
+        self.ptp_monitor.subscription_active = True
+        self.ptp_monitor._ptp_sync_state = PtpState.Locked
+        self.ptp_monitor._last_poll_time = float('inf')
+        self.assertFalse(self.ptp_monitor.poll_required())
+
+        port_data_set = pmc_client.decode_port_data_set(
+            pmc_client.PORT_DATA_SET.pack(CLOCK_ID, 1, 9, 0, 0, 1, 3, 0, 1,
+                                          0, 2))
+        self.subscriber.handle_notification(
+            subscription, pmc_client.MID_PORT_DATA_SET, port_data_set)
+        self.assertEqual(self.wakeups, 1)
+        self.assertTrue(self.ptp_monitor.poll_required())
+
+        # Repeated state is not an event
+        self.ptp_monitor._event_pending = False
+        self.subscriber.handle_notification(
+            subscription, pmc_client.MID_PORT_DATA_SET, port_data_set)
+        self.assertEqual(self.wakeups, 1)
+
+        time_status = pmc_client.decode_time_status_np(
+            pmc_client.TIME_STATUS_NP.pack(-5, 0, 0, 0, 0, 0, 0, 0, 1, GM_ID))
+        self.subscriber.handle_notification(
+            subscription, pmc_client.MID_TIME_STATUS_NP, time_status)
+        self.assertEqual(self.wakeups, 2)
+        time_status = time_status._replace(master_offset=3)
+        self.subscriber.handle_notification(
+            subscription, pmc_client.MID_TIME_STATUS_NP, time_status)
+        self.assertEqual(self.wakeups, 2)
+        self.assertEqual(self.ptp_monitor.master_offset, 3)
+
+    def test_poll_required(self):
+        self.assertTrue(self.ptp_monitor.poll_required())
+        self.ptp_monitor.subscription_active = True
+        self.ptp_monitor._last_poll_time = float('inf')
+        self.ptp_monitor._ptp_sync_state = PtpState.Holdover
+        self.assertTrue(self.ptp_monitor.poll_required())
+        self.ptp_monitor._ptp_sync_state = PtpState.Freerun
+        self.assertFalse(self.ptp_monitor.poll_required())
+        self.ptp_monitor._last_poll_time = 0
+        self.assertTrue(self.ptp_monitor.poll_required())
@@ -0,0 +1,101 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import unittest
+
+import mock
+import oslo_messaging
+
+from trackingfunctionsdk.client.ptpeventproducer import PtpEventProducer
+from trackingfunctionsdk.common.helpers import constants
+
+
+class PtpEventProducerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.producer = PtpEventProducer('controller-0', 'fake://',
+                                         'fake://')
+
+    def casts(self, broker_client):
+        return [(call[0][0], call[1]['notification'])
+                for call in broker_client.cast.call_args_list]
+
+    def test_publish_many(self):
+        local = mock.Mock()
+        registration = mock.Mock()
+        self.producer.local_broker_client = local
+        self.producer.registration_broker_client = registration
+        lock_state = {'ptp4l-legacy': {'source': 'lock-state'}}
+        clock_class = {'ptp4l-legacy': {'source': 'clock-class'}}
+        result = self.producer.publish_many([
+            (lock_state, constants.SOURCE_SYNC_PTP_LOCK_STATE),
+            (lock_state, constants.SOURCE_SYNC_ALL),
+            (clock_class, constants.SOURCE_SYNC_PTP_CLOCK_CLASS),
+            (clock_class, constants.SOURCE_SYNC_ALL)])
+        self.assertEqual(result, (True, True))
+        self.assertEqual(self.casts(local), [
+            ('/sync/ptp-status/lock-state-Event-v2-controller-0', lock_state),
+            ('/sync-Event-v2-controller-0', lock_state),
+            ('/sync/ptp-status/clock-class-Event-v2-controller-0',
+             clock_class),
+            ('/sync-Event-v2-controller-0', clock_class)])
+        # Each status reaches the registration broker once
+        self.assertEqual(self.casts(registration), [
+            ('PTP-Event-v2-*', lock_state),
+            ('PTP-Event-v2-*', clock_class)])
+
+    def test_publish_sync_snapshot(self):
+        local = mock.Mock()
+        registration = mock.Mock()
+        self.producer.sync_snapshot = True
+        self.producer.local_broker_client = local
+        self.producer.registration_broker_client = registration
+        lock_state = {'ptp4l-legacy': {'source': 'lock-state'}}
+        os_clock = {'phc2sys': {'source': 'os-clock'}}
+        self.producer.publish_many([
+            (lock_state, constants.SOURCE_SYNC_PTP_LOCK_STATE),
+            (lock_state, constants.SOURCE_SYNC_ALL),
+            (os_clock, constants.SOURCE_SYNC_OS_CLOCK),
+            (os_clock, constants.SOURCE_SYNC_ALL)])
+        # One /sync cast carrying both statuses
+        self.assertEqual(self.casts(local), [
+            ('/sync/ptp-status/lock-state-Event-v2-controller-0', lock_state),
+            ('/sync-Event-v2-controller-0',
+             {constants.SYNC_SNAPSHOT_KEY: [lock_state, os_clock]}),
+            ('/sync/sync-status/os-clock-sync-state-Event-v2-controller-0',
+             os_clock)])
+        self.assertEqual(self.casts(registration), [
+            ('PTP-Event-v2-*', lock_state),
+            ('PTP-Event-v2-*', os_clock)])
+
+    @mock.patch('trackingfunctionsdk.client.ptpeventproducer.time.sleep')
+    def test_publish_retry(self, sleep_patched):
+        local = mock.Mock()
+        local.cast.side_effect = [Exception('unreachable'), None]
+        self.producer.local_broker_client = local
+        self.producer.registration_broker_client = None
+        self.assertEqual(self.producer.publish_status({}, 'PTP'),
+                         (True, False))
+        self.assertEqual(local.cast.call_count, 2)
+
+        local.cast.side_effect = Exception('unreachable')
+        self.assertEqual(self.producer.publish_status({}, 'PTP', retry=3),
+                         (False, False))
+        # Backing off between the attempts
+        self.assertEqual([call[0][0] for call in sleep_patched.call_args_list],
+                         [0.5, 0.5, 1.0])
+
+    def test_cast_client_cached(self):
+        broker_client = self.producer.local_broker_client
+        with mock.patch('trackingfunctionsdk.client.base.oslo_messaging.'
+                        'get_rpc_client',
+                        wraps=oslo_messaging.get_rpc_client) as get_patched:
+            for _ in range(3):
+                self.producer.publish_status(
+                    {}, constants.SOURCE_SYNC_OS_CLOCK)
+            # Local resource topic and registration topic
+            self.assertEqual(get_patched.call_count, 2)
+        self.assertIn('/sync/sync-status/os-clock-sync-state-Event-v2-'
+                      'controller-0', broker_client.cast_clients)
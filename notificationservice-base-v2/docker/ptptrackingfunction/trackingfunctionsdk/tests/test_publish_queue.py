@@ -0,0 +1,83 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import threading
+import unittest
+
+import mock
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers.event_encoder import EventEncoder
+from trackingfunctionsdk.common.helpers.publish_queue import PublishQueue
+
+
+class PublishQueueTests(unittest.TestCase):
+
+    def setUp(self):
+        self.producer = mock.Mock()
+        self.producer.publish_many.return_value = (True, True)
+        self.queue = PublishQueue(self.producer, maxsize=4)
+        self.encoder = EventEncoder('controller-0')
+
+    def status(self, instance, state, event_time,
+               resource=constants.SOURCE_SYNC_PTP_LOCK_STATE):
+        return {instance: self.encoder.encode(resource, state, event_time,
+                                              instance)}
+
+    def test_coalesce(self):
+        locked = self.status('ptp1', 'Locked', 1000.0)
+        other = self.status('ptp2', 'Locked', 1000.0)
+        self.queue.put_many([(locked, constants.SOURCE_SYNC_PTP_LOCK_STATE),
+                             (locked, constants.SOURCE_SYNC_ALL),
+                             (other, constants.SOURCE_SYNC_PTP_LOCK_STATE)])
+        holdover = self.status('ptp1', 'Holdover', 1002.0)
+        self.queue.put_many([(holdover, constants.SOURCE_SYNC_PTP_LOCK_STATE),
+                             (holdover, constants.SOURCE_SYNC_ALL)])
+        self.assertEqual(self.queue.depth(), 3)
+        self.assertEqual(self.queue.coalesced, 2)
+
+        self.queue.send(list(self.queue._pending.values()))
+        self.producer.publish_many.assert_called_once_with([
+            (holdover, constants.SOURCE_SYNC_PTP_LOCK_STATE),
+            (holdover, constants.SOURCE_SYNC_ALL),
+            (other, constants.SOURCE_SYNC_PTP_LOCK_STATE)])
+        self.assertEqual(self.queue.sent, 3)
+
+    def test_drop_oldest(self):
+        for index in range(6):
+            self.queue.put_many([(self.status('ptp%d' % index, 'Locked',
+                                              1000.0),
+                                  constants.SOURCE_SYNC_PTP_LOCK_STATE)])
+        metrics = self.queue.metrics()
+        self.assertEqual(metrics.depth, 4)
+        self.assertEqual(metrics.dropped, 2)
+        self.assertEqual(metrics.queued, 6)
+        self.assertEqual([list(status)[0] for status, _, _ in
+                          self.queue._pending.values()],
+                         ['ptp2', 'ptp3', 'ptp4', 'ptp5'])
+
+    def test_failed_send(self):
+        self.producer.publish_many.side_effect = Exception('unreachable')
+        self.queue.put_many([({'ResourceType': 'PTP'}, 'PTP')])
+        self.queue.send(list(self.queue._pending.values()))
+        self.assertEqual(self.queue.failed, 1)
+        self.assertEqual(self.queue.metrics().sent, 0)
+
+    def test_sender_thread(self):
+        sent = threading.Event()
+        self.producer.publish_many.side_effect = \
+            lambda statuses: sent.set() or (True, True)
+        self.queue.start()
+        self.addCleanup(self.queue.stop)
+        self.queue.put_many([(self.status('ptp1', 'Locked', 1000.0),
+                              constants.SOURCE_SYNC_PTP_LOCK_STATE)])
+        self.assertTrue(sent.wait(5))
+        self.queue.stop()
+        self.queue.join(5)
+        self.assertFalse(self.queue.is_alive())
+        metrics = self.queue.metrics()
+        self.assertEqual(metrics.sent, 1)
+        self.assertEqual(metrics.depth, 0)
+        self.assertGreaterEqual(metrics.send_latency_max, 0.0)
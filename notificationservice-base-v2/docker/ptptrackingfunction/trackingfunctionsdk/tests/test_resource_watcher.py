@@ -0,0 +1,71 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from trackingfunctionsdk.common.helpers import resource_watcher
+from trackingfunctionsdk.common.helpers.resource_watcher import \
+    ResourceWatcher
+
+
+class ResourceWatcherTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.run_dir = os.path.join(self.tmpdir.name, 'run')
+        os.mkdir(self.run_dir)
+        self.pidfile = os.path.join(self.run_dir, 'ptp4l-ptp1.pid')
+        with open(self.pidfile, 'w') as f:
+            f.write('100\n')
+        self.wakeup = threading.Event()
+        self.watcher = ResourceWatcher([self.run_dir + '/'],
+                                       self.wakeup.set)
+        self.assertTrue(self.watcher.start())
+        self.addCleanup(self.watcher.join)
+        self.addCleanup(self.watcher.stop)
+
+    def wait_for(self, path, present):
+        deadline = time.monotonic() + 2
+        while self.watcher.lookup(path) != present:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_initial_scan(self):
+        self.assertTrue(resource_watcher.exists(self.pidfile))
+        self.assertFalse(resource_watcher.exists(
+            os.path.join(self.run_dir, 'phc2sys-phc1.pid')))
+        # Paths outside the watched directories are checked directly
+        self.assertIsNone(self.watcher.lookup(__file__))
+        self.assertTrue(resource_watcher.exists(__file__))
+
+    def test_pidfile_changes(self):
+        os.unlink(self.pidfile)
+        self.wait_for(self.pidfile, False)
+        self.assertTrue(self.wakeup.wait(2))
+
+        self.wakeup.clear()
+        os.rename(os.path.join(self.tmpdir.name, 'run'),
+                  os.path.join(self.tmpdir.name, 'run.old'))
+        self.wait_for(self.pidfile, None)
+        self.assertTrue(self.wakeup.wait(2))
+
+    def test_pidfile_created(self):
+        pidfile = os.path.join(self.run_dir, 'ts2phc-ts1.pid')
+        with open(pidfile, 'w') as f:
+            f.write('200\n')
+        self.wait_for(pidfile, True)
+        self.assertTrue(self.wakeup.wait(2))
+
+        # Other files are tracked without waking the daemon
+        self.wakeup.clear()
+        socket_path = os.path.join(self.run_dir, 'ptp4l-ptp1')
+        open(socket_path, 'w').close()
+        self.wait_for(socket_path, True)
+        self.assertFalse(self.wakeup.is_set())
@@ -0,0 +1,43 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import unittest
+
+import mock
+
+from trackingfunctionsdk.common.helpers import stage_timer
+from trackingfunctionsdk.common.helpers.stage_timer import StageTimer
+
+
+class StageTimerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.timer = StageTimer()
+
+    def test_timed(self):
+        with mock.patch.object(stage_timer.time, 'monotonic',
+                               side_effect=[10.0, 10.25, 20.0, 20.5]):
+            with self.timer.timed('pmc', 'ptp1'):
+                pass
+            with self.assertRaises(OSError):
+                # Failed stages are timed too
+                with self.timer.timed('pmc', 'ptp1'):
+                    raise OSError("pmc failed")
+        histograms = dict(self.timer.histograms())
+        self.assertEqual(histograms[('pmc', 'ptp1')].count, 2)
+        self.assertAlmostEqual(histograms[('pmc', 'ptp1')].max, 0.5)
+        self.assertEqual(self.timer.tick_durations(), {('pmc', 'ptp1'): 0.75})
+
+    def test_tick(self):
+        self.timer.observe(('cgu_read', 'ts2phc1'), 0.01)
+        self.timer.start_tick()
+        self.timer.observe(('phc_ctl', 'ptp0'), 0.02)
+        self.timer.observe(('phc_ctl', 'ptp0'), 0.03)
+        self.assertEqual(list(self.timer.tick_durations()),
+                         [('phc_ctl', 'ptp0')])
+        self.assertAlmostEqual(
+            self.timer.tick_durations()[('phc_ctl', 'ptp0')], 0.05)
+        # The histograms are kept across ticks
+        self.assertEqual(len(self.timer.histograms()), 2)
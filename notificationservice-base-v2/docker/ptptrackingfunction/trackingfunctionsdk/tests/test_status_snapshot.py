@@ -0,0 +1,87 @@
+#
+# Copyright (c) 2023 Wind River Systems, Inc.
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+import unittest
+
+from trackingfunctionsdk.common.helpers import constants
+from trackingfunctionsdk.common.helpers.event_encoder import EventEncoder
+from trackingfunctionsdk.common.helpers.status_snapshot import \
+    ResourceStatus
+from trackingfunctionsdk.common.helpers.status_snapshot import \
+    StatusSnapshot
+
+
+class StatusSnapshotTests(unittest.TestCase):
+
+    def setUp(self):
+        self.encoder = EventEncoder('controller-0')
+        self.snapshot = StatusSnapshot(1, self.encoder, {
+            constants.SOURCE_SYNC_GNSS_SYNC_STATUS: [
+                ResourceStatus('ts2phc1', 'ts2phc1', 'Synchronized', 1000.0)],
+            constants.SOURCE_SYNC_PTP_CLOCK_CLASS: [
+                ResourceStatus('ptp1', 'ptp1', '6', 1001.0),
+                ResourceStatus('ptp2', 'ptp2', '248', 1001.0)],
+            constants.SOURCE_SYNC_PTP_LOCK_STATE: [
+                ResourceStatus('ptp1', 'ptp1', 'Locked', 1002.0),
+                ResourceStatus('ptp2', 'ptp2', 'Freerun', 1002.0)],
+            constants.SOURCE_SYNC_OS_CLOCK: [
+                ResourceStatus('os_clock_status', None, 'Locked', 1003.0)],
+            constants.SOURCE_SYNC_SYNC_STATE: [
+                ResourceStatus('overall_sync_status', None, 'Locked',
+                               1004.0)]})
+
+    def value(self, event):
+        return event['data']['values'][0]['value']
+
+    def test_query(self):
+        status = self.snapshot.query(constants.SOURCE_SYNC_PTP_CLOCK_CLASS,
+                                     'controller-0')
+        self.assertEqual(list(status), ['ptp1', 'ptp2'])
+        self.assertEqual(self.value(status['ptp1']), '6')
+        self.assertEqual(status['ptp1']['data']['values'][0]['data_type'],
+                         constants.DATA_TYPE_METRIC)
+        # Prebuilt, the same response is returned again
+        self.assertIs(self.snapshot.query(
+            constants.SOURCE_SYNC_PTP_CLOCK_CLASS, 'controller-0'), status)
+
+        status = self.snapshot.query(constants.SOURCE_SYNC_ALL,
+                                     'controller-0')
+        self.assertEqual(sorted(status), [
+            'os_clock_status', 'overall_sync_status', 'ptp1', 'ptp2',
+            'ts2phc1'])
+        # The lock state is merged after the clock class
+        self.assertEqual(self.value(status['ptp1']), 'LOCKED')
+        self.assertEqual(self.snapshot.query(
+            constants.SOURCE_SYNCE_LOCK_STATE, 'controller-0'), {})
+
+    def test_query_node_name(self):
+        status = self.snapshot.query(constants.SOURCE_SYNC_OS_CLOCK, '.')
+        self.assertEqual(
+            status['os_clock_status']['data']['values'][0]['ResourceAddress'],
+            '/././sync/sync-status/os-clock-sync-state')
+        status = self.snapshot.query(constants.SOURCE_SYNC_OS_CLOCK,
+                                     'controller-0')
+        self.assertEqual(
+            status['os_clock_status']['data']['values'][0]['ResourceAddress'],
+            '/./controller-0/sync/sync-status/os-clock-sync-state')
+
+    def test_query_optional(self):
+        status = self.snapshot.query(constants.SOURCE_SYNC_PTP_LOCK_STATE,
+                                     'controller-0', 'ptp2')
+        self.assertEqual(list(status), ['ptp2'])
+        self.assertEqual(self.value(status['ptp2']), 'FREERUN')
+        self.assertIsNone(self.snapshot.query(
+            constants.SOURCE_SYNC_PTP_LOCK_STATE, 'controller-0', 'ts2phc1'))
+        # Resources without instances ignore it
+        self.assertEqual(list(self.snapshot.query(
+            constants.SOURCE_SYNC_OS_CLOCK, 'controller-0', 'ptp2')),
+            ['os_clock_status'])
+
+        status = self.snapshot.query(constants.SOURCE_SYNC_ALL,
+                                     'controller-0', 'ts2phc1')
+        self.assertEqual(sorted(status), [
+            'os_clock_status', 'overall_sync_status', 'ts2phc1'])
+        self.assertIsNone(self.snapshot.query(
+            constants.SOURCE_SYNC_ALL, 'controller-0', 'unknown'))